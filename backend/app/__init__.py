@@ -1,11 +1,17 @@
 from __future__ import annotations
 import os
-from flask import Flask, request, jsonify
+from flask import Flask, g, request, jsonify
 from flask_cors import CORS
 from .core.config import load_config
 from .core.errors import install_error_handlers, err
+from .core import deadline
+from .core.snapshot import start_cache_snapshots
+from .core.purge import start_purge_listener
 from .core.ratelimit import is_allowed
 from .clients.tmdb import refresh_tmdb_auth_from_env
+from .services.mood_pool_service import start_mood_pool_refresher
+from .services.ratings_service import start_ratings_trainer
+from .services.provider_index import start_provider_index_refresher
 from .api.routes import bp as api_bp
 from .api.routes import mood_bp 
 
@@ -28,6 +34,17 @@ def create_app() -> Flask:
     app.register_blueprint(api_bp, url_prefix="/api")
     app.register_blueprint(mood_bp, url_prefix='/api')
 
+    # Background candidate pools for /api/recommend/mood (opt-in via MOOD_POOL_ENABLED)
+    start_mood_pool_refresher()
+    # Periodic ALS retrain for /api/recommend/personal
+    start_ratings_trainer()
+    # Fill/refresh the provider availability index behind ?available_on=
+    start_provider_index_refresher()
+    # Warm restart: reload cached TMDb responses in the background (CACHE_SNAPSHOT_PATH)
+    start_cache_snapshots()
+    # Apply cache purges published by other workers (REDIS_URL)
+    start_purge_listener()
+
     # Simple health (optional, helpful for probes)
     @app.get("/health")
     def _health():
@@ -39,6 +56,8 @@ def create_app() -> Flask:
         # Skip rate limit for health checks if you want
         if request.path == "/health":
             return None
+        if getattr(app.view_functions.get(request.endpoint), "rate_limit_exempt", False):
+            return None
         ip = request.remote_addr or "unknown"
         ok, remaining = is_allowed(ip)
         if not ok:
@@ -52,6 +71,21 @@ def create_app() -> Flask:
         request.remaining = remaining
         return None
 
+    # Per-request deadline (route budget or X-Timeout-Ms), carried to every upstream call
+    @app.before_request
+    def _start_deadline():
+        if not request.path.startswith("/api"):
+            return None
+        view = app.view_functions.get(request.endpoint)
+        g.deadline_token = deadline.start(deadline.budget_for(view, request.headers.get(deadline.DEADLINE_HEADER)))
+        return None
+
+    @app.teardown_request
+    def _end_deadline(_exc):
+        token = g.pop("deadline_token", None)
+        if token is not None:
+            deadline.reset(token)
+
     @app.after_request
     def _rate_limit_headers(resp):
         # Best-effort: only attach headers for API paths
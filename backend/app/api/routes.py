@@ -1,24 +1,44 @@
 # backend/app/api/routes.py
 from __future__ import annotations
 import os
-import json
 import re
 import traceback
 import time
 import math
-import random
-import collections
+import hashlib
+import hmac
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from uuid import uuid4
 from typing import Optional, Dict, Any, List, Tuple
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 
 from ..clients.tmdb import session, tmdb_url
-from ..core.cache import ttl_cache
-from ..core.errors import err
+from ..core.cache import (ttl_cache, cached, canonical, key_csv, key_enum, key_int, key_str,
+                          ttl_decisions, ttl_summary)
+from ..core.concurrency import run_strategies, submit, submit_to
+from ..core.prefetch import prefetch_next
+from ..core.breaker import BreakerOpen
+from ..core.deadline import DeadlineExceeded, deadline_budget
+from ..core.purge import purge as cache_purge
+from ..core.ratelimit import rate_limit_exempt
+from ..core.jobs import DONE, FAILED, JobQueueFull, JobRunner, JobStore
+from ..core.negcache import EMPTY_SEARCH, NOT_FOUND, UNRESOLVED, negative
+from ..core import deadline, metrics
+from ..core.recency import recency
+from ..core.jsonscan import JSONScanner, iter_json_values
+from ..core.errors import ApiError, bad_request, err
 from ..services.providers_service import normalize_providers, validate_region
 from ..services.mood_service import map_mood, supported_moods
+from ..services.mood_pool_service import MoodPool, get_pool
+from ..services.content_engine import engine as content_engine
+from ..services import ratings_service
+from ..services.rerank import diversify
+from ..services.title_index import resolve_title
+from ..services.provider_index import index as provider_index, MONETIZATION_TYPES, STREAMING_TYPES
 from ..clients.llama import LlamaClient
+from ..clients.llm_scheduler import LLMBusy, PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE
 
 
 bp = Blueprint("api", __name__)
@@ -26,13 +46,21 @@ mood_bp = Blueprint("mood", __name__)
 
 LANG_DEFAULT = os.getenv("DEFAULT_LANGUAGE", "en-US")
 REGION_DEFAULT = os.getenv("DEFAULT_REGION", "US")
+# Stream the LLM reply and resolve picks while it is still generating
+LLAMA_STREAM = os.getenv("LLAMA_STREAM", "0").strip().lower() in ("1", "true", "yes", "on")
+# Time budget for /mood/analyze: LLM reply plus TMDb enrichment (core.deadline)
+MOOD_ANALYZE_DEADLINE = float(os.getenv("MOOD_ANALYZE_DEADLINE", "20"))
+# Route-cache TTL for ?available_on= pages that left out movies the provider index doesn't know yet
+AVAILABLE_ON_PARTIAL_TTL = int(os.getenv("AVAILABLE_ON_PARTIAL_TTL", "60"))
+# Bearer token for /api/admin/* (unset: admin endpoints are disabled)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
 
 
 # =============================================================================
 # PATCHED HELPERS (place above /mood/analyze)
 # =============================================================================
 
-@ttl_cache(ttl_seconds=6 * 3600)
+@cached("tmdb_genres", ttl=6 * 3600)
 def _tmdb_genres_map() -> Dict[int, str]:
     """
     Return {genre_id: name}. Never return a Response/None.
@@ -64,10 +92,24 @@ def _best_search_match(results, want_year=None):
         return base + bonus
     return sorted(filtered, key=score, reverse=True)[0]
 
+def _title_neg_key(title: str, year: Optional[int], language: str) -> str:
+    """Negative-cache key for a title search: casefolded, whitespace-collapsed."""
+    return f"{language}|{year or ''}|{' '.join(title.casefold().split())}"
+
+def _known_unresolvable(nkey: str) -> bool:
+    return negative.hit(EMPTY_SEARCH, nkey) or negative.hit(UNRESOLVED, nkey)
+
 def _tmdb_search_movie_single(title: str, year: Optional[int] = None, *, language: str = LANG_DEFAULT) -> Optional[Dict[str, Any]]:
     """
     Return a SINGLE movie dict with poster_path, or None. Never returns requests.Response or a list.
+    Titles already in the local catalog resolve without a TMDb call.
     """
+    local = resolve_title(title, year)
+    if local is not None:
+        return local
+    nkey = _title_neg_key(title, year, language)
+    if _known_unresolvable(nkey):
+        return None
     try:
         params = {"query": title, "include_adult": "false", "language": language}
         if year:
@@ -77,8 +119,12 @@ def _tmdb_search_movie_single(title: str, year: Optional[int] = None, *, languag
             return None
         data = r.json() or {}
         results = data.get("results") or []
+        _observe(results)
         best = _best_search_match(results, want_year=year)
-        return best if isinstance(best, dict) else None
+        if not isinstance(best, dict):
+            negative.remember(UNRESOLVED if results else EMPTY_SEARCH, nkey)
+            return None
+        return best
     except Exception as e:
         print(f"[_tmdb_search_movie_single] EXCEPTION for {title!r}: {e}")
         return None
@@ -88,6 +134,12 @@ def _tmdb_search_movie_strict(title: str, year: Optional[int] = None, *, languag
     STRICT single-movie search that returns a dict movie (with poster) or None.
     Never returns requests.Response or a list.
     """
+    local = resolve_title(title, year)
+    if local is not None:
+        return local
+    nkey = _title_neg_key(title, year, language)
+    if _known_unresolvable(nkey):
+        return None
     try:
         params = {"query": title, "include_adult": "false", "language": language}
         if year:
@@ -97,23 +149,30 @@ def _tmdb_search_movie_strict(title: str, year: Optional[int] = None, *, languag
             return None
         data = r.json() or {}
         results = (data.get("results") or [])
+        _observe(results)
         best = _best_search_match(results, want_year=year)
         if isinstance(best, dict) and best.get("poster_path"):
             return best
+        negative.remember(UNRESOLVED if results else EMPTY_SEARCH, nkey)
         return None
     except Exception as e:
         print(f"[_tmdb_search_movie_strict] EXCEPTION for {title!r}: {e}")
         return None
 
-@ttl_cache(ttl_seconds=3600, vary=["mid", "language"])
+@cached("tmdb_details", ttl=3600, tags=lambda mid, *a, **kw: [f"movie:{mid}"])
 def _tmdb_movie_details(mid: int, language: str = LANG_DEFAULT) -> Dict[str, Any]:
     """
-    Cached /movie/{id} details; {} on failure.
+    Cached /movie/{id} details; {} on failure. {} is never cached, so a 404
+    is remembered (and expired) by the negative cache alone.
     """
+    if negative.hit(NOT_FOUND, str(mid)):
+        return {}
     try:
         r = session.get(tmdb_url(f"/movie/{mid}"), params={"language": language}, timeout=10)
         if getattr(r, "ok", False):
             return r.json() or {}
+        if getattr(r, "status_code", None) == 404:
+            negative.remember(NOT_FOUND, str(mid))
     except Exception as e:
         print(f"[_tmdb_movie_details] EXCEPTION mid={mid}: {e}")
     return {}
@@ -155,43 +214,16 @@ def to_movie_obj(tmdb_movie: Dict[str, Any]) -> Dict[str, Any]:
         "year": year,
     }
 
-def _find_json_blob(t: str) -> Optional[str]:
-    """
-    Extract a JSON object/array from arbitrary model text. Tolerates common invalid escapes like \\'.
-    """
-    if not t:
+def _normalize_pick(p: Any) -> Optional[Dict[str, Any]]:
+    if not isinstance(p, dict):
         return None
-    if t.startswith("```"):
-        t = re.sub(r"^```(?:json)?\s*", "", t)
-        t = re.sub(r"\s*```$", "", t).strip()
-    s = t.lstrip()
-    openers = {"{": "}", "[": "]"}
-    idxs = [i for i, ch in enumerate(t) if ch in openers]
-    for start in ([0] if (s.startswith("{") or s.startswith("[")) else []) + idxs:
-        opener = t[start]; closer = openers.get(opener)
-        if closer is None:
-            continue
-        depth, i = 0, start
-        while i < len(t):
-            ch = t[i]
-            if ch == opener:
-                depth += 1
-            elif ch == closer:
-                depth -= 1
-                if depth == 0:
-                    candidate = t[start:i+1]
-                    try:
-                        json.loads(candidate)
-                        return candidate
-                    except Exception:
-                        try:
-                            sanitized = re.sub(r"\\'", "'", candidate)
-                            json.loads(sanitized)
-                            return sanitized
-                        except Exception:
-                            break
-            i += 1
-    return None
+    title = (p.get("title") or "").strip() if isinstance(p.get("title"), str) else ""
+    if not title:
+        return None
+    year = p.get("year")
+    if isinstance(year, str) and year.isdigit():
+        year = int(year)
+    return {"title": title, "year": year, "reason": p.get("reason")}
 
 def parse_llm_movies(raw_text: str):
     """
@@ -199,38 +231,21 @@ def parse_llm_movies(raw_text: str):
       {"reply":"...","picks":[{"title":"...", "year":1999, "reason":"..."}]}
       {"reply":"...","movies":[{"title":"..."}]}
       [{"title":"..."}]   # top-level array, no reply
-    Also supports noisy outputs with preface/suffix (via _find_json_blob),
-    then falls back to parsing bullet lines.
+    Also supports noisy outputs with preface/suffix (single-pass scan via core.jsonscan;
+    each embedded value is decoded once), then falls back to parsing bullet lines.
     """
     t = (raw_text or "").strip()
-    blob = _find_json_blob(t)
-    if blob:
-        try:
-            sanitized = re.sub(r"\\'", "'", blob)
-            data = json.loads(sanitized)
-            reply = ""
-            picks = []
-
-            if isinstance(data, dict):
-                reply = (data.get("reply") or "").strip()
-                picks = data.get("picks") or data.get("movies") or []
-            elif isinstance(data, list):
-                picks = data
-            out = []
-            for p in picks:
-                if not isinstance(p, dict):
-                    continue
-                title = (p.get("title") or "").strip()
-                if not title:
-                    continue
-                year = p.get("year")
-                if isinstance(year, str) and year.isdigit():
-                    year = int(year)
-                out.append({"title": title, "year": year, "reason": p.get("reason")})
-            if out:
-                return reply, out
-        except Exception:
-            pass
+    for data in iter_json_values(t):
+        reply = ""
+        picks: Any = []
+        if isinstance(data, dict):
+            reply = (data.get("reply") or "").strip() if isinstance(data.get("reply"), str) else ""
+            picks = data.get("picks") or data.get("movies") or []
+        elif isinstance(data, list):
+            picks = data
+        out = [n for n in (_normalize_pick(p) for p in (picks if isinstance(picks, list) else [])) if n]
+        if out:
+            return reply, out
     # Bullet-list fallback
     lines = [l.strip() for l in t.splitlines() if l.strip()]
     out = []
@@ -249,6 +264,26 @@ def parse_llm_movies(raw_text: str):
         out.append({"title": title, "year": year, "reason": None})
     return "", out
 
+def _stream_llm_picks(client: LlamaClient, system_prompt: str, text: str, language: str,
+                      prefetched: Dict[Tuple[str, Any], Any]) -> str:
+    """
+    Stream the LLM reply and start TMDb resolution for each pick the moment its
+    JSON object closes, overlapping generation with lookups. Returns the full text.
+    """
+    scanner = JSONScanner()
+    parts: List[str] = []
+    for delta in client.stream_mood_with_system_prompt(system_prompt, text):
+        parts.append(delta)
+        for p in scanner.feed(delta):
+            pick = _normalize_pick(p)
+            if not pick or not is_plausible_title(pick["title"]):
+                continue
+            key = (pick["title"].lower(), pick["year"])
+            if key not in prefetched:
+                prefetched[key] = submit(_tmdb_search_movie_single, pick["title"], pick["year"], language=language)
+    metrics.incr("llm.stream.prefetched", len(prefetched))
+    return "".join(parts)
+
 def safe_to_movie_obj(x):
     if not isinstance(x, dict):
         return None
@@ -369,31 +404,141 @@ def _clamp_page(v) -> int:
     x = _int_or_none(v, lo=1, hi=500)
     return x or 1
 
+# =========================
+# List projections (trending/popular)
+# =========================
+# What the home rows/carousel actually render; everything else is opt-in via ?fields=
+_LIST_DEFAULT_FIELDS: Tuple[str, ...] = ("id", "title", "poster_path", "release_date", "vote_average")
+_LIST_ALLOWED_FIELDS = {
+    "id", "title", "original_title", "original_language", "overview", "poster_path",
+    "backdrop_path", "release_date", "genre_ids", "popularity", "vote_average",
+    "vote_count", "adult", "video", "media_type",
+}
+
+def _parse_fields(v: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """
+    ?fields=id,title,... -> ordered tuple of allowed fields.
+    Missing/empty -> slim default; 'all' -> None (no projection).
+    Unknown names are ignored; 'id' is always kept so the UI can key rows.
+    """
+    raw = [f.lower() for f in _csv(v)]
+    if not raw:
+        return _LIST_DEFAULT_FIELDS
+    if "all" in raw or "*" in raw:
+        return None
+    out = ["id"]
+    for f in raw:
+        if f in _LIST_ALLOWED_FIELDS and f not in out:
+            out.append(f)
+    return tuple(out)
+
+def _project(items: List[Dict[str, Any]], fields: Optional[Tuple[str, ...]]) -> List[Dict[str, Any]]:
+    if fields is None:
+        return items
+    return [{f: it.get(f) for f in fields} for it in items if isinstance(it, dict)]
+
 # =============================================================================
 # Variety / Serendipity helpers (LRU, similar/recs)
 # =============================================================================
 
-# Keep the last ~200 ids we served (per-process memory)
-_RECENT_IDS: "collections.deque[Tuple[int, float]]" = collections.deque(maxlen=200)
+def _recency_scope(body: Optional[Dict[str, Any]] = None) -> str:
+    """Who "recently served" applies to: session/user id if the client sends one, else the IP."""
+    b = body or {}
+    sid = (request.headers.get("X-Session-Id") or b.get("session_id") or b.get("user_id")
+           or request.headers.get("X-User-Id"))
+    sid = str(sid or "").strip()[:64]
+    return f"s:{sid}" if sid else f"ip:{request.remote_addr or 'unknown'}"
+
+# One ingest thread: catalog writes are serialized and never take upstream workers
+_observe_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="catalog-ingest")
+
+def _observe(items: List[Dict[str, Any]]) -> None:
+    """Feed TMDb movies into the local catalog off the request path (best-effort)."""
+    if items:
+        submit_to(_observe_pool, content_engine.add_many, list(items))
+
+def _watch_region() -> str:
+    try:
+        return validate_region(request.args.get("watch_region") or request.args.get("region"), REGION_DEFAULT)
+    except ValueError as e:
+        bad_request(str(e), hint="Pass a valid ISO-3166-1 alpha-2 region")
+
+def _available_on(items: List[Dict[str, Any]], region: str) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    Optional ?available_on=<provider ids>[&available_types=flatrate,free,ads] filter,
+    answered from the local provider index. Returns (items, meta); meta is None when
+    the filter was not requested. Movies without a known providers document are
+    dropped and queued for background fetching ("unknown" in meta).
+    """
+    raw = request.args.get("available_on")
+    if not raw:
+        return items, None
+    pids: List[int] = []
+    for tok in _csv(raw):
+        if not tok.isdigit():
+            bad_request(f"Invalid provider id: {tok!r}", hint="Use TMDb provider ids, e.g. ?available_on=8,337")
+        pids.append(int(tok))
+    types = tuple(_csv(request.args.get("available_types"))) or STREAMING_TYPES
+    wrong = [t for t in types if t not in MONETIZATION_TYPES]
+    if wrong:
+        bad_request(f"Invalid available_types: {', '.join(wrong)}", hint="Use: " + ", ".join(MONETIZATION_TYPES))
+    kept, unknown = provider_index.filter(items, region, pids, types)
+    metrics.incr("available_on.requests")
+    metrics.incr("available_on.unknown", len(unknown))
+    return kept, {"region": region, "providers": pids, "types": list(types), "unknown": len(unknown)}
+
+# ---------------------------
+# Canonical cache keys (see core.cache key schemas)
+# ---------------------------
+_LANG_RE = re.compile(r"^([A-Za-z]{2,3})(?:[-_]([A-Za-z]{2}))?$")
+
+def _LANG_KEY(v: Optional[str]) -> str:
+    """BCP-47-ish language as TMDb spells it: en-us / en_US -> en-US; anything else as sent."""
+    v = key_str(LANG_DEFAULT)(v)
+    m = _LANG_RE.match(v)
+    if not m:
+        return v
+    lang, region = m.group(1).lower(), m.group(2)
+    return f"{lang}-{region.upper()}" if region else lang
 
-def _recent_seen(mid: int, window_sec: int = 6 * 3600) -> bool:
-    """Return True if movie id was served in the last window."""
-    now = time.time()
-    # Prune old items opportunistically
-    while _RECENT_IDS and (now - _RECENT_IDS[0][1]) > window_sec:
-        _RECENT_IDS.popleft()
-    return any(m == mid and (now - ts) <= window_sec for (m, ts) in _RECENT_IDS)
+def _fields_key(v: Optional[str]) -> Any:
+    fields = _parse_fields(v)
+    return sorted(fields) if fields is not None else "all"
 
-def _recent_mark(mids: List[int]) -> None:
-    ts = time.time()
-    for mid in mids:
-        _RECENT_IDS.append((mid, ts))
+def _mood_key(v: Optional[str]) -> str:
+    try:
+        return map_mood(v)["__canon__"]
+    except KeyError:
+        return f"?{(v or '').strip().lower()}"
+
+def _availability_ttl(payload: Dict[str, Any]) -> Optional[int]:
+    """Pages that dropped not-yet-indexed movies are cached briefly, until the refresher catches up."""
+    return AVAILABLE_ON_PARTIAL_TTL if (payload.get("available_on") or {}).get("unknown") else None
+
+def _with_availability(schema: Dict[str, Any], region_params: Tuple[str, ...] = ("watch_region", "region")):
+    """Key fn: `schema` plus the ?available_on= filter (region only matters when filtering)."""
+    def key() -> Dict[str, Any]:
+        out = canonical(schema)
+        pids = key_csv()(request.args.get("available_on"))
+        if pids:
+            region = next((request.args.get(p) for p in region_params if request.args.get(p)), REGION_DEFAULT)
+            out["available_on"] = [pids, key_csv()(request.args.get("available_types")) or list(STREAMING_TYPES),
+                                   region.strip().upper()]
+        return out
+    return key
 
 def _fetch_similar_pool(seed_mid: int, *, language: str) -> List[Dict[str, Any]]:
     """
     Pull a small pool from /recommendations then /similar for a given seed movie.
     Returns a list of result dicts (TMDB shape) filtered to those with poster_path.
+    Served from the local content engine when it knows the seed well enough.
     """
+    if content_engine.ready():
+        local = content_engine.similar_items(seed_mid, k=20)
+        if len(local) >= 12:
+            metrics.incr("similar_pool.local")
+            return local
+    metrics.incr("similar_pool.tmdb")
     out: List[Dict[str, Any]] = []
 
     # Try recommendations first
@@ -402,6 +547,7 @@ def _fetch_similar_pool(seed_mid: int, *, language: str) -> List[Dict[str, Any]]
     if getattr(rec, "ok", False):
         items = (rec.json() or {}).get("results") or []
         out.extend([i for i in items if i.get("poster_path")])
+        _observe(items)
 
     # Fallback/augment with similar
     if len(out) < 12:
@@ -410,6 +556,7 @@ def _fetch_similar_pool(seed_mid: int, *, language: str) -> List[Dict[str, Any]]
         if getattr(sim, "ok", False):
             items = (sim.json() or {}).get("results") or []
             out.extend([i for i in items if i.get("poster_path")])
+            _observe(items)
 
     return out[:20]  # cap the pool
 
@@ -459,12 +606,52 @@ def health():
     return jsonify({"status": "up"}), 200
 
 
+@bp.get("/metrics")
+def metrics_snapshot():
+    return jsonify(metrics.snapshot()), 200
+
+
+@bp.get("/metrics/cache-ttl")
+def cache_ttl_decisions():
+    """Per-key adaptive TTLs (?name=<route or func:name>, ?limit=)."""
+    try:
+        limit = max(1, min(int(request.args.get("limit", 100)), 1000))
+    except ValueError:
+        return err("bad_request", "'limit' must be an integer")
+    return jsonify({"summary": ttl_summary(), "keys": ttl_decisions(request.args.get("name"), limit)}), 200
+
+
+# =============================================================================
+# Admin: cache purge by tag
+# =============================================================================
+
+@bp.post("/admin/cache/purge")
+def admin_cache_purge():
+    """
+    Body: {"tags": ["movie:603", "route:search", "func:tmdb_genres", "lang:de-DE", "region:GB"]}.
+    Purges every cache on this worker and, with REDIS_URL, on all workers.
+    """
+    if not ADMIN_TOKEN:
+        return err("not_found", "Admin API is disabled", hint="Set ADMIN_TOKEN to enable it", status=404)
+    auth = request.headers.get("Authorization") or ""
+    if not hmac.compare_digest(auth.encode(), f"Bearer {ADMIN_TOKEN}".encode()):
+        return err("unauthorized", "Missing or invalid admin token",
+                   hint="Send Authorization: Bearer <ADMIN_TOKEN>", status=401)
+    tags = (request.get_json(silent=True) or {}).get("tags")
+    if not isinstance(tags, list) or not tags or not all(isinstance(t, str) and ":" in t for t in tags):
+        return err("bad_request", "'tags' must be a non-empty list of kind:value strings",
+                   hint='e.g. {"tags": ["movie:603"]}')
+    return jsonify({"tags": tags, **cache_purge(tags)}), 200
+
+
 # =============================================================================
 # Search (quality-filtered: vote_count >= 500, highest-rated first)
 # =============================================================================
 
 @bp.get("/search")
-@ttl_cache(ttl_seconds=10 * 60, vary=["q", "page", "language"])
+@ttl_cache(ttl_seconds=10 * 60, key=_with_availability({
+    "q": key_str(lower=True), "page": key_int(1), "language": _LANG_KEY,
+}), ttl_for=_availability_ttl)
 def search():
     q = (request.args.get("q") or "").strip()
     if not q:
@@ -495,6 +682,7 @@ def search():
 
     raw = r.json() or {}
     items = (raw.get("results") or [])
+    _observe(items)
 
     # ---- Quality filter & sort ----
     MIN_VOTES = 500
@@ -513,6 +701,9 @@ def search():
         return (-va, -pop)
 
     filtered.sort(key=_score_key)
+    availability = None
+    if request.args.get("available_on"):
+        filtered, availability = _available_on(filtered, _watch_region())
 
     # Re-shape results for frontend grid
     results = [
@@ -537,48 +728,50 @@ def search():
     end = start + PAGE_SIZE
     paged_results = results[start:end]
 
-    return jsonify({
+    out = {
         "page": page,
         "total_pages": total_pages,
         "total_results": total_results,
         "results": paged_results,
-    })
+    }
+    if availability:
+        out["available_on"] = availability
+    return jsonify(out)
 
 
 # =============================================================================
 # Discover (filtered search)
 # =============================================================================
-@bp.get("/discover")
-@ttl_cache(ttl_seconds=10 * 60, vary=[
-    "language","page","genres","year","year_gte","year_lte","runtime_gte","runtime_lte",
-    "vote_avg_gte","vote_count_gte","with_original_language","region","watch_region",
-    "with_watch_providers","with_watch_monetization_types","include_adult","sort_by"
-])
-def discover():
-    language = request.args.get("language", LANG_DEFAULT)
-    page = _clamp_page(request.args.get("page", 1))
+def _discover_params(args) -> Dict[str, Any]:
+    """
+    Normalized TMDb /discover/movie params for a request's query args.
+    Also the route's cache key: equivalent queries (genre names vs ids, list
+    order, case, explicit defaults) build identical params.
+    """
+    language = args.get("language") or LANG_DEFAULT
+    page = _clamp_page(args.get("page", 1))
 
     # Normalize filters
-    genre_ids = _genres_to_ids(request.args.get("genres"))
-    year = _int_or_none(request.args.get("year"), lo=1870, hi=2100)
-    year_gte = _int_or_none(request.args.get("year_gte"), lo=1870, hi=2100)
-    year_lte = _int_or_none(request.args.get("year_lte"), lo=1870, hi=2100)
-    runtime_gte = _int_or_none(request.args.get("runtime_gte"), lo=0, hi=600)
-    runtime_lte = _int_or_none(request.args.get("runtime_lte"), lo=0, hi=600)
-    vote_avg_gte = _float_or_none(request.args.get("vote_avg_gte"), lo=0.0, hi=10.0)
-    vote_count_gte = _int_or_none(request.args.get("vote_count_gte"), lo=0, hi=1_000_000) or 50
-    wol = request.args.get("with_original_language")
-    region = request.args.get("region", REGION_DEFAULT)
-    watch_region = request.args.get("watch_region", region)
-    wwp = _csv(request.args.get("with_watch_providers"))
-    wmt = _csv(request.args.get("with_watch_monetization_types"))
-    include_adult = _as_bool(request.args.get("include_adult"), default=False)
-    sort_by = request.args.get("sort_by", "popularity.desc")
+    genre_ids = sorted(_genres_to_ids(args.get("genres")))
+    year = _int_or_none(args.get("year"), lo=1870, hi=2100)
+    year_gte = _int_or_none(args.get("year_gte"), lo=1870, hi=2100)
+    year_lte = _int_or_none(args.get("year_lte"), lo=1870, hi=2100)
+    runtime_gte = _int_or_none(args.get("runtime_gte"), lo=0, hi=600)
+    runtime_lte = _int_or_none(args.get("runtime_lte"), lo=0, hi=600)
+    vote_avg_gte = _float_or_none(args.get("vote_avg_gte"), lo=0.0, hi=10.0)
+    vote_count_gte = _int_or_none(args.get("vote_count_gte"), lo=0, hi=1_000_000) or 50
+    wol = (args.get("with_original_language") or "").strip().lower()
+    region = (args.get("region") or REGION_DEFAULT).strip().upper()
+    watch_region = (args.get("watch_region") or region).strip().upper()
+    wwp = sorted(set(_csv(args.get("with_watch_providers"))))
+    wmt = sorted({t.lower() for t in _csv(args.get("with_watch_monetization_types"))})
+    include_adult = _as_bool(args.get("include_adult"), default=False)
+    sort_by = (args.get("sort_by") or "popularity.desc").strip().lower()
     if sort_by not in _DISCOVER_SORT_OK:
         sort_by = "popularity.desc"
 
     # Build TMDB params
-    params = {
+    params: Dict[str, Any] = {
         "language": language,
         "include_adult": "true" if include_adult else "false",
         "page": page,
@@ -616,6 +809,14 @@ def discover():
         params["with_watch_providers"] = ",".join(wwp)
     if wmt:
         params["with_watch_monetization_types"] = ",".join(wmt)
+    return params
+
+@bp.get("/discover")
+@prefetch_next()
+@ttl_cache(ttl_seconds=10 * 60, key=lambda: _discover_params(request.args))
+def discover():
+    params = _discover_params(request.args)
+    page = params["page"]
 
     r = session.get(tmdb_url("/discover/movie"), params=params, timeout=12)
     if r.status_code >= 500:
@@ -625,6 +826,7 @@ def discover():
 
     data = r.json() or {}
     items = (data.get("results") or [])
+    _observe(items)
     # Keep items with posters; shape for frontend reuse
     results = [
         {
@@ -652,19 +854,86 @@ def discover():
 # Details
 # =============================================================================
 
-@bp.get("/details/<int:mid>")
-@ttl_cache(ttl_seconds=3600, vary=["mid", "language"])
-def details(mid: int):
-    language = request.args.get("language", LANG_DEFAULT)
-    r = session.get(tmdb_url(f"/movie/{mid}"), params={"language": language})
+# One upstream call for the whole Details page; sub-documents prime the
+# caches behind /recommend/<mid> and /providers/<mid>.
+_DETAILS_APPEND = "credits,recommendations,similar,watch/providers"
+_DETAILS_INCLUDES = ("recommendations", "similar", "providers")
+
+@cached("tmdb_details_bundle", ttl=3600, tags=lambda mid, *a, **kw: [f"movie:{mid}"])
+def _tmdb_details_bundle(mid: int, language: str) -> Dict[str, Any]:
+    """/movie/{id} with append_to_response; raises ApiError (never cached) on failure."""
+    if negative.hit(NOT_FOUND, str(mid)):
+        raise ApiError("not_found", "Movie not found", hint="Check the id", status=404)
+    r = session.get(tmdb_url(f"/movie/{mid}"),
+                    params={"language": language, "append_to_response": _DETAILS_APPEND}, timeout=10)
     if r.status_code >= 500:
-        return err("bad_gateway", "TMDb error", dependency="tmdb", status=502)
+        raise ApiError("bad_gateway", "TMDb error", dependency="tmdb", status=502)
     if r.status_code == 404:
-        return err("not_found", "Movie not found", hint="Check the id", status=404)
+        negative.remember(NOT_FOUND, str(mid))
+        raise ApiError("not_found", "Movie not found", hint="Check the id", status=404)
     if not r.ok:
-        return err("bad_gateway", "TMDb request failed", dependency="tmdb", status=502)
-
+        raise ApiError("bad_gateway", "TMDb request failed", dependency="tmdb", status=502)
     data = r.json() or {}
+    _prime_from_bundle(mid, language, data)
+    return data
+
+def _prime_from_bundle(mid: int, language: str, data: Dict[str, Any]) -> None:
+    core = {k: v for k, v in data.items() if k not in ("credits", "recommendations", "similar", "watch/providers")}
+    _observe([core])
+    _tmdb_movie_details.prime(core, mid, language=language)
+
+    wp = data.get("watch/providers")
+    if isinstance(wp, dict):
+        _tmdb_watch_providers.prime(wp, mid)
+        provider_index.ingest(mid, wp)
+
+    recs, src = _bundle_recs(data)
+    _observe(((data.get("recommendations") or {}).get("results") or []) + ((data.get("similar") or {}).get("results") or []))
+    # Page 1 of /recommend/<mid>, unless that route would answer from the local engine
+    if recs is not None and not (content_engine.ready() and mid in content_engine):
+        with current_app.test_request_context(f"/api/recommend/{mid}", query_string={"language": language}):
+            request.view_args = {"mid": mid}
+            recommend.prime(_recs_payload(recs, src, 1))
+        metrics.incr("details.primed.recommend")
+
+def _bundle_recs(data: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], str]:
+    """Same choice /recommend makes: recommendations, else similar when empty."""
+    rec = data.get("recommendations")
+    if isinstance(rec, dict) and rec.get("total_results", 0):
+        return rec, "recommendations"
+    sim = data.get("similar")
+    return (sim, "similar") if isinstance(sim, dict) else (None, "similar")
+
+def _details_key() -> Dict[str, Any]:
+    out = canonical({"mid": key_int(), "language": _LANG_KEY, "include": key_csv()})
+    if "providers" in out["include"]:
+        out["region"] = key_str(REGION_DEFAULT, upper=True)(request.args.get("region"))
+    return out
+
+@bp.get("/details/<int:mid>")
+@ttl_cache(ttl_seconds=3600, key=_details_key)
+def details(mid: int):
+    """
+    Movie + cast. ?include=recommendations,similar,providers adds those sections
+    from the same upstream document (providers for ?region=).
+    """
+    language = request.args.get("language", LANG_DEFAULT)
+    include = [x.lower() for x in _csv(request.args.get("include"))]
+    unknown = [x for x in include if x not in _DETAILS_INCLUDES]
+    if unknown:
+        return err("bad_request", f"Unknown include: {', '.join(unknown)}", hint="Use: " + ", ".join(_DETAILS_INCLUDES))
+    region = REGION_DEFAULT
+    if "providers" in include:
+        try:
+            region = validate_region(request.args.get("region"), REGION_DEFAULT)
+        except ValueError as e:
+            return err("bad_request", str(e), hint=_REGION_HINT)
+
+    try:
+        data = _tmdb_details_bundle(mid, language)
+    except ApiError as e:
+        return e.to_response()
+
     movie = {
         "id": data.get("id"),
         "title": data.get("title"),
@@ -679,29 +948,38 @@ def details(mid: int):
         "production_countries": data.get("production_countries") or [],
         "overview": data.get("overview"),
     }
+    cast = [
+        {
+            "id": c.get("id"),
+            "name": c.get("name"),
+            "character": c.get("character"),
+            "profile_path": c.get("profile_path"),
+        }
+        for c in ((data.get("credits") or {}).get("cast") or [])[:12]
+    ]
+    out: Dict[str, Any] = {"movie": movie, "cast": cast}
 
-    cr = session.get(tmdb_url(f"/movie/{mid}/credits"), params={"language": language})
-    cast = []
-    if r.ok and cr.ok:
-        cast = [
-            {
-                "id": c.get("id"),
-                "name": c.get("name"),
-                "character": c.get("character"),
-                "profile_path": c.get("profile_path"),
-            }
-            for c in (cr.json().get("cast") or [])[:12]
-        ]
-
-    return jsonify({"movie": movie, "cast": cast})
+    if "recommendations" in include:
+        recs, src = _bundle_recs(data)
+        out["recommendations"] = _recs_payload(recs or {}, src, 1)
+    if "similar" in include:
+        out["similar"] = _recs_payload(data.get("similar") or {}, "similar", 1, rerank=False)["results"]
+    if "providers" in include:
+        out["providers"] = {"id": mid, "region": region,
+                            **normalize_providers(data.get("watch/providers") or {}, region)}
+    return jsonify(out)
 
 
 # =============================================================================
 # Recommendations by seed movie
 # =============================================================================
 
+_RECS_PAGE_SIZE = 20
+_LOCAL_RECS_MAX = 100  # local answers are capped at 5 pages; later pages are empty, not TMDb
+
 @bp.get("/recommend/<int:mid>")
-@ttl_cache(ttl_seconds=30 * 60, vary=["mid", "page", "language"])
+@prefetch_next()
+@ttl_cache(ttl_seconds=30 * 60, key={"mid": key_int(), "page": key_int(1), "language": _LANG_KEY})
 def recommend(mid: int):
     try:
         page = int(request.args.get("page", 1))
@@ -709,6 +987,33 @@ def recommend(mid: int):
         return err("bad_request", "'page' must be an integer")
     language = request.args.get("language", LANG_DEFAULT)
 
+    # One source per seed: local whenever the engine has neighbours for it, on
+    # every page, so a list never switches to TMDb halfway and total_pages holds.
+    # TMDb only when the seed is unknown, has no neighbours or the catalog is too small.
+    if content_engine.ready() and mid in content_engine:
+        scored = [(content_engine.meta_of(i), sc) for i, sc in content_engine.similar(mid, k=_LOCAL_RECS_MAX)]
+        scored = [(m, sc) for m, sc in scored if m]
+        local = diversify([m for m, _ in scored], len(scored), "recommend", relevance=[sc for _, sc in scored])
+        if local:
+            window = local[(page - 1) * _RECS_PAGE_SIZE: page * _RECS_PAGE_SIZE] if page >= 1 else []
+            metrics.incr("recommend.local")
+            return jsonify({
+                "source": "local",
+                "page": page,
+                "total_pages": math.ceil(len(local) / _RECS_PAGE_SIZE),
+                "total_results": len(local),
+                "results": [
+                    {
+                        "id": i.get("id"),
+                        "title": i.get("title") or "Untitled",
+                        "year": (i.get("release_date") or "")[:4] or None,
+                        "poster_path": i.get("poster_path"),
+                    }
+                    for i in window
+                ],
+            })
+    metrics.incr("recommend.tmdb")
+
     rec = session.get(
         tmdb_url(f"/movie/{mid}/recommendations"),
         params={"page": page, "language": language},
@@ -733,7 +1038,14 @@ def recommend(mid: int):
         )
 
     data = rec.json() or {}
-    items = data.get("results") or []
+    _observe(data.get("results") or [])
+    return jsonify(_recs_payload(data, src, page))
+
+def _recs_payload(data: Dict[str, Any], src: str, page: int, *, rerank: bool = True) -> Dict[str, Any]:
+    """Shape a TMDb recommendations/similar page for /recommend/<mid>."""
+    items = [i for i in (data.get("results") or []) if isinstance(i, dict)]
+    if rerank:
+        items = diversify(items, len(items), "recommend")
     results = [
         {
             "id": i.get("id"),
@@ -744,30 +1056,30 @@ def recommend(mid: int):
         for i in items
         if i.get("poster_path")
     ]
-
-    return jsonify(
-        {
-            "source": src,
-            "page": data.get("page", page),
-            "total_pages": data.get("total_pages", 0),
-            "total_results": data.get("total_results", len(results)),
-            "results": results,
-        }
-    )
+    return {
+        "source": src,
+        "page": data.get("page", page),
+        "total_pages": data.get("total_pages", 0),
+        "total_results": data.get("total_results", len(results)),
+        "results": results,
+    }
 
 # =============================================================================
 # Trending & Popular
 # =============================================================================
 
 @bp.get("/trending")
-@ttl_cache(ttl_seconds=10 * 60, vary=["window", "page", "language"])
+@ttl_cache(ttl_seconds=10 * 60, key=_with_availability({
+    "window": key_enum("day", "week", default="day"), "page": key_int(1), "language": _LANG_KEY, "fields": _fields_key,
+}), ttl_for=_availability_ttl)
 def trending():
     window = (request.args.get("window") or "day").lower()
     if window not in ("day", "week"):
-        return err("bad_request", "window must be 'day' or 'week'", hint="Use ?window=day or ?window=week"), 400
+        return err("bad_request", "window must be 'day' or 'week'", hint="Use ?window=day or ?window=week")
 
     page = request.args.get("page", "1")
     language = request.args.get("language", LANG_DEFAULT)
+    fields = _parse_fields(request.args.get("fields"))
 
     r = session.get(
         tmdb_url(f"/trending/movie/{window}"),
@@ -781,19 +1093,32 @@ def trending():
                    hint=r.text[:200], dependency="tmdb", status=502)
 
     data = r.json() or {}
-    return jsonify({
+    items = data.get("results") or []
+    _observe(items)
+    availability = None
+    if request.args.get("available_on"):
+        items, availability = _available_on(items, _watch_region())
+    # Project before returning so the route cache stores the slim payload too
+    out = {
         "page": data.get("page"),
-        "results": data.get("results") or [],
+        "results": _project(items, fields),
         "total_pages": data.get("total_pages"),
         "total_results": data.get("total_results"),
-    })
+    }
+    if availability:
+        out["available_on"] = availability
+    return jsonify(out)
 
 
 @bp.get("/popular")
-@ttl_cache(ttl_seconds=10 * 60, vary=["page", "language"])
+@prefetch_next()
+@ttl_cache(ttl_seconds=10 * 60, key=_with_availability({
+    "page": key_int(1), "language": _LANG_KEY, "fields": _fields_key,
+}), ttl_for=_availability_ttl)
 def popular():
     page = request.args.get("page", "1")
     language = request.args.get("language", LANG_DEFAULT)
+    fields = _parse_fields(request.args.get("fields"))
 
     r = session.get(
         tmdb_url("/movie/popular"),
@@ -807,51 +1132,203 @@ def popular():
                    hint=r.text[:200], dependency="tmdb", status=502)
 
     data = r.json() or {}
-    return jsonify({
+    items = data.get("results") or []
+    _observe(items)
+    availability = None
+    if request.args.get("available_on"):
+        items, availability = _available_on(items, _watch_region())
+    # Project before returning so the route cache stores the slim payload too
+    out = {
         "page": data.get("page"),
-        "results": data.get("results") or [],
+        "results": _project(items, fields),
         "total_pages": data.get("total_pages"),
         "total_results": data.get("total_results"),
-    })
+    }
+    if availability:
+        out["available_on"] = availability
+    return jsonify(out)
+
+
+# =============================================================================
+# Home feed (one response for the whole landing page)
+# =============================================================================
+
+HOME_DEADLINE = float(os.getenv("HOME_DEADLINE", "2.5"))  # seconds; slower sections are left out
+HOME_MOODS = [m.strip() for m in os.getenv("HOME_MOODS", "happy,thriller,animated").split(",") if m.strip()]
+HOME_WORKERS = int(os.getenv("HOME_WORKERS", "16"))
+_HOME_HERO_SIZE = 10
+# Sections (mood rows run their own strategies on the shared pool) get their own threads
+_home_pool = ThreadPoolExecutor(max_workers=HOME_WORKERS, thread_name_prefix="home")
+
+def _render_section(app, view, path: str, args: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    """Run a cached list view in a synthetic request; its route cache is shared with real calls."""
+    with app.test_request_context(path, query_string=args):
+        rv = view()
+    body, status = (rv[0], rv[1]) if isinstance(rv, tuple) else (rv, getattr(rv, "status_code", 200))
+    if status >= 400:
+        return None
+    payload = body.get_json(silent=True) if hasattr(body, "get_json") else body
+    return payload if isinstance(payload, dict) else None
+
+@bp.get("/home")
+@ttl_cache(ttl_seconds=5 * 60, key={"language": _LANG_KEY, "region": key_str(REGION_DEFAULT, upper=True)})
+def home():
+    """
+    Hero carousel, trending day/week, popular and HOME_MOODS rows. Sections already
+    in the route cache are served inline; the rest are fetched concurrently until
+    HOME_DEADLINE. Late sections keep running and land in their own caches, and a
+    partial feed is returned uncached (with "missing") so the next load completes.
+    """
+    language = request.args.get("language", LANG_DEFAULT)
+    try:
+        region = validate_region(request.args.get("region"), REGION_DEFAULT)
+    except ValueError as e:
+        return err("bad_request", str(e), hint=_REGION_HINT)
+
+    specs: Dict[str, Tuple[Any, str, Dict[str, str]]] = {
+        "trending_day": (trending, "/api/trending", {"window": "day", "language": language}),
+        "trending_week": (trending, "/api/trending", {"window": "week", "language": language}),
+        "popular": (popular, "/api/popular", {"language": language}),
+    }
+    for mood in HOME_MOODS:
+        specs[f"mood:{mood}"] = (recommend_mood, "/api/recommend/mood",
+                                 {"mood": mood, "region": region, "language": language})
+
+    t0 = time.perf_counter()
+    app = current_app._get_current_object()
+    payloads: Dict[str, Optional[Dict[str, Any]]] = {}
+    futures = {}
+    for name, (view, path, args) in specs.items():
+        with app.test_request_context(path, query_string=args):
+            fresh = view.is_fresh()
+        if fresh:
+            payloads[name] = _render_section(app, view, path, args)
+            metrics.incr("home.section.cached")
+        else:
+            futures[name] = submit_to(_home_pool, _render_section, app, view, path, args)
+            metrics.incr("home.section.fetched")
+
+    # Sections run under the request deadline; we stop waiting at HOME_DEADLINE
+    wait_until = t0 + min(HOME_DEADLINE, deadline.remaining() or HOME_DEADLINE)
+    missing: List[str] = []
+    for name, fut in futures.items():
+        try:
+            payloads[name] = fut.result(timeout=max(0.0, wait_until - time.perf_counter()))
+        except Exception:
+            missing.append(name)  # timed out (still running) or failed
+    missing += [n for n, p in payloads.items() if p is None and n not in missing]
+    metrics.observe("home.build", time.perf_counter() - t0)
+
+    def rows(name: str) -> List[Dict[str, Any]]:
+        return list((payloads.get(name) or {}).get("results") or [])
+
+    out = {
+        "hero": rows("trending_day")[:_HOME_HERO_SIZE],
+        "trending_day": rows("trending_day"),
+        "trending_week": rows("trending_week"),
+        "popular": rows("popular"),
+        "moods": [{"mood": m, "results": rows(f"mood:{m}")} for m in HOME_MOODS if payloads.get(f"mood:{m}")],
+        "region": region,
+        "partial": bool(missing),
+        "missing": missing,
+    }
+    resp = jsonify(out)
+    if missing:
+        metrics.incr("home.partial")
+        resp.headers["Cache-Control"] = "no-store"
+    return resp
 
 
 # =============================================================================
 # Providers
 # =============================================================================
 
+PROVIDERS_BATCH_MAX = int(os.getenv("PROVIDERS_BATCH_MAX", "60"))
+_REGION_HINT = "Try: US, GB, DE, FR, IN, JP, BR, CA, AU, ES, IT, MX, NL, SE"
+
+@cached("tmdb_watch_providers", ttl=6 * 3600, tags=lambda mid, *a, **kw: [f"movie:{mid}"])
+def _tmdb_watch_providers(mid: int) -> Dict[str, Any]:
+    """
+    Raw /movie/{id}/watch/providers document (every region), fetched once per movie.
+    Raises ApiError on upstream failure so errors are never cached.
+    """
+    r = session.get(tmdb_url(f"/movie/{mid}/watch/providers"), timeout=10)
+    if r.status_code >= 500:
+        raise ApiError("bad_gateway", "TMDb error", dependency="tmdb", status=502)
+    if not r.ok:
+        raise ApiError("bad_gateway", f"TMDb request failed ({r.status_code})", dependency="tmdb", status=502)
+    data = r.json() or {}
+    provider_index.ingest(mid, data)
+    return data
+
 @bp.get("/providers/<int:mid>")
-@ttl_cache(ttl_seconds=6 * 3600, vary=["mid", "region"])
+@ttl_cache(ttl_seconds=6 * 3600, key={"mid": key_int(), "region": key_str(REGION_DEFAULT, upper=True)})
 def providers(mid: int):
     try:
         region = validate_region(request.args.get("region"), REGION_DEFAULT)
     except ValueError as e:
-        return err(
-            "bad_request",
-            str(e),
-            hint="Try: US, GB, DE, FR, IN, JP, BR, CA, AU, ES, IT, MX, NL, SE",
-        )
+        return err("bad_request", str(e), hint=_REGION_HINT)
 
-    r = session.get(tmdb_url(f"/movie/{mid}/watch/providers"))
-    if r.status_code >= 500:
-        return err("bad_gateway", "TMDb error", dependency="tmdb", status=502)
-    if not r.ok:
-        return err("bad_gateway", "TMDb request failed", dependency="tmdb", status=502)
+    try:
+        raw = _tmdb_watch_providers(mid)
+    except ApiError as e:
+        return e.to_response()
+    return jsonify({"id": mid, "region": region, **normalize_providers(raw, region)})
 
-    norm = normalize_providers(r.json(), region)
-    raw_loc = (r.json() or {}).get("results", {}).get(region) or {}
-    link = raw_loc.get("link")
-    return jsonify({"id": mid, "region": region, "link": link, **norm})
+@bp.get("/providers/batch")
+def providers_batch():
+    """
+    Providers for many movies in one call (poster grids with provider chips).
+    ?ids=1,2,3&region=GB -> {"region", "results": {id: {stream, rent, buy, link}}, "failed": [ids]}
+    """
+    try:
+        region = validate_region(request.args.get("region"), REGION_DEFAULT)
+    except ValueError as e:
+        return err("bad_request", str(e), hint=_REGION_HINT)
+    ids: List[int] = []
+    for tok in _csv(request.args.get("ids")):
+        if not tok.isdigit():
+            return err("bad_request", f"Invalid movie id: {tok!r}", hint="Use ?ids=603,27205")
+        if int(tok) not in ids:
+            ids.append(int(tok))
+    if not ids:
+        return err("bad_request", "Missing 'ids' query parameter", hint="Use ?ids=603,27205")
+    if len(ids) > PROVIDERS_BATCH_MAX:
+        return err("bad_request", f"At most {PROVIDERS_BATCH_MAX} ids per call")
+
+    futures = [(mid, submit(_tmdb_watch_providers, mid)) for mid in ids]
+    results: Dict[str, Any] = {}
+    failed: List[int] = []
+    for mid, fut in futures:
+        try:
+            results[str(mid)] = normalize_providers(fut.result(timeout=15), region)
+        except Exception:
+            failed.append(mid)
+    metrics.incr("providers_batch.ids", len(ids))
+    if failed:
+        metrics.incr("providers_batch.failed", len(failed))
+    return jsonify({"region": region, "results": results, "failed": failed})
 
 
 # =============================================================================
 # Mood discover
 # =============================================================================
 
+# Strategies, in priority order: region-aware -> global -> no vote floor
+_MOOD_STRATEGY_NAMES = ("regional", "global", "relaxed")
+MOOD_STRATEGY_TIMEOUT = float(os.getenv("MOOD_STRATEGY_TIMEOUT", "6"))  # seconds, whole race
+# 0 = fire all strategies at once; >0 = hedge the fallbacks after this many seconds
+MOOD_STRATEGY_HEDGE_DELAY = float(os.getenv("MOOD_STRATEGY_HEDGE_MS", "0")) / 1000.0
+
 @bp.get("/recommend/mood")
-@ttl_cache(ttl_seconds=15 * 60, vary=["mood", "page", "region", "language"])
+@prefetch_next()
+@ttl_cache(ttl_seconds=15 * 60, key=_with_availability({
+    "mood": _mood_key, "page": key_int(1), "region": key_str(REGION_DEFAULT, upper=True),
+    "language": _LANG_KEY, "page_size": key_int(20, lo=1, hi=100),
+}, region_params=("region",)), ttl_for=_availability_ttl)
 def recommend_mood():
     mood = request.args.get("mood")
-    language = request.args.get("language", LANG_DEFAULT)
+    language = _LANG_KEY(request.args.get("language"))  # as the cache key and the pools spell it
     try:
         page = int(request.args.get("page", 1))
     except ValueError:
@@ -869,6 +1346,30 @@ def recommend_mood():
     except ValueError as e:
         return err("bad_request", str(e), hint="Pass a valid ISO-3166-1 alpha-2 region")
 
+    # Hot path: slice the precomputed pool (no upstream calls, any page size)
+    pool = get_pool(canon, region, language)
+    if pool is not None:
+        page_size = _int_or_none(request.args.get("page_size"), lo=1, hi=100) or 20
+        # Filter the whole pool before paging so pages stay full
+        items, availability = _available_on(pool.items, region)
+        if availability:
+            pool = MoodPool(items, pool.built_at)
+        sliced = pool.page(max(1, page), page_size)
+        metrics.incr("recommend_mood.strategy.pool")
+        out = {
+            "mood": canon,
+            "region": region,
+            **sliced,
+            "results": [
+                {k: it.get(k) for k in ("id", "title", "year", "poster_path", "genre_ids")}
+                for it in sliced["results"]
+            ],
+            "strategy": "pool",
+        }
+        if availability:
+            out["available_on"] = availability
+        return jsonify(out)
+
     boost = rule.get("boostGenres", []) or []
     with_genres = ",".join(map(str, boost)) if boost else None
     strategies = []
@@ -904,23 +1405,35 @@ def recommend_mood():
         p3["with_genres"] = with_genres
     strategies.append(p3)
 
-    data = None
-    used_params = None
-    for params in strategies:
-        r = session.get(tmdb_url("/discover/movie"), params=params)
-        if r.status_code >= 500:
-            return err("bad_gateway", "TMDb error", dependency="tmdb", status=502)
-        if not r.ok:
-            continue
-        candidate = r.json() or {}
-        items = candidate.get("results") or []
-        items = [it for it in items if it.get("poster_path")]
-        if items:
-            data = candidate
-            used_params = params
-            break
+    # Fire the strategies speculatively; highest-priority one with posters wins
+    outcomes: Dict[int, Any] = {}
+
+    def _attempt(idx: int, params: Dict[str, Any]):
+        def run():
+            r = session.get(tmdb_url("/discover/movie"), params=params, timeout=MOOD_STRATEGY_TIMEOUT)
+            outcomes[idx] = r
+            if not r.ok:
+                return None
+            candidate = r.json() or {}
+            if any(it.get("poster_path") for it in (candidate.get("results") or [])):
+                return candidate
+            return None
+        return run
+
+    t0 = time.perf_counter()
+    winner, data = run_strategies(
+        [_attempt(i, p) for i, p in enumerate(strategies)],
+        timeout=MOOD_STRATEGY_TIMEOUT,
+        hedge_delay=MOOD_STRATEGY_HEDGE_DELAY,
+    )
+    metrics.observe("recommend_mood.strategies", time.perf_counter() - t0)
+
     if data is None:
-        r = session.get(tmdb_url("/discover/movie"), params=strategies[0])
+        # No strategy had posters: reuse the primary strategy's answer instead of re-issuing it
+        r = outcomes.get(0)
+        if r is None:
+            metrics.incr("recommend_mood.strategy.timeout")
+            return err("gateway_timeout", "TMDb did not answer in time", dependency="tmdb", status=504)
         if r.status_code >= 500:
             return err("bad_gateway", "TMDb error", dependency="tmdb", status=502)
         if not r.ok:
@@ -932,8 +1445,13 @@ def recommend_mood():
                 status=502,
             )
         data = r.json() or {}
+    strategy = _MOOD_STRATEGY_NAMES[winner] if winner is not None else "none"
+    metrics.incr(f"recommend_mood.strategy.{strategy}")
 
     raw = data.get("results") or []
+    _observe(raw)
+    raw = diversify([it for it in raw if isinstance(it, dict)], len(raw), "mood")
+    raw, availability = _available_on(raw, region)
     results = [
         {
             "id": it.get("id"),
@@ -953,15 +1471,106 @@ def recommend_mood():
         "total_pages": data.get("total_pages", 0),
         "total_results": data.get("total_results", len(results)),
         "results": results,
-        # "debug_used_params": used_params,  # optional for dev
+        "strategy": strategy,
+        **({"available_on": availability} if availability else {}),
     })
 
 
+# =============================================================================
+# Ratings & personal recommendations
+# =============================================================================
+
+def _user_key(body: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    raw = (body or {}).get("user_id") or request.args.get("user_id") or request.headers.get("X-User-Id")
+    key = str(raw or "").strip()
+    return key if key and len(key) <= 64 else None
+
+@bp.post("/ratings")
+def ingest_ratings():
+    """
+    Body: {"user_id": "...", "movie_id": 603, "rating": 4}
+       or {"user_id": "...", "ratings": [{"movie_id": 603, "rating": 4}, ...]}
+    rating 1..5; 0 removes the rating.
+    """
+    body = request.get_json(silent=True) or {}
+    user = _user_key(body)
+    if not user:
+        return err("bad_request", "Missing 'user_id'", hint="Send user_id in the body or X-User-Id header")
+    items = body.get("ratings") if isinstance(body.get("ratings"), list) else [body]
+    if len(items) > 500:
+        return err("bad_request", "Too many ratings in one request", hint="Send at most 500 per call")
+    valid: List[Tuple[int, int]] = []
+    for it in items:
+        if not isinstance(it, dict):
+            continue
+        mid = _int_or_none(it.get("movie_id"))
+        rating = _int_or_none(it.get("rating"))
+        if not mid or mid <= 0 or rating is None:
+            continue
+        if not 0 <= rating <= 5:  # never clamp: 7 is not a 5, and -1 is not a delete
+            return err("bad_request", f"Rating out of range for movie {mid}: {rating}",
+                       hint="Use 1..5, or 0 to remove a rating")
+        valid.append((mid, rating))
+    if not valid:
+        return err("bad_request", "No valid ratings", hint="Each rating needs movie_id and rating 0..5")
+    for mid, rating in valid:
+        ratings_service.store.upsert(user, mid, rating)
+    accepted = len(valid)
+    metrics.incr("ratings.ingested", accepted)
+    return jsonify({"user_id": user, "accepted": accepted}), 200
+
+@bp.get("/ratings")
+def list_ratings():
+    user = _user_key()
+    if not user:
+        return err("bad_request", "Missing 'user_id'", hint="Add ?user_id=... or X-User-Id header")
+    rows = ratings_service.store.user_ratings(user)
+    return jsonify({
+        "user_id": user,
+        "results": [{"movie_id": mid, "rating": r} for mid, r in rows],
+    })
+
+@bp.get("/recommend/personal")
+def recommend_personal():
+    user = _user_key()
+    if not user:
+        return err("bad_request", "Missing 'user_id'", hint="Add ?user_id=... or X-User-Id header")
+    k = _int_or_none(request.args.get("k"), lo=1, hi=100) or 20
+    t0 = time.perf_counter()
+    source, scored = ratings_service.recommend_for_user(user, k)
+    metrics.observe("recommend_personal.query", time.perf_counter() - t0)
+    if source == "none":
+        return err("not_found", "No personal model for this user yet",
+                   hint="Rate a few movies, then retry after the next training run", status=404)
+    results = []
+    for mid, score in scored:
+        meta = content_engine.meta_of(mid) or {}
+        results.append({
+            "id": mid,
+            "title": meta.get("title"),
+            "year": (meta.get("release_date") or "")[:4] or None,
+            "poster_path": meta.get("poster_path"),
+            "score": round(score, 4),
+        })
+    return jsonify({"user_id": user, "source": source, "results": results})
+
+
 # =============================================================================
 # Mood analyze (LLM → TMDB enrichment + variety + domain filtering)
 # =============================================================================
 
+# WSGI environ flag carrying the job id when analyze_mood runs as a background job
+JOB_ENVIRON = "movies.job_id"
+
+def _job_stage(stage: str) -> None:
+    """Report pipeline progress when running as a job (no-op for direct calls)."""
+    job_id = request.environ.get(JOB_ENVIRON)
+    if job_id:
+        mood_jobs.stage(job_id, stage)
+
+
 @bp.route("/mood/analyze", methods=["POST"])
+@deadline_budget(MOOD_ANALYZE_DEADLINE)
 def analyze_mood():
     trace_id = str(uuid4())[:8]
     data = request.get_json(silent=True) or {}
@@ -974,7 +1583,8 @@ def analyze_mood():
             hint="Provide a 'text' field with your input",
             status=400
         )
-    llama_client = LlamaClient()
+    # Background jobs queue behind interactive callers for LLM slots
+    llama_client = LlamaClient(PRIORITY_BACKGROUND if request.environ.get(JOB_ENVIRON) else PRIORITY_INTERACTIVE)
     system_prompt = (
         "You are a movie recommendation assistant. Reply ONLY with JSON, no preface:\n"
         '{\n'
@@ -986,14 +1596,31 @@ def analyze_mood():
     )
     try:
         # 1) Call LLM and normalize content
-        llm_raw = llama_client.analyze_mood_with_system_prompt(system_prompt, text)
-        if isinstance(llm_raw, dict):
+        _job_stage("llm")
+        prefetched: Dict[Tuple[str, Any], Any] = {}
+        llm_text = ""
+        if LLAMA_STREAM:
             try:
-                print(f"[mood.analyze][trace={trace_id}] llm_raw_shape=dict keys={list(llm_raw.keys())[:6]}")
-            except Exception:
-                pass
-        llm_text = _extract_llm_text(llm_raw)
+                llm_text = _stream_llm_picks(llama_client, system_prompt, text, language, prefetched)
+            except Exception as e:
+                print(f"[mood.analyze][trace={trace_id}] stream failed, retrying unstreamed: {e}")
+                metrics.incr("llm.stream.fallback")
+        if not llm_text:
+            try:
+                llm_raw = llama_client.analyze_mood_with_system_prompt(system_prompt, text)
+            except (BreakerOpen, LLMBusy) as e:
+                # LLM down or saturated: skip it and let the Discover fallback (3f) fill the list
+                print(f"[mood.analyze][trace={trace_id}] {e}")
+                metrics.incr("llm.breaker_fallback")
+                llm_raw = None
+            if isinstance(llm_raw, dict):
+                try:
+                    print(f"[mood.analyze][trace={trace_id}] llm_raw_shape=dict keys={list(llm_raw.keys())[:6]}")
+                except Exception:
+                    pass
+            llm_text = _extract_llm_text(llm_raw) if llm_raw is not None else ""
         print(f"[mood.analyze][trace={trace_id}] llm_text[0:300]={llm_text[:300]!r}")
+        _job_stage("matching")
         # 2) Parse candidates
         reply, candidates = parse_llm_movies(llm_text)
         if not candidates:
@@ -1003,12 +1630,15 @@ def analyze_mood():
         want_music = _detect_music_profile(text)
         base_matches: List[Dict[str, Any]] = []
         seen_ids = set()
+        # Relevance for the MMR stage: LLM order for direct picks, decayed for expansions
+        relevance: Dict[int, float] = {}
         # 3a) Exact title matches (up to ~6)
         for c in candidates:
             title = (c.get("title") or "").strip()
             if not title or not is_plausible_title(title):
                 continue
-            m = _tmdb_search_movie_single(title, c.get("year"), language=language)
+            fut = prefetched.get((title.lower(), c.get("year")))
+            m = fut.result() if fut is not None else _tmdb_search_movie_single(title, c.get("year"), language=language)
             if not isinstance(m, dict):
                 continue
             mid = m.get("id"); poster = m.get("poster_path")
@@ -1022,19 +1652,22 @@ def analyze_mood():
             if mid in seen_ids:
                 continue
             seen_ids.add(mid)
+            relevance[mid] = 1.0 - 0.05 * len(base_matches)
             base_matches.append(m)
             if len(base_matches) >= 6:
                 break
 
+        _job_stage("expanding")
         # 3b) Expand with recommendations/similar from a few seeds
         pool: List[Dict[str, Any]] = list(base_matches)
         for seed in base_matches[:3]:  # expand around up to 3 seeds
             sid = seed.get("id")
             if not sid:
                 continue
+            seed_rel = relevance.get(sid, 0.7)
             try:
                 recs = _fetch_similar_pool(sid, language=language)
-                for r in recs:
+                for pos, r in enumerate(recs):
                     rid = r.get("id")
                     if not rid or not r.get("poster_path"):
                         continue
@@ -1044,23 +1677,30 @@ def analyze_mood():
                     if rid in seen_ids:
                         continue
                     seen_ids.add(rid)
+                    relevance[rid] = 0.8 * seed_rel * (1.0 - pos / 40.0)
                     pool.append(r)
             except Exception:
                 pass
 
+        _job_stage("ranking")
         # 3c) Filter out things we served very recently; keep reserve if emptying
         def _id_of(x):
             try:
                 return int(x.get("id"))
             except Exception:
                 return None
-        fresh_pool = [p for p in pool if (_id_of(p) is not None and not _recent_seen(_id_of(p)))]
+        scope = _recency_scope(data)
+        fresh_ids = recency.fresh(scope, [i for i in (_id_of(p) for p in pool) if i is not None])
+        fresh_pool = [p for p in pool if _id_of(p) in fresh_ids]
         if len(fresh_pool) < 10:
             fresh_pool = pool  # fallback if filtering was too strict
 
-        # 3d) Shuffle per-request for variety
-        rng = random.Random(time.time_ns())
-        rng.shuffle(fresh_pool)
+        # 3d) Diversity re-rank (MMR) instead of a random shuffle: keeps the best
+        #     LLM matches while spreading picks across genres/eras
+        fresh_pool = diversify(
+            fresh_pool, len(fresh_pool), "analyze",
+            relevance=[relevance.get(_id_of(p), 0.0) for p in fresh_pool],
+        )
 
         # 3e) Keep the first 10, convert to frontend shape, final de-dup by id
         chosen: List[Dict[str, Any]] = []
@@ -1096,7 +1736,7 @@ def analyze_mood():
                     items = [it for it in items if it.get("poster_path")]
                     if want_music:
                         items = [it for it in items if (_MUSIC_GENRE_ID in (it.get("genre_ids") or [])) or _looks_musicy(it)]
-                    rng.shuffle(items)
+                    items = diversify(items, len(items), "analyze")
                     for it in items:
                         obj = safe_to_movie_obj(it)
                         if not obj:
@@ -1130,6 +1770,7 @@ def analyze_mood():
                         if len(chosen) >= 5:
                             break
         if not chosen:
+            deadline.check("mood analysis")  # empty because time ran out, not for lack of matches
             return err(
                 "tmdb_no_match",
                 "Could not match movie candidates in TMDB",
@@ -1138,12 +1779,14 @@ def analyze_mood():
                 status=502
             )
         # Remember what we just served to avoid repeats next time
-        _recent_mark([m_id for m_id in chosen_ids])
+        recency.mark(scope, chosen_ids)
         return jsonify({
             "reply": reply or "Here are some picks that match your vibe.",
             "language": language,
             "movies": chosen
         })
+    except DeadlineExceeded:
+        raise  # out of time: 504 via the error handlers, not the generic fallback
     except Exception as e:
         try:
             print(f"[mood.analyze][trace={trace_id}] EXCEPTION: {e}")
@@ -1163,3 +1806,83 @@ def analyze_mood():
             "trace_id": trace_id,
             "movies": fallback_movies
         }), 500
+
+
+# -----------------------------------------------------------------------------
+# Mood analyze as a job: POST returns at once, GET polls progress/result
+# -----------------------------------------------------------------------------
+# The same pipeline runs on a bounded job pool (core.jobs) instead of holding a
+# WSGI worker for 5-15s. Identical prompts (normalized text + language) share
+# one in-flight job, and finished results are reused for JOB_RESULT_TTL. The
+# key includes the recency scope: picks skip what that user was served recently
+# and are marked as served for them, so another user must not join or reuse them.
+mood_jobs = JobRunner("mood_analyze", JobStore())
+metrics.register_gauge("jobs.mood_analyze.pending", mood_jobs.pending)
+
+def _prompt_key(text: str, language: str, scope: str) -> str:
+    norm = " ".join(text.casefold().split())
+    return hashlib.sha1(f"{scope}|{language}|{norm}".encode("utf-8")).hexdigest()
+
+def _run_analyze_job(app, body: Dict[str, Any], headers: Dict[str, str], remote_addr: Optional[str],
+                     job_id: str) -> Tuple[Dict[str, Any], int]:
+    environ = {JOB_ENVIRON: job_id, "REMOTE_ADDR": remote_addr or ""}
+    with app.test_request_context("/api/mood/analyze", method="POST", json=body, headers=headers,
+                                  environ_overrides=environ), \
+            deadline.scope(deadline.budget_for(analyze_mood)):
+        rv = analyze_mood()
+    resp, status = (rv[0], rv[1]) if isinstance(rv, tuple) else (rv, rv.status_code)
+    return resp.get_json(silent=True) or {}, status
+
+def _job_view(job: Dict[str, Any]) -> Dict[str, Any]:
+    out = {
+        "job_id": job["id"],
+        "status": job["status"],
+        "stage": job.get("stage"),
+        "poll": f"/api/mood/analyze/jobs/{job['id']}",
+    }
+    if job["status"] in (DONE, FAILED):
+        out["result"] = job.get("result")
+        out["result_status"] = job.get("result_status")
+        if job.get("error"):
+            out["error"] = job["error"]
+    return out
+
+@bp.post("/mood/analyze/jobs")
+def submit_analyze_job():
+    data = request.get_json(silent=True) or {}
+    text = (data.get("text") or "").strip()
+    language = data.get("language", LANG_DEFAULT)
+    if not text:
+        return err(
+            "bad_request",
+            "Text is required for mood analysis",
+            hint="Provide a 'text' field with your input",
+            status=400
+        )
+    # Only what the pipeline reads from the request (recency scope)
+    headers = {h: request.headers[h] for h in ("X-Session-Id", "X-User-Id") if h in request.headers}
+    body = {k: data[k] for k in ("text", "language", "session_id", "user_id") if k in data}
+    run = partial(_run_analyze_job, current_app._get_current_object(), body, headers, request.remote_addr)
+    try:
+        job, how = mood_jobs.submit(_prompt_key(text, language, _recency_scope(data)), run)
+    except JobQueueFull:
+        resp, status = err(
+            "busy",
+            "Too many mood analyses in progress",
+            hint="Retry in a few seconds",
+            dependency="llama",
+            status=503,
+        )
+        resp.headers["Retry-After"] = "5"
+        return resp, status
+    out = _job_view(job)
+    out["source"] = how
+    return jsonify(out), (200 if job["status"] in (DONE, FAILED) else 202)
+
+@bp.get("/mood/analyze/jobs/<job_id>")
+@rate_limit_exempt
+def get_analyze_job(job_id: str):
+    job = mood_jobs.store.get(job_id)
+    if job is None:
+        return err("not_found", "Unknown or expired job", hint="Submit the prompt again", status=404)
+    return jsonify(_job_view(job))
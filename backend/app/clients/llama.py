@@ -2,20 +2,20 @@ import os
 import requests
 import json
 from time import sleep
+from ..core import deadline
+from ..core.breaker import BreakerOpen, breaker, is_failure
+from .llm_scheduler import LLMBusy, PRIORITY_INTERACTIVE, account_usage, scheduler
 
 class LlamaClient:
-    def __init__(self):
+    def __init__(self, priority=PRIORITY_INTERACTIVE):
         # Initialize the Llama client with environment variables
         self.api_url = os.getenv('LLAMA_API_URL')  # Llama API URL from environment variable
         self.api_key = os.getenv('LLAMA_API_KEY')  # OpenRouter API key from environment variable
         self.retry_count = int(os.getenv('LLAMA_RETRY_COUNT', 3))  # Number of retries in case of failure
         self.timeout = int(os.getenv('LLAMA_TIMEOUT', 10))  # Timeout for each request
+        self.priority = priority  # scheduler queue priority (lower goes first)
 
-    def analyze_mood_with_system_prompt(self, system_prompt, text):
-        """
-        Sends a request to Llama to analyze the mood, with a predefined system prompt.
-        This method ensures that the conversation is focused on movie recommendations.
-        """
+    def _build_request(self, system_prompt, text):
         headers = {
             'Authorization': f'Bearer {self.api_key}',  # Authentication header with API key
             'Content-Type': 'application/json',  # Setting the content type to JSON
@@ -35,16 +35,91 @@ class LlamaClient:
             'model': 'meta-llama/llama-3.1-8b-instruct',  # The model to use (Llama 3.1 8b Instruct)
             'messages': messages  # Add system prompt and user input to the conversation
         }
+        return headers, data
+
+    def analyze_mood_with_system_prompt(self, system_prompt, text):
+        """
+        Sends a request to Llama to analyze the mood, with a predefined system prompt.
+        This method ensures that the conversation is focused on movie recommendations.
+        """
+        # Identical prompts already in flight share that call's result
+        return scheduler.coalesce((self.api_url, system_prompt, text),
+                                  lambda: self._analyze(system_prompt, text))
+
+    def _analyze(self, system_prompt, text):
+        headers, data = self._build_request(system_prompt, text)
+        br = breaker('llm')
 
         # Retry logic in case the API call fails
         for attempt in range(self.retry_count):
             try:
+                timeout = deadline.timeout_for(self.timeout, 'llm')  # capped by the request deadline
                 # Make the API call to the Llama model
-                response = requests.post(self.api_url, headers=headers, json=data, timeout=self.timeout)
+                with scheduler.slot(self.priority):  # LLMBusy when no slot frees up in time
+                    # Admitted only once the call will actually run, so a half-open probe is always settled
+                    br.before()  # fail fast (BreakerOpen) while the endpoint keeps failing
+                    try:
+                        response = requests.post(self.api_url, headers=headers, json=data, timeout=timeout)
+                    except BaseException:
+                        self._settle_failed(br, timeout)
+                        raise
+                br.record(not is_failure(response.status_code))
                 response.raise_for_status()  # Raise an exception for HTTP errors (4xx, 5xx)
-                return response.json()  # Return the successful response from Llama
+                body = response.json()  # Return the successful response from Llama
+                account_usage(body)
+                return body
+            except (BreakerOpen, LLMBusy, deadline.DeadlineExceeded):
+                raise  # no point sleeping and retrying into an open breaker / full queue / spent budget
             except requests.exceptions.RequestException as e:
-                if attempt < self.retry_count - 1:
+                # Retry only if the pause plus another full attempt fits the deadline
+                if attempt < self.retry_count - 1 and deadline.allows(2 + timeout):
                     sleep(2)  # Wait before retrying
                     continue
                 raise e  # Raise the error if all retry attempts fail
+
+    def stream_mood_with_system_prompt(self, system_prompt, text):
+        """
+        Same request with stream=True. Yields content deltas as they arrive
+        (OpenAI-compatible server-sent events). No retries: a partially consumed
+        stream cannot be replayed, so callers fall back to the unstreamed call.
+        """
+        headers, data = self._build_request(system_prompt, text)
+        data['stream'] = True
+        br = breaker('llm')
+        timeout = deadline.timeout_for(self.timeout, 'llm stream')
+        with scheduler.slot(self.priority):  # held until the stream is fully read
+            br.before()
+            try:
+                response = requests.post(self.api_url, headers=headers, json=data, timeout=timeout, stream=True)
+            except BaseException:
+                self._settle_failed(br, timeout)
+                raise
+            br.record(not is_failure(response.status_code))
+            yield from self._iter_deltas(response)
+
+    def _settle_failed(self, br, timeout):
+        """Settle the breaker for a call that raised; a deadline-shortened attempt is no verdict on the LLM."""
+        if deadline.cut_short(self.timeout, timeout):
+            br.cancel_probe()
+        else:
+            br.record(False)
+
+    @staticmethod
+    def _iter_deltas(response):
+        with response:
+            response.raise_for_status()
+            for line in response.iter_lines(decode_unicode=True):
+                deadline.check('llm stream')  # the read timeout is per chunk, not per reply
+                if not line or not line.startswith('data:'):
+                    continue  # keep-alives / comments
+                payload = line[5:].strip()
+                if payload == '[DONE]':
+                    break
+                try:
+                    chunk = json.loads(payload)
+                except ValueError:
+                    continue
+                choices = chunk.get('choices') or [{}]
+                delta = (choices[0].get('delta') or {}).get('content')
+                if delta:
+                    yield delta
@@ -0,0 +1,155 @@
+from __future__ import annotations
+import heapq
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+import requests
+
+from ..core import deadline, metrics
+
+# ---------------------------
+# LLM call scheduler
+# ---------------------------
+# Every LlamaClient attempt needs one of LLM_MAX_CONCURRENT slots. When all are
+# busy, callers wait in a bounded priority queue (lower number first, FIFO
+# within a priority) for at most LLM_QUEUE_SLO seconds or what is left of the
+# request deadline, whichever is shorter; a full queue or a missed SLO raises
+# LLMBusy right away instead of piling more load on the provider. Identical
+# (system prompt, text) calls made while one is already running share its result.
+LLM_MAX_CONCURRENT = int(os.getenv("LLM_MAX_CONCURRENT", "4"))
+LLM_QUEUE_MAX = int(os.getenv("LLM_QUEUE_MAX", "32"))
+LLM_QUEUE_SLO = float(os.getenv("LLM_QUEUE_SLO", "5"))  # seconds a call may wait for a slot
+
+# Priorities: interactive requests go ahead of background jobs
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+
+class LLMBusy(requests.exceptions.ConnectionError):
+    """No LLM slot within the queue SLO (or the queue is full)."""
+
+
+class _Waiter:
+    __slots__ = ("event", "granted", "cancelled")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.granted = False
+        self.cancelled = False
+
+
+class LLMScheduler:
+    def __init__(self, max_concurrent: int = LLM_MAX_CONCURRENT, queue_max: int = LLM_QUEUE_MAX,
+                 queue_slo: float = LLM_QUEUE_SLO):
+        self.max_concurrent = max_concurrent
+        self.queue_max = queue_max
+        self.queue_slo = queue_slo
+        self._lock = threading.Lock()
+        self._active = 0
+        self._queued = 0
+        self._heap: List[Tuple[int, int, _Waiter]] = []  # cancelled waiters are skipped lazily
+        self._seq = itertools.count()
+        self._inflight: Dict[Any, Future] = {}
+
+    # ---------- slots
+    def _acquire(self, priority: int) -> float:
+        """Take a slot (waiting in the queue if needed); returns seconds waited."""
+        with self._lock:
+            if self._active < self.max_concurrent and not self._queued:
+                self._active += 1
+                return 0.0
+            if self._queued >= self.queue_max:
+                metrics.incr("llm.queue.rejected")
+                raise LLMBusy(f"LLM queue full ({self._queued} waiting)")
+            w = _Waiter()
+            heapq.heappush(self._heap, (priority, next(self._seq), w))
+            self._queued += 1
+        t0 = time.monotonic()
+        wait = self.queue_slo
+        left = deadline.remaining()
+        if left is not None:
+            wait = max(0.0, min(wait, left))
+        if not w.event.wait(wait):
+            with self._lock:
+                if not w.granted:
+                    w.cancelled = True
+                    self._queued -= 1
+                    metrics.incr("llm.queue.timeout")
+                    raise LLMBusy(f"no LLM slot within {wait:.1f}s")
+        return time.monotonic() - t0
+
+    def _release(self) -> None:
+        with self._lock:
+            while self._heap:
+                _, _, w = heapq.heappop(self._heap)
+                if w.cancelled:
+                    continue
+                # Hand the slot straight to the next waiter (active count unchanged)
+                w.granted = True
+                self._queued -= 1
+                w.event.set()
+                return
+            self._active -= 1
+
+    @contextmanager
+    def slot(self, priority: int = PRIORITY_INTERACTIVE) -> Iterator[None]:
+        """Hold one LLM slot for the duration of a call."""
+        waited = self._acquire(priority)
+        metrics.observe("llm.queue_wait", waited)
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            metrics.observe("llm.call", time.perf_counter() - t0)
+            self._release()
+
+    # ---------- coalescing
+    def coalesce(self, key: Any, fn: Callable[[], Any]) -> Any:
+        """Run fn once for concurrent callers with the same key; all get its result."""
+        with self._lock:
+            fut = self._inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._inflight[key] = Future()
+        if not leader:
+            metrics.incr("llm.coalesced")
+            try:
+                return fut.result(timeout=deadline.remaining())
+            except FutureTimeout:
+                raise deadline.DeadlineExceeded("deadline exceeded waiting for a coalesced LLM call")
+        try:
+            value = fn()
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"active": self._active, "queued": self._queued, "max_concurrent": self.max_concurrent,
+                    "coalescing": len(self._inflight)}
+
+
+def account_usage(response: Any) -> None:
+    """Token counters from an OpenAI-compatible `usage` block (when the provider sends one)."""
+    usage = response.get("usage") if isinstance(response, dict) else None
+    if not isinstance(usage, dict):
+        return
+    for field in ("prompt_tokens", "completion_tokens"):
+        n = usage.get(field)
+        if isinstance(n, int):
+            metrics.incr(f"llm.tokens.{field.split('_')[0]}", n)
+
+
+scheduler = LLMScheduler()
+metrics.register_gauge("llm.scheduler", scheduler.stats)
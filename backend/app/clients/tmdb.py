@@ -1,11 +1,18 @@
 from __future__ import annotations
+import contextvars
 import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, TimeoutError as FutureTimeout, wait
 from dataclasses import dataclass
 from typing import Any, Dict, Optional, Tuple, List
 from requests import Session
 from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 from ..core.cache import cached
+from ..core.ratelimit import tmdb_budget
+from ..core.breaker import breaker, is_failure, path_family
+from ..core import deadline, hedge, metrics
+from ..core.deadline import DeadlineRetry
 
 DEFAULT_TIMEOUT = int(os.getenv("TMDB_TIMEOUT", "8"))  # seconds
 DEFAULT_LANGUAGE = os.getenv("DEFAULT_LANGUAGE", "en-US")
@@ -19,9 +26,101 @@ def tmdb_url(path: str) -> str:
         path = "/" + path
     return f"{_tmdb_base()}{path}"
 
+# Hedge legs need their own threads: callers may already run on the shared pool
+_hedge_pool = ThreadPoolExecutor(max_workers=hedge.TMDB_HEDGE_WORKERS, thread_name_prefix="tmdb-hedge")
+# Primaries of hedgeable GETs run on a bounded pool of their own. The semaphore
+# matches its size, so a primary never queues there: once every slot is busy
+# the call is simply made unhedged on the caller's thread.
+_primary_pool = ThreadPoolExecutor(max_workers=hedge.TMDB_HEDGE_PRIMARY_WORKERS, thread_name_prefix="tmdb-primary")
+_primary_slots = threading.BoundedSemaphore(hedge.TMDB_HEDGE_PRIMARY_WORKERS)
+
+def _close_loser(fut) -> None:
+    if not fut.cancelled() and fut.exception() is None:
+        fut.result().close()
+
+def _answered(fut) -> bool:
+    """A hedge leg that got a usable response (5xx/429 come back as responses, not errors)."""
+    return fut.exception() is None and not is_failure(getattr(fut.result(), "status_code", None))
+
+def _start_primary(fn, *args, **kwargs) -> Optional[Future]:
+    """
+    Start the primary attempt on the primary pool, so the caller can still take
+    a faster hedge leg while it is in flight. None when every primary slot is
+    busy: the caller then runs the call inline, without a hedge.
+    """
+    if not _primary_slots.acquire(blocking=False):
+        metrics.incr("tmdb.hedge.primary_busy")
+        return None
+    try:
+        fut = _primary_pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+    except BaseException:
+        _primary_slots.release()
+        raise
+    fut.add_done_callback(lambda _f: _primary_slots.release())
+    return fut
+
+class GuardedSession(Session):
+    """
+    Session whose calls go through a circuit breaker per endpoint family and,
+    when TMDB_HEDGE_ENABLED, hedge slow GETs (see core.hedge).
+    """
+
+    def _send(self, family: str, method, url, *args, **kwargs):
+        # Timeout (and, via DeadlineRetry, retries) fit what is left of the request deadline
+        default = kwargs.get("timeout") or DEFAULT_TIMEOUT
+        kwargs["timeout"] = deadline.timeout_for(default, f"tmdb {family}")
+        br = breaker(f"tmdb:{family}")
+        br.before()  # raises BreakerOpen (a ConnectionError) while the family is failing
+        t0 = time.perf_counter()
+        try:
+            r = super().request(method, url, *args, **kwargs)
+        except BaseException:
+            # Any outcome must settle a half-open probe, but a caller's short
+            # deadline is no verdict on TMDb: give the probe back instead
+            if deadline.cut_short(default, kwargs["timeout"]):
+                br.cancel_probe()
+            else:
+                br.record(False)
+            raise
+        br.record(not is_failure(r.status_code))
+        if not is_failure(r.status_code):
+            hedge.hedger.observe(family, time.perf_counter() - t0)
+        return r
+
+    def request(self, method, url, *args, **kwargs):
+        family = path_family(url)
+        delay = None
+        if hedge.TMDB_HEDGE_ENABLED and str(method).upper() == "GET" and not kwargs.get("stream"):
+            delay = hedge.hedger.delay(family)
+        if delay is None:
+            return self._send(family, method, url, *args, **kwargs)
+
+        first = _start_primary(self._send, family, method, url, *args, **kwargs)
+        if first is None:
+            return self._send(family, method, url, *args, **kwargs)
+        try:
+            return first.result(timeout=delay)
+        except FutureTimeout:
+            pass
+        if not hedge.hedger.admit():
+            return first.result()
+        metrics.incr("tmdb.hedge.issued")
+        second = _hedge_pool.submit(contextvars.copy_context().run, self._send, family, method, url, *args, **kwargs)
+        pending = {first, second}
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            ok = [f for f in done if _answered(f)]
+            if ok or not pending:  # first usable answer wins; failures only once both failed
+                winner = ok[0] if ok else first
+                if winner is second:
+                    metrics.incr("tmdb.hedge.won")
+                for other in {first, second} - {winner}:
+                    other.add_done_callback(_close_loser)
+                return winner.result()
+
 def build_tmdb_session() -> Session:
-    s = Session()
-    retry = Retry(
+    s = GuardedSession()
+    retry = DeadlineRetry(
         total=3,
         backoff_factor=0.5,
         status_forcelist=(429, 500, 502, 503, 504),
@@ -33,6 +132,8 @@ def build_tmdb_session() -> Session:
     if bearer:
         s.headers.update({"Authorization": f"Bearer {bearer}"})
     s.headers.update({"Accept": "application/json"})
+    # Every upstream call counts against the shared outbound budget
+    s.hooks["response"].append(lambda r, *a, **kw: tmdb_budget.charge())
     return s
 
 # Single shared session w/ retries & (optional) Bearer
@@ -61,6 +162,10 @@ class TMDbMovie:
 
 # --- Client -----------------------------------------------------------------
 
+def _movie_tag(self, movie_id, *args, **kwargs) -> List[str]:
+    """cached() tags for per-movie reads (purged by movie:<id>)."""
+    return [f"movie:{movie_id}"]
+
 class TMDbClient:
     """
     TMDb client with retrying session. Prefers Bearer auth via TMDB_BEARER.
@@ -130,15 +235,15 @@ class TMDbClient:
     def popular_movies(self, page: int = 1, *, language: str = DEFAULT_LANGUAGE) -> Dict[str, Any]:
         return self._get("/movie/popular", {"page": page, "language": language})
 
-    @cached("tmdb_recommend", ttl=1800)  # 30m
+    @cached("tmdb_recommend", ttl=1800, tags=_movie_tag)  # 30m
     def movie_recommendations(self, movie_id: int, page: int = 1, *, language: str = DEFAULT_LANGUAGE) -> Dict[str, Any]:
         return self._get(f"/movie/{movie_id}/recommendations", {"page": page, "language": language})
 
-    @cached("tmdb_similar", ttl=1800)  # 30m
+    @cached("tmdb_similar", ttl=1800, tags=_movie_tag)  # 30m
     def movie_similar(self, movie_id: int, page: int = 1, *, language: str = DEFAULT_LANGUAGE) -> Dict[str, Any]:
         return self._get(f"/movie/{movie_id}/similar", {"page": page, "language": language})
 
-    @cached("tmdb_providers", ttl=21600)  # 6h (B2 spec)
+    @cached("tmdb_providers", ttl=21600, tags=_movie_tag)  # 6h (B2 spec)
     def movie_watch_providers(self, movie_id: int) -> Dict[str, Any]:
         # Providers API is region-agnostic at fetch; region is applied in normalization layer
         return self._get(f"/movie/{movie_id}/watch/providers", {})
@@ -167,7 +272,7 @@ class TMDbClient:
             params["watch_region"] = watch_region
         return self._get("/discover/movie", params)
 
-    @cached("tmdb_details", ttl=3600)  # 1h (B2 spec)
+    @cached("tmdb_details", ttl=3600, tags=_movie_tag)  # 1h (B2 spec)
     def movie_details(self, movie_id: int, *, language: str = DEFAULT_LANGUAGE) -> Dict[str, Any]:
         # Append credits to avoid multiple roundtrips
         return self._get(f"/movie/{movie_id}", {"append_to_response": "credits", "language": language})
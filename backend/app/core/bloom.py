@@ -0,0 +1,88 @@
+from __future__ import annotations
+import hashlib
+import math
+import threading
+import time
+from typing import Dict, Optional
+
+# ---------------------------
+# Rotating Bloom filter
+# ---------------------------
+# Compact "probably seen recently" set: no false negatives, a tunable false
+# positive rate, ~1.2 bytes per key at 1% instead of a dict entry per key.
+# Two generations: adds go to the current one, lookups check both, and the
+# older one is dropped once the current one is full or `window` seconds old,
+# so a key is remembered for between one and two windows.
+
+
+class _Bits:
+    __slots__ = ("m", "k", "bits", "count")
+
+    def __init__(self, m: int, k: int):
+        self.m = m
+        self.k = k
+        self.bits = bytearray((m + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        d = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(d[:8], "little")
+        h2 = int.from_bytes(d[8:], "little") | 1
+        for i in range(self.k):
+            yield (h1 + i * h2) % self.m
+
+    def add(self, key: str) -> None:
+        for p in self._positions(key):
+            self.bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+
+class RotatingBloom:
+    def __init__(self, capacity: int, error_rate: float = 0.01, window: Optional[float] = None):
+        """capacity keys per generation at ~error_rate false positives; window in seconds (None: size only)."""
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.window = window
+        self.m = max(8, int(math.ceil(-self.capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.k = max(1, int(round(self.m / self.capacity * math.log(2))))
+        self._lock = threading.Lock()
+        self._current = _Bits(self.m, self.k)
+        self._previous: Optional[_Bits] = None
+        self._started = time.monotonic()
+        self.rotations = 0
+
+    def _maybe_rotate(self) -> None:
+        aged = self.window is not None and time.monotonic() - self._started >= self.window
+        if self._current.count >= self.capacity or aged:
+            self._previous = self._current
+            self._current = _Bits(self.m, self.k)
+            self._started = time.monotonic()
+            self.rotations += 1
+
+    def add(self, key: str) -> bool:
+        """Add key; returns True if it was (probably) already present."""
+        with self._lock:
+            self._maybe_rotate()
+            seen = key in self._current or (self._previous is not None and key in self._previous)
+            if key not in self._current:
+                self._current.add(key)
+            return seen
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            self._maybe_rotate()
+            return key in self._current or (self._previous is not None and key in self._previous)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._current = _Bits(self.m, self.k)
+            self._previous = None
+            self._started = time.monotonic()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {"keys": self._current.count + (self._previous.count if self._previous else 0),
+                    "capacity": self.capacity, "bytes": 2 * len(self._current.bits), "rotations": self.rotations}
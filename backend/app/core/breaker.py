@@ -0,0 +1,160 @@
+from __future__ import annotations
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+from . import metrics
+
+# ---------------------------
+# Circuit breakers for upstream dependencies
+# ---------------------------
+# One breaker per endpoint family (e.g. "tmdb:/movie/{id}/recommendations",
+# "llm"). Each keeps a rolling window of call outcomes:
+#
+#   closed     calls pass; opens when >= BREAKER_MIN_CALLS calls in the last
+#              BREAKER_WINDOW seconds failed at >= BREAKER_ERROR_RATE
+#   open       calls fail immediately with BreakerOpen for BREAKER_COOLDOWN
+#   half_open  one probe call at a time; success closes, failure reopens
+#
+# BreakerOpen is a requests ConnectionError, so every existing
+# `except requests.RequestException` / fallback path handles it unchanged,
+# just milliseconds instead of timeouts x retries later.
+BREAKER_ENABLED = os.getenv("BREAKER_ENABLED", "1").strip().lower() in ("1", "true", "yes", "on")
+BREAKER_WINDOW = float(os.getenv("BREAKER_WINDOW", "30"))          # seconds of history
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "10"))      # calls needed before tripping
+BREAKER_ERROR_RATE = float(os.getenv("BREAKER_ERROR_RATE", "0.5"))
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", "15"))      # seconds open before probing
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class BreakerOpen(requests.exceptions.ConnectionError):
+    """Raised instead of calling a dependency whose breaker is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"circuit open for {name}; retry in {retry_after:.1f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, window: float = BREAKER_WINDOW, min_calls: int = BREAKER_MIN_CALLS,
+                 error_rate: float = BREAKER_ERROR_RATE, cooldown: float = BREAKER_COOLDOWN):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._calls: Deque[Tuple[float, bool]] = deque()  # (monotonic ts, ok)
+        self._failures = 0
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+
+    def _trim(self, now: float) -> None:
+        while self._calls and now - self._calls[0][0] > self.window:
+            _, ok = self._calls.popleft()
+            if not ok:
+                self._failures -= 1
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                return HALF_OPEN
+            return self._state
+
+    def before(self) -> None:
+        """Admit a call or raise BreakerOpen."""
+        if not BREAKER_ENABLED:
+            return
+        with self._lock:
+            if self._state == CLOSED:
+                return
+            wait = self.cooldown - (time.monotonic() - self._opened_at)
+            if self._state == OPEN and wait <= 0:
+                self._state = HALF_OPEN
+            if self._state == HALF_OPEN and not self._probing:
+                self._probing = True  # this caller is the probe
+                return
+        metrics.incr(f"breaker.{self.name}.rejected")
+        raise BreakerOpen(self.name, max(wait, 0.0))
+
+    def record(self, ok: bool) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probing = False
+                if ok:
+                    self._state = CLOSED
+                    self._calls.clear()
+                    self._failures = 0
+                    metrics.incr(f"breaker.{self.name}.closed")
+                else:
+                    self._trip(now)
+                return
+            self._calls.append((now, ok))
+            if not ok:
+                self._failures += 1
+            self._trim(now)
+            n = len(self._calls)
+            if self._state == CLOSED and n >= self.min_calls and self._failures / n >= self.error_rate:
+                self._trip(now)
+
+    def cancel_probe(self) -> None:
+        """Give back a half-open probe admitted by before() whose call never ran."""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probing = False
+
+    def _trip(self, now: float) -> None:
+        self._state = OPEN
+        self._opened_at = now
+        metrics.incr(f"breaker.{self.name}.opened")
+        print(f"[breaker] {self.name} open for {self.cooldown:.0f}s")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._trim(time.monotonic())
+            n = len(self._calls)
+            rate = round(self._failures / n, 4) if n else 0.0
+        return {"state": self.state, "calls": n, "error_rate": rate}
+
+
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def breaker(name: str) -> CircuitBreaker:
+    """Process-wide breaker for an endpoint family (created on first use)."""
+    br = _BREAKERS.get(name)
+    if br is None:
+        with _registry_lock:
+            br = _BREAKERS.setdefault(name, CircuitBreaker(name))
+    return br
+
+metrics.register_gauge("breakers", lambda: {name: br.stats() for name, br in sorted(_BREAKERS.items())})
+
+
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+def path_family(url: str) -> str:
+    """'/3/movie/550/similar?page=2' -> '/movie/{id}/similar' (API version prefix dropped)."""
+    path = urlsplit(url).path
+    path = re.sub(r"^/\d+(?=/)", "", path)
+    return _ID_SEGMENT.sub("/{id}", path) or "/"
+
+def is_failure(status: Optional[int]) -> bool:
+    """Outcomes that count against a breaker: transport errors, 5xx and 429."""
+    return status is None or status >= 500 or status == 429
+
+def _breakers_reset() -> None:
+    """Forget all breakers (useful for tests)."""
+    _BREAKERS.clear()
@@ -1,11 +1,20 @@
 from __future__ import annotations
+import os
 import time
 import json
+import hashlib
+import threading
 from functools import wraps
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
 from flask import request, jsonify, Response
 from werkzeug.wrappers.response import Response as WResp
 
+from . import metrics
+from .breaker import BreakerOpen
+from .deadline import DeadlineExceeded
+from .errors import ApiError, breaker_open_response, deadline_response
+from .negcache import NOT_FOUND, negative
+
 # ---------------------------
 # In-process caches
 # ---------------------------
@@ -14,9 +23,78 @@ _ROUTE_CACHE: Dict[str, Dict[str, Any]] = {}
 # For pure function results (e.g., TMDb client helpers)
 _FUNC_CACHE: Dict[str, Dict[str, Any]] = {}
 
+# Expired entries stay usable this long past their TTL when the upstream is
+# failing (breaker open, deadline spent, 502/503/504): stale data beats an error page.
+CACHE_STALE_IF_ERROR = int(os.getenv("CACHE_STALE_IF_ERROR", str(6 * 3600)))  # seconds
+_UPSTREAM_STATUSES = (502, 503, 504)
+
+# Adaptive TTLs: the decorator's TTL is each key's starting point. Every refetch
+# compares the new payload's hash with the previous one:
+#   - unchanged: the TTL grows by CACHE_TTL_GROW (up to base * CACHE_TTL_MAX_FACTOR)
+#   - changed on a hot key (>= CACHE_TTL_HOT_READS reads in its last life):
+#     it shrinks by CACHE_TTL_SHRINK (down to base * CACHE_TTL_MIN_FACTOR)
+#   - changed on a cold key: back to the base TTL (refreshing it sooner would
+#     cost upstream calls for almost no readers)
+# So stable old-movie details drift towards hours, while hot trending pages
+# that churn faster than their TTL get refreshed more often. Empty values
+# (failure {} / empty result pages) never grow past the base TTL, and cached()
+# does not store failure values at all.
+CACHE_ADAPTIVE_TTL = os.getenv("CACHE_ADAPTIVE_TTL", "1").strip().lower() in ("1", "true", "yes", "on")
+CACHE_TTL_MIN_FACTOR = float(os.getenv("CACHE_TTL_MIN_FACTOR", "0.25"))
+CACHE_TTL_MAX_FACTOR = float(os.getenv("CACHE_TTL_MAX_FACTOR", "6"))
+CACHE_TTL_GROW = float(os.getenv("CACHE_TTL_GROW", "2"))
+CACHE_TTL_SHRINK = float(os.getenv("CACHE_TTL_SHRINK", "0.5"))
+CACHE_TTL_HOT_READS = int(os.getenv("CACHE_TTL_HOT_READS", "5"))
+
 def _now() -> float:
     return time.time()
 
+def _digest(blob: str) -> str:
+    return hashlib.blake2b(blob.encode("utf-8"), digest_size=8).hexdigest()
+
+def _is_failure_value(value: Any) -> bool:
+    """What helpers return when the upstream failed ({} / [] / None): never cached."""
+    return value is None or (isinstance(value, (dict, list)) and not value)
+
+def _is_empty(value: Any) -> bool:
+    """Failure values and empty result pages: cached at most for the base TTL, never widened."""
+    if _is_failure_value(value):
+        return True
+    return isinstance(value, dict) and "results" in value and not value["results"]
+
+def _adapt(prev: Optional[Dict[str, Any]], digest: str, base: int, empty: bool = False) -> Dict[str, Any]:
+    """
+    TTL + bookkeeping fields for a new entry replacing `prev` (same key).
+    decision: base | widened | held | narrowed | reset
+    """
+    ent: Dict[str, Any] = {"ttl": base, "base": base, "hash": digest, "reads": 0,
+                           "refetches": 0, "changes": 0, "decision": "base"}
+    if not CACHE_ADAPTIVE_TTL or not prev or prev.get("base") != base or prev.get("hash") is None:
+        return ent
+    old_ttl = prev.get("ttl", base)
+    ent["refetches"] = prev.get("refetches", 0) + 1
+    ent["changes"] = prev.get("changes", 0)
+    if digest == prev["hash"] and empty:
+        ttl = min(old_ttl, base)  # "still nothing" is not evidence of stable content
+        decision = "reset" if ttl < old_ttl else "held"
+    elif digest == prev["hash"]:
+        ttl = min(int(base * CACHE_TTL_MAX_FACTOR), int(old_ttl * CACHE_TTL_GROW))
+        decision = "widened" if ttl > old_ttl else "held"
+    else:
+        ent["changes"] += 1
+        if prev.get("reads", 0) >= CACHE_TTL_HOT_READS:
+            ttl = max(1, int(base * CACHE_TTL_MIN_FACTOR), int(old_ttl * CACHE_TTL_SHRINK))
+            decision = "narrowed" if ttl < old_ttl else "held"
+        else:
+            ttl = min(old_ttl, base)
+            decision = "reset" if ttl < old_ttl else "held"
+    if empty:
+        ttl = min(ttl, base)
+    ent["ttl"], ent["decision"] = ttl, decision
+    if decision != "held":
+        metrics.incr(f"cache_ttl.{decision}")
+    return ent
+
 def _extract_payload(obj: Any) -> Optional[dict]:
     """
     Try to extract a JSON dict payload from various return shapes.
@@ -59,38 +137,298 @@ def _normalize_for_key(x: Any) -> Any:
     except Exception:
         return str(x)
 
+# ---------------------------
+# Canonical cache keys
+# ---------------------------
+# A key schema maps each request parameter to a normalizer, so requests that
+# reach TMDb with the same effective params share one cache entry
+# (defaults folded in, enums lowercased, lists sorted, ranges clamped).
+# Values a normalizer cannot parse keep their raw text: validation errors
+# still reach the route (and are never cached) instead of aliasing a default.
+Normalizer = Callable[[Optional[str]], Any]
+KeySpec = Union[Dict[str, Normalizer], Callable[[], Any]]
+
+def _param(name: str) -> Any:
+    va = request.view_args or {}
+    return va[name] if name in va else request.args.get(name)
+
+def key_int(default: Optional[int] = None, lo: Optional[int] = None, hi: Optional[int] = None) -> Normalizer:
+    def norm(v):
+        if v is None or str(v).strip() == "":
+            return default
+        try:
+            x = int(str(v).strip())
+        except ValueError:
+            return str(v)
+        if lo is not None: x = max(lo, x)
+        if hi is not None: x = min(hi, x)
+        return x
+    return norm
+
+def key_str(default: str = "", lower: bool = False, upper: bool = False) -> Normalizer:
+    def norm(v):
+        v = " ".join(str(v).split()) if v is not None else ""
+        v = v or default
+        return v.lower() if lower else v.upper() if upper else v
+    return norm
+
+def key_enum(*choices: str, default: str) -> Normalizer:
+    def norm(v):
+        v = (v or "").strip().lower() or default
+        return v if v in choices else f"?{v}"  # invalid: let the route reject it
+    return norm
+
+def key_csv(lower: bool = True) -> Normalizer:
+    def norm(v):
+        parts = {p.strip().lower() if lower else p.strip() for p in str(v or "").split(",")}
+        return sorted(p for p in parts if p)
+    return norm
+
+def canonical(schema: Dict[str, Normalizer]) -> Dict[str, Any]:
+    """Apply a key schema to the current request's view args / query string."""
+    return {k: norm(_param(k)) for k, norm in schema.items()}
+
+def _route_key(fn, key: Optional[KeySpec], vary: Optional[List[str]], kwargs: Dict[str, Any]) -> str:
+    if key is not None:
+        canon = canonical(key) if isinstance(key, dict) else key()
+        return fn.__name__ + "|" + json.dumps(canon, sort_keys=True, separators=(",", ":"), default=str)
+    parts = [fn.__name__]
+    if vary:
+        va = request.view_args or {}
+        for v in vary:
+            parts.append(str(
+                va.get(v) if v in va else request.args.get(v) or kwargs.get(v) or ""
+            ))
+    return "|".join(parts)
+
+_ROUTES_SEEN: set = set()  # every ttl_cache-decorated function name
+
+def route_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Per-route key cardinality and hit rate (exposed as the route_cache gauge)."""
+    keys: Dict[str, int] = {}
+    for k in list(_ROUTE_CACHE):
+        name = k.split("|", 1)[0]
+        keys[name] = keys.get(name, 0) + 1
+    out: Dict[str, Dict[str, Any]] = {}
+    for name in set(keys) | set(_ROUTES_SEEN):
+        hits = metrics.counter(f"route_cache.{name}.hit")
+        misses = metrics.counter(f"route_cache.{name}.miss")
+        out[name] = {
+            "keys": keys.get(name, 0),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+        }
+    return out
+
+metrics.register_gauge("route_cache", route_cache_stats)
+
+def _cache_name(key: str) -> str:
+    """Route name, or func:<name> for function-cache keys."""
+    return "|".join(key.split("|", 2)[:2]) if key.startswith("func:") else key.split("|", 1)[0]
+
+def ttl_summary() -> Dict[str, Dict[str, Any]]:
+    """Per route/function: current TTL spread and latest decisions (the cache_ttl gauge)."""
+    out: Dict[str, Dict[str, Any]] = {}
+    for cache in (_ROUTE_CACHE, _FUNC_CACHE):
+        for k, ent in list(cache.items()):
+            s = out.setdefault(_cache_name(k), {"keys": 0, "base": ent.get("base"), "min_ttl": None,
+                                                "max_ttl": None, "decisions": {}})
+            ttl = ent.get("ttl")
+            s["keys"] += 1
+            if ttl is not None:
+                s["min_ttl"] = ttl if s["min_ttl"] is None else min(s["min_ttl"], ttl)
+                s["max_ttl"] = ttl if s["max_ttl"] is None else max(s["max_ttl"], ttl)
+            d = ent.get("decision", "base")
+            s["decisions"][d] = s["decisions"].get(d, 0) + 1
+    return out
+
+def ttl_decisions(name: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+    """Per-key TTL state, most-refetched first (optionally for one route/function name)."""
+    now = _now()
+    rows = []
+    for cache in (_ROUTE_CACHE, _FUNC_CACHE):
+        for k, ent in list(cache.items()):
+            if name is not None and _cache_name(k) != name:
+                continue
+            rows.append({
+                "key": k, "ttl": ent.get("ttl"), "base": ent.get("base"), "decision": ent.get("decision", "base"),
+                "reads": ent.get("reads", 0), "refetches": ent.get("refetches", 0), "changes": ent.get("changes", 0),
+                "age": round(now - ent["ts"], 1),
+            })
+    rows.sort(key=lambda r: (-r["refetches"], -r["reads"]))
+    return rows[:limit]
+
+metrics.register_gauge("cache_ttl", ttl_summary)
+
+# ---------------------------
+# Cache tags (targeted invalidation)
+# ---------------------------
+# Every entry carries tags: route:<view> or func:<name>, plus movie:<id>,
+# lang:<language> and region:<CC> when its key has them (or its cached()
+# declares them). A tag -> keys index makes purge_tags() O(tagged keys)
+# instead of a scan over both caches. A rewrite drops the key's old tags, and
+# every so many writes a sweep removes entries past TTL + CACHE_STALE_IF_ERROR
+# (nothing can serve them any more) together with their tags, so neither the
+# caches nor the index grow without bound in a long-lived process.
+_CACHES = {"route": _ROUTE_CACHE, "func": _FUNC_CACHE}
+_TAG_INDEX: Dict[str, Set[Tuple[str, str]]] = {}
+_tag_lock = threading.Lock()
+_SWEEP_MIN_WRITES = 1000  # sweep after max(this, half the entries) writes: amortized O(1)
+_writes_since_sweep = 0
+_TAG_PARAMS = {"mid": "movie", "language": "lang", "region": "region", "watch_region": "region"}
+
+def _route_tags(cache_key: str) -> List[str]:
+    """Tags from a route key: its view name plus the tagged canonical params."""
+    name, _, rest = cache_key.partition("|")
+    tags = [f"route:{name}"]
+    try:
+        canon = json.loads(rest) if rest.startswith("{") else {}
+    except ValueError:
+        canon = {}
+    for param, kind in _TAG_PARAMS.items():
+        v = canon.get(param)
+        if v not in (None, ""):
+            tags.append(f"{kind}:{v}")
+    avail = canon.get("available_on")
+    if isinstance(avail, list) and len(avail) == 3:
+        tags.append(f"region:{avail[2]}")
+    return sorted(set(tags))
+
+def _untag(table: str, key: str, tags: Iterable[str]) -> None:
+    """Remove (table, key) from these tags' index sets (caller holds _tag_lock)."""
+    for t in tags:
+        keys = _TAG_INDEX.get(t)
+        if keys is not None:
+            keys.discard((table, key))
+            if not keys:
+                del _TAG_INDEX[t]
+
+def _tag_entry(table: str, key: str, ent: Dict[str, Any], tags: List[str]) -> None:
+    ent["tags"] = tags
+    prev = _CACHES[table].get(key)
+    with _tag_lock:
+        if prev is not None:
+            _untag(table, key, set(prev.get("tags", ())) - set(tags))
+        for t in tags:
+            _TAG_INDEX.setdefault(t, set()).add((table, key))
+
+def _note_write() -> None:
+    """Count a cache write; sweep dead entries once enough have piled up."""
+    global _writes_since_sweep
+    _writes_since_sweep += 1
+    if _writes_since_sweep >= max(_SWEEP_MIN_WRITES, (len(_ROUTE_CACHE) + len(_FUNC_CACHE)) // 2):
+        _writes_since_sweep = 0
+        _sweep()
+
+def _sweep() -> int:
+    """Drop entries past their TTL plus the stale-if-error window, and their tags."""
+    cutoff = _now() - CACHE_STALE_IF_ERROR
+    n = 0
+    for table, cache in _CACHES.items():
+        for key, ent in list(cache.items()):
+            ttl = ent.get("ttl")
+            if ttl is None or ent["ts"] + ttl >= cutoff:
+                continue
+            with _tag_lock:
+                if cache.get(key) is not ent:
+                    continue  # rewritten meanwhile
+                del cache[key]
+                _untag(table, key, ent.get("tags", ()))
+            n += 1
+    metrics.incr("cache.swept", n)
+    return n
+
+def purge_tags(tags: Iterable[str]) -> int:
+    """
+    Drop every route/function entry carrying any of `tags` (this process only;
+    core.purge fans out to other workers). movie:<id> also forgets a cached 404.
+    Returns the number of entries removed.
+    """
+    n = 0
+    with _tag_lock:
+        for tag in tags:
+            for table, key in _TAG_INDEX.pop(tag, ()):
+                ent = _CACHES[table].pop(key, None)
+                if ent is None:
+                    continue
+                n += 1
+                _untag(table, key, ent.get("tags", ()))
+            if tag.startswith("movie:"):
+                negative.forget(NOT_FOUND, tag.split(":", 1)[1])
+    metrics.incr("cache.purged", n)
+    return n
+
 # ---------------------------
 # Route-level TTL cache
 # ---------------------------
-def ttl_cache(ttl_seconds: int, vary: List[str] | None = None):
+# WSGI environ flag set by core.prefetch on its synthetic requests
+PREFETCH_ENVIRON = "movies.prefetch"
+
+def _store(cache_key: str, payload: dict, ttl: int) -> None:
+    digest = _digest(json.dumps(payload, sort_keys=True, default=str))
+    ent = _adapt(_ROUTE_CACHE.get(cache_key), digest, ttl, empty=_is_empty(payload))
+    ent.update(ts=_now(), payload=payload)
+    _tag_entry("route", cache_key, ent, _route_tags(cache_key))
+    if request.environ.get(PREFETCH_ENVIRON):
+        ent["prefetched"] = True  # first real hit counts as a prefetch hit
+    _ROUTE_CACHE[cache_key] = ent
+    _note_write()
+
+def ttl_cache(ttl_seconds: int, vary: List[str] | None = None, key: Optional[KeySpec] = None,
+              ttl_for: Optional[Callable[[dict], Optional[int]]] = None):
     """
     Decorator that caches JSON responses for ttl_seconds.
     IMPORTANT: We only cache the *payload dict*, never the Flask Response.
     We also avoid caching error statuses (>= 400).
+
+    key: canonical key schema ({param: normalizer}) or a callable returning the
+    normalized params; takes precedence over the raw `vary` list.
+
+    ttl_for: payload -> shorter TTL for that entry (None keeps ttl_seconds),
+    e.g. for payloads known to be incomplete.
     """
     def deco(fn):
+        _ROUTES_SEEN.add(fn.__name__)
+
+        def _entry_ttl(payload: dict) -> int:
+            short = ttl_for(payload) if ttl_for is not None else None
+            return min(short, ttl_seconds) if short is not None else ttl_seconds
+
         @wraps(fn)
         def wrapper(*args, **kwargs):
             # Build cache key from function + selected args/query
-            parts = [fn.__name__]
-            if vary:
-                va = request.view_args or {}
-                for v in vary:
-                    parts.append(str(
-                        va.get(v) if v in va else request.args.get(v) or kwargs.get(v) or ""
-                    ))
-            key = "|".join(parts)
+            cache_key = _route_key(fn, key, vary, kwargs)
 
             # Try cache hit
-            ent = _ROUTE_CACHE.get(key)
-            if ent and (_now() - ent["ts"] < ttl_seconds):
+            ent = _ROUTE_CACHE.get(cache_key)
+            if ent and (_now() - ent["ts"] < ent.get("ttl", ttl_seconds)):
+                metrics.incr(f"route_cache.{fn.__name__}.hit")
+                ent["reads"] = ent.get("reads", 0) + 1
+                if ent.pop("prefetched", False):
+                    metrics.incr("prefetch.hit")
                 payload = ent["payload"]
                 resp = jsonify(payload)  # payload is dict
                 resp.headers["X-Cache"] = "hit"
                 return resp
+            metrics.incr(f"route_cache.{fn.__name__}.miss")
+
+            def stale_or(fallback):
+                # Upstream failed: an expired-but-recent entry is better than an error
+                if ent and _now() - ent["ts"] < ent.get("ttl", ttl_seconds) + CACHE_STALE_IF_ERROR:
+                    metrics.incr(f"route_cache.{fn.__name__}.stale")
+                    resp = jsonify(ent["payload"])
+                    resp.headers["X-Cache"] = "stale"
+                    return resp
+                return fallback()
 
             # Miss: call the function
-            rv = fn(*args, **kwargs)
+            try:
+                rv = fn(*args, **kwargs)
+            except BreakerOpen as e:
+                return stale_or(lambda e=e: breaker_open_response(e))
+            except DeadlineExceeded as e:
+                return stale_or(lambda e=e: deadline_response(e))
 
             # Normalize common Flask return shapes
             body: Any = rv
@@ -104,8 +442,13 @@ def ttl_cache(ttl_seconds: int, vary: List[str] | None = None):
 
             # If it's a Response, don’t cache error statuses
             if isinstance(body, (Response, WResp)):
-                code = getattr(body, "status_code", None)
-                if isinstance(code, int) and code >= 400:
+                # err() returns (jsonify(...), status): the tuple's status wins
+                code = status if status is not None else getattr(body, "status_code", None)
+                if code in _UPSTREAM_STATUSES and ent:
+                    return stale_or(lambda: rv)
+                # ...and views can opt a response out (e.g. partial results) with no-store
+                no_store = "no-store" in (body.headers.get("Cache-Control") or "")
+                if (isinstance(code, int) and code >= 400) or no_store:
                     try:
                         body.headers["X-Cache"] = "miss"
                     except Exception:
@@ -114,7 +457,7 @@ def ttl_cache(ttl_seconds: int, vary: List[str] | None = None):
 
                 payload = _extract_payload(body)
                 if isinstance(payload, dict):
-                    _ROUTE_CACHE[key] = {"ts": _now(), "payload": payload}
+                    _store(cache_key, payload, _entry_ttl(payload))
                     out = jsonify(payload)
                     out.headers["X-Cache"] = "miss"
                     return out
@@ -129,7 +472,7 @@ def ttl_cache(ttl_seconds: int, vary: List[str] | None = None):
             payload = _extract_payload(body)
             if isinstance(payload, dict):
                 if status is None or status < 400:
-                    _ROUTE_CACHE[key] = {"ts": _now(), "payload": payload}
+                    _store(cache_key, payload, _entry_ttl(payload))
                 out = jsonify(payload)
                 out.headers["X-Cache"] = "miss"
                 return out if status is None else (out, status) if headers is None else (out, status, headers)
@@ -141,39 +484,83 @@ def ttl_cache(ttl_seconds: int, vary: List[str] | None = None):
                 return out if status is None else (out, status) if headers is None else (out, status, headers)
 
             return body if status is None else (body, status) if headers is None else (body, status, headers)
+        wrapper.cache_key_spec = key
+        # For the prefetcher: this request's key, and whether it is already fresh
+        wrapper.cache_key = lambda: _route_key(fn, key, vary, {})
+        wrapper.prime = lambda payload: _store(wrapper.cache_key(), payload, ttl_seconds)
+        def is_fresh() -> bool:
+            ent = _ROUTE_CACHE.get(wrapper.cache_key()) or {}
+            return _now() - ent.get("ts", 0.0) < ent.get("ttl", ttl_seconds)
+        wrapper.is_fresh = is_fresh
         return wrapper
     return deco
 
 # ---------------------------
 # Function-level TTL cache (for clients/helpers)
 # ---------------------------
-def cached(name: str, ttl: int):
+def _func_store(key: str, value: Any, ttl: int, tags: List[str]) -> None:
+    digest = _digest(json.dumps(value, sort_keys=True, default=str))
+    ent = _adapt(_FUNC_CACHE.get(key), digest, ttl, empty=_is_empty(value))
+    ent.update(ts=_now(), value=value)
+    _tag_entry("func", key, ent, tags)
+    _FUNC_CACHE[key] = ent
+    _note_write()
+
+def cached(name: str, ttl: int, tags: Optional[Callable[..., Iterable[str]]] = None):
     """
     Cache decorator for *pure* functions (e.g., TMDbClient helpers).
     Key includes: name + function name + normalized args/kwargs.
     Stores the returned value verbatim (must be JSON-serializable or simple types).
+
+    tags: called with the function's args, returns extra tags for the entry
+    (e.g. movie:<id>); func:<name> is always added.
     """
     def deco(fn):
+        def _key(args, kwargs) -> str:
+            return "|".join([f"func:{name}", fn.__name__, repr(_normalize_for_key(args)), repr(_normalize_for_key(kwargs))])
+
+        def _tags(args, kwargs) -> List[str]:
+            extra = list(tags(*args, **kwargs)) if tags is not None else []
+            return sorted({f"func:{name}", *extra})
+
         @wraps(fn)
         def wrapper(*args, **kwargs):
-            key_parts = [f"func:{name}", fn.__name__, repr(_normalize_for_key(args)), repr(_normalize_for_key(kwargs))]
-            key = "|".join(key_parts)
+            key = _key(args, kwargs)
 
             ent = _FUNC_CACHE.get(key)
-            if ent and (_now() - ent["ts"] < ttl):
+            if ent and (_now() - ent["ts"] < ent.get("ttl", ttl)):
+                ent["reads"] = ent.get("reads", 0) + 1
                 return ent["value"]
 
-            value = fn(*args, **kwargs)
+            try:
+                value = fn(*args, **kwargs)
+            except (BreakerOpen, DeadlineExceeded, ApiError) as e:
+                # Upstream down or out of time: serve the expired value while it is recent enough
+                down = not isinstance(e, ApiError) or e.status in _UPSTREAM_STATUSES
+                if down and ent and _now() - ent["ts"] < ent.get("ttl", ttl) + CACHE_STALE_IF_ERROR:
+                    metrics.incr(f"func_cache.{name}.stale")
+                    return ent["value"]
+                raise
+
+            # Failure values ({} / None) are not cached: the next call retries
+            # (the breaker bounds how hard), and a known 404 is the negative cache's job
+            if _is_failure_value(value):
+                return value
 
             # Only cache values that are JSON-serializable or simple types.
             try:
-                json.dumps(value, default=str)
-                _FUNC_CACHE[key] = {"ts": _now(), "value": value}
+                _func_store(key, value, ttl, _tags(args, kwargs))
             except Exception:
                 # Skip caching un-serializable values to avoid surprises.
                 pass
 
             return value
+
+        def prime(value: Any, *args, **kwargs) -> None:
+            """Store `value` as the result for (args, kwargs) without calling fn."""
+            _func_store(_key(args, kwargs), value, ttl, _tags(args, kwargs))
+
+        wrapper.prime = prime
         return wrapper
     return deco
 
@@ -184,3 +571,6 @@ def _cache_clear():
     """Clear all in-memory caches (useful for tests or after refactors)."""
     _ROUTE_CACHE.clear()
     _FUNC_CACHE.clear()
+    with _tag_lock:
+        _TAG_INDEX.clear()
+    negative.clear()
@@ -0,0 +1,108 @@
+from __future__ import annotations
+import contextvars
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from . import deadline as request_deadline
+
+# ---------------------------
+# Shared upstream worker pool
+# ---------------------------
+# One bounded pool per process for outbound fan-out (TMDb strategies, batches, ...).
+# Tasks run in a copy of the caller's context, so the request deadline follows them.
+UPSTREAM_WORKERS = int(os.getenv("UPSTREAM_WORKERS", "16"))
+_POOL = ThreadPoolExecutor(max_workers=UPSTREAM_WORKERS, thread_name_prefix="upstream")
+
+def submit(fn: Callable[..., Any], *args, **kwargs) -> Future:
+    return submit_to(_POOL, fn, *args, **kwargs)
+
+def submit_to(pool: ThreadPoolExecutor, fn: Callable[..., Any], *args, **kwargs) -> Future:
+    """
+    submit() onto another executor. Work that itself fans out onto the shared
+    pool and waits (home sections, prefetch) must not run on it: enough such
+    tasks would hold every worker while their own sub-tasks sit queued.
+    """
+    return pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+def run_strategies(
+    attempts: Sequence[Callable[[], Any]],
+    *,
+    timeout: float,
+    hedge_delay: float = 0.0,
+) -> Tuple[Optional[int], Any]:
+    """
+    Run prioritized attempts speculatively and return (index, value) of the
+    highest-priority attempt that produced a usable value (anything not None).
+
+    - hedge_delay == 0: every attempt starts immediately.
+    - hedge_delay > 0: attempt 0 starts alone; the rest start once the delay
+      passes or attempt 0 finishes without a usable value.
+    A lower-priority value wins only once every higher-priority attempt has
+    failed, or when the timeout expires. Exceptions count as "not usable".
+    Losers are cancelled if still queued, otherwise ignored.
+    Returns (None, None) when nothing usable arrived in time.
+    """
+    if not attempts:
+        return None, None
+    left = request_deadline.remaining()
+    if left is not None:
+        timeout = min(timeout, left)  # never outlive the request
+    deadline = time.monotonic() + max(0.0, timeout)
+    futures: Dict[int, Future] = {0: submit(attempts[0])}
+    results: Dict[int, Any] = {}
+    done_idx: set[int] = set()
+
+    def _launch_rest() -> None:
+        for i in range(1, len(attempts)):
+            if i not in futures:
+                futures[i] = submit(attempts[i])
+
+    if hedge_delay <= 0:
+        _launch_rest()
+    hedge_at = time.monotonic() + hedge_delay
+
+    def _best() -> Tuple[Optional[int], Any]:
+        # Highest priority usable result whose predecessors all failed
+        for i in range(len(attempts)):
+            if i in results:
+                return i, results[i]
+            if i not in done_idx:
+                return None, None
+        return None, None
+
+    try:
+        while True:
+            idx, val = _best()
+            if idx is not None:
+                return idx, val
+            if len(done_idx) == len(attempts):
+                return None, None
+            now = time.monotonic()
+            if now >= deadline:
+                # Out of time: settle for whatever usable result we have
+                if results:
+                    i = min(results)
+                    return i, results[i]
+                return None, None
+            if len(futures) < len(attempts) and (now >= hedge_at or 0 in done_idx):
+                _launch_rest()
+                continue
+            pending = [f for i, f in futures.items() if i not in done_idx]
+            wake = deadline if len(futures) == len(attempts) else min(deadline, hedge_at)
+            finished, _ = wait(pending, timeout=max(0.0, wake - now), return_when=FIRST_COMPLETED)
+            for i, f in futures.items():
+                if f in finished and i not in done_idx:
+                    done_idx.add(i)
+                    try:
+                        v = f.result()
+                    except Exception as e:
+                        print(f"[run_strategies] attempt {i} failed: {e}")
+                        v = None
+                    if v is not None:
+                        results[i] = v
+    finally:
+        for i, f in futures.items():
+            if i not in done_idx:
+                f.cancel()
@@ -0,0 +1,126 @@
+from __future__ import annotations
+import math
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+import requests
+from urllib3.util.retry import Retry
+
+from . import metrics
+
+# ---------------------------
+# End-to-end request deadlines
+# ---------------------------
+# Every API request gets a deadline when it arrives: REQUEST_DEADLINE, a
+# per-route budget set with @deadline_budget(seconds), or a shorter/longer
+# client ask via X-Timeout-Ms (clamped to REQUEST_DEADLINE_MIN..MAX). The deadline
+# lives in a ContextVar, so it follows the request into core.concurrency.submit
+# workers, and every upstream call derives its timeout and retry allowance from
+# what is left. Once the budget is spent, calls raise DeadlineExceeded (a
+# requests Timeout) instead of starting, which existing fallbacks already handle.
+# An attempt the deadline cut short says nothing about the upstream, so callers
+# check cut_short() before reporting its failure to a shared circuit breaker.
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", "8"))            # seconds
+REQUEST_DEADLINE_MAX = float(os.getenv("REQUEST_DEADLINE_MAX", "30"))    # cap on client overrides
+REQUEST_DEADLINE_MIN = float(os.getenv("REQUEST_DEADLINE_MIN", "1"))     # floor on client overrides
+DEADLINE_HEADER = "X-Timeout-Ms"
+MIN_ATTEMPT = 0.05  # never start an upstream attempt with less time than this
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)  # monotonic
+_attempt_timeout: ContextVar[float] = ContextVar("upstream_attempt_timeout", default=0.0)
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """The request's time budget is spent; abandon the remaining work."""
+
+
+def deadline_budget(seconds: float):
+    """Route decorator: default deadline for this endpoint (place right under @bp.route)."""
+    def deco(fn):
+        fn.deadline_budget = seconds
+        return fn
+    return deco
+
+def budget_for(view, header: Optional[str] = None) -> float:
+    """Deadline for a request to `view`, honouring a client X-Timeout-Ms override."""
+    seconds = float(getattr(view, "deadline_budget", REQUEST_DEADLINE))
+    if header:
+        try:
+            override = float(header) / 1000.0
+        except ValueError:
+            override = math.nan
+        if math.isfinite(override):  # nan/inf would slip past the clamp below
+            seconds = max(override, REQUEST_DEADLINE_MIN)
+    return min(max(seconds, MIN_ATTEMPT), REQUEST_DEADLINE_MAX)
+
+
+def start(seconds: Optional[float]):
+    """Set the deadline for the current context; returns a token for reset()."""
+    return _deadline.set(None if seconds is None else time.monotonic() + seconds)
+
+def reset(token) -> None:
+    _deadline.reset(token)
+
+@contextmanager
+def scope(seconds: Optional[float]) -> Iterator[None]:
+    """Run a block under its own deadline (None: no deadline)."""
+    token = start(seconds)
+    try:
+        yield
+    finally:
+        reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current request's budget, or None when unbounded."""
+    d = _deadline.get()
+    return None if d is None else d - time.monotonic()
+
+def expired() -> bool:
+    r = remaining()
+    return r is not None and r <= 0
+
+def check(what: str = "request") -> None:
+    """Raise DeadlineExceeded if the budget is spent."""
+    if expired():
+        metrics.incr("deadline.exceeded")
+        raise DeadlineExceeded(f"deadline exceeded before {what}")
+
+def timeout_for(default: Optional[float], what: str = "upstream call") -> Optional[float]:
+    """
+    Per-attempt timeout for an upstream call: its own default capped by the
+    remaining budget. Raises DeadlineExceeded when too little is left to try.
+    """
+    r = remaining()
+    if r is None:
+        return default
+    if r < MIN_ATTEMPT:
+        metrics.incr("deadline.exceeded")
+        raise DeadlineExceeded(f"deadline exceeded before {what}")
+    t = r if default is None else min(float(default), r)
+    _attempt_timeout.set(t)
+    return t
+
+def cut_short(default: Optional[float], timeout: Optional[float]) -> bool:
+    """True if the deadline gave this attempt less than its own default timeout."""
+    return default is not None and timeout is not None and timeout < float(default)
+
+def allows(seconds: float) -> bool:
+    """True if `seconds` more work (e.g. backoff + another attempt) still fits."""
+    r = remaining()
+    return r is None or r >= seconds
+
+
+class DeadlineRetry(Retry):
+    """urllib3 Retry that only retries while backoff + one more attempt fits the deadline."""
+
+    def increment(self, method=None, url=None, *args, **kwargs):
+        new = super().increment(method, url, *args, **kwargs)  # MaxRetryError once retries run out
+        if allows(new.get_backoff_time() + _attempt_timeout.get()):
+            return new
+        metrics.incr("deadline.retry_skipped")
+        # Out of time: give up now, exactly as if the retry count were spent
+        return self.new(total=0).increment(method, url, *args, **kwargs)
@@ -7,6 +7,9 @@ import logging
 from flask import Flask, jsonify, request
 from werkzeug.exceptions import HTTPException
 
+from .breaker import BreakerOpen
+from .deadline import DeadlineExceeded
+
 log = logging.getLogger(__name__)
 
 # -------- Envelope builder
@@ -68,6 +71,27 @@ class ApiError(Exception):
             exc=self,
         )
 
+def breaker_open_response(e: BreakerOpen):
+    """503 for a dependency whose circuit breaker is open, with Retry-After."""
+    resp, status = make_error(
+        code="upstream_unavailable",
+        message="Upstream temporarily unavailable",
+        hint="Try again shortly",
+        dependency=e.name.split(":", 1)[0],
+        status=503,
+    )
+    resp.headers["Retry-After"] = str(max(1, int(e.retry_after + 0.999)))
+    return resp, status
+
+def deadline_response(e: DeadlineExceeded):
+    """504 for a request whose time budget ran out before the work finished."""
+    return make_error(
+        code="deadline_exceeded",
+        message="Request took too long",
+        hint="Try again, or allow more time with X-Timeout-Ms",
+        status=504,
+    )
+
 # -------- Installer
 
 def install_error_handlers(app: Flask) -> None:
@@ -80,6 +104,14 @@ def install_error_handlers(app: Flask) -> None:
     def _handle_api_error(e: ApiError):
         return e.to_response()
 
+    @app.errorhandler(BreakerOpen)
+    def _handle_breaker_open(e: BreakerOpen):
+        return breaker_open_response(e)
+
+    @app.errorhandler(DeadlineExceeded)
+    def _handle_deadline(e: DeadlineExceeded):
+        return deadline_response(e)
+
     @app.errorhandler(HTTPException)
     def _handle_http_exception(e: HTTPException):
         code_map = {
@@ -0,0 +1,96 @@
+from __future__ import annotations
+import os
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from . import metrics
+from .ratelimit import tmdb_budget
+
+# ---------------------------
+# Request hedging for idempotent GETs
+# ---------------------------
+# If a GET has not answered after the recent p90 latency of its endpoint family,
+# an identical second request is sent and whichever answers first wins. Only
+# ~10% of calls are slow enough to qualify, and hedges are further capped by a
+# global ratio (TMDB_HEDGE_RATIO of eligible calls) and by the outbound TMDb
+# budget, so the extra load stays small while the tail is cut down.
+TMDB_HEDGE_ENABLED = os.getenv("TMDB_HEDGE_ENABLED", "0").strip().lower() in ("1", "true", "yes", "on")
+TMDB_HEDGE_QUANTILE = float(os.getenv("TMDB_HEDGE_QUANTILE", "0.9"))
+TMDB_HEDGE_MIN_SAMPLES = int(os.getenv("TMDB_HEDGE_MIN_SAMPLES", "20"))   # per family before hedging
+TMDB_HEDGE_MIN_DELAY = float(os.getenv("TMDB_HEDGE_MIN_DELAY", "0.05"))   # seconds
+TMDB_HEDGE_RATIO = float(os.getenv("TMDB_HEDGE_RATIO", "0.05"))           # max hedges per eligible call
+TMDB_HEDGE_MIN_BUDGET = float(os.getenv("TMDB_HEDGE_MIN_BUDGET", "0.25")) # fraction of the burst kept free
+TMDB_HEDGE_WORKERS = int(os.getenv("TMDB_HEDGE_WORKERS", "16"))
+TMDB_HEDGE_PRIMARY_WORKERS = int(os.getenv("TMDB_HEDGE_PRIMARY_WORKERS", "32"))  # hedgeable GETs in flight
+
+_SAMPLES = 200       # latencies kept per family
+_REFRESH_EVERY = 10  # recompute the quantile every N samples
+_MAX_CREDIT = 5.0    # hedges that can be banked during quiet periods
+
+
+class Hedger:
+    def __init__(self, quantile: float = TMDB_HEDGE_QUANTILE, min_samples: int = TMDB_HEDGE_MIN_SAMPLES,
+                 ratio: float = TMDB_HEDGE_RATIO, min_delay: float = TMDB_HEDGE_MIN_DELAY):
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.ratio = ratio
+        self.min_delay = min_delay
+        self._lock = threading.Lock()
+        self._lat: Dict[str, Deque[float]] = {}
+        self._seen: Dict[str, int] = {}
+        self._delay: Dict[str, float] = {}
+        self._credit = 0.0
+
+    def observe(self, family: str, seconds: float) -> None:
+        with self._lock:
+            lat = self._lat.get(family)
+            if lat is None:
+                lat = self._lat[family] = deque(maxlen=_SAMPLES)
+            lat.append(seconds)
+            n = self._seen[family] = self._seen.get(family, 0) + 1
+            if len(lat) >= self.min_samples and (family not in self._delay or n % _REFRESH_EVERY == 0):
+                ordered = sorted(lat)
+                q = ordered[min(len(ordered) - 1, int(self.quantile * len(ordered)))]
+                self._delay[family] = max(self.min_delay, q)
+
+    def delay(self, family: str) -> Optional[float]:
+        """Hedge threshold for this family (None until enough samples), and earn hedge credit."""
+        with self._lock:
+            d = self._delay.get(family)
+            if d is not None:
+                self._credit = min(_MAX_CREDIT, self._credit + self.ratio)
+            return d
+
+    def admit(self) -> bool:
+        """Spend one hedge from the global ratio budget and the outbound TMDb budget."""
+        with self._lock:
+            if self._credit < 1.0:
+                metrics.incr("tmdb.hedge.skipped.ratio")
+                return False
+            # The hedge is charged like any call once it answers (session hook)
+            if tmdb_budget.available() - 1.0 < TMDB_HEDGE_MIN_BUDGET * tmdb_budget.burst:
+                metrics.incr("tmdb.hedge.skipped.budget")
+                return False
+            self._credit -= 1.0
+            return True
+
+    def thresholds(self) -> Dict[str, float]:
+        with self._lock:
+            return {k: round(v * 1000, 1) for k, v in sorted(self._delay.items())}
+
+
+hedger = Hedger()
+
+
+def hedge_stats() -> Dict[str, object]:
+    issued, won = metrics.counter("tmdb.hedge.issued"), metrics.counter("tmdb.hedge.won")
+    return {
+        "enabled": TMDB_HEDGE_ENABLED,
+        "issued": issued,
+        "won": won,
+        "win_rate": round(won / issued, 4) if issued else 0.0,
+        "threshold_ms": hedger.thresholds(),
+    }
+
+metrics.register_gauge("tmdb.hedge", hedge_stats)
@@ -0,0 +1,219 @@
+from __future__ import annotations
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+from uuid import uuid4
+
+from . import metrics
+from .shared import get_redis
+
+# ---------------------------
+# Background jobs (submit, poll, cache)
+# ---------------------------
+# Slow pipelines (/mood/analyze) run on a small bounded pool instead of holding
+# a WSGI worker. A job is keyed by its normalized input:
+#   - a finished result for the key is served straight from the result cache
+#   - an identical job already queued/running is joined instead of duplicated
+# Job records, in-flight claims and results live in memory, or in Redis when
+# REDIS_URL is set, so any worker can answer a poll and duplicates are caught
+# across workers.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_MAX = int(os.getenv("JOB_QUEUE_MAX", "32"))               # queued + running before rejecting
+JOB_TTL = int(os.getenv("JOB_TTL", "900"))                          # seconds a job record is kept
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", "600"))            # seconds a result is reused
+_REDIS_PREFIX = "job:"
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class JobQueueFull(Exception):
+    """More than JOB_QUEUE_MAX jobs are waiting; callers should retry later."""
+
+
+class MemoryJobStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Tuple[float, Dict[str, Any]]] = {}     # id -> (expires, record)
+        self._claims: Dict[str, Tuple[float, str]] = {}              # key -> (expires, job id)
+        self._results: Dict[str, Tuple[float, Dict[str, Any]]] = {}  # key -> (expires, record)
+
+    def _live(self, table: Dict[str, Tuple[float, Any]], k: str) -> Any:
+        ent = table.get(k)
+        if ent is None or ent[0] < time.time():
+            table.pop(k, None)
+            return None
+        return ent[1]
+
+    def _sweep(self) -> None:
+        now = time.time()
+        for table in (self._jobs, self._claims, self._results):
+            for k in [k for k, (exp, _) in table.items() if exp < now]:
+                del table[k]
+
+    def put(self, job: Dict[str, Any]) -> None:
+        with self._lock:
+            if len(self._jobs) % 256 == 0:
+                self._sweep()
+            self._jobs[job["id"]] = (time.time() + JOB_TTL, dict(job))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._live(self._jobs, job_id)
+            return dict(job) if job else None
+
+    def claim(self, key: str, job_id: str) -> Optional[str]:
+        """Register job_id as the in-flight job for key; returns the existing one if any."""
+        with self._lock:
+            current = self._live(self._claims, key)
+            if current is not None:
+                return current
+            self._claims[key] = (time.time() + JOB_TTL, job_id)
+            return None
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            self._claims.pop(key, None)
+
+    def result(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            res = self._live(self._results, key)
+            return dict(res) if res else None
+
+    def save_result(self, key: str, job: Dict[str, Any]) -> None:
+        with self._lock:
+            self._results[key] = (time.time() + JOB_RESULT_TTL, dict(job))
+
+
+class RedisJobStore:
+    def __init__(self, client):
+        self.r = client
+
+    def put(self, job: Dict[str, Any]) -> None:
+        self.r.set(f"{_REDIS_PREFIX}{job['id']}", json.dumps(job), ex=JOB_TTL)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raw = self.r.get(f"{_REDIS_PREFIX}{job_id}")
+        return json.loads(raw) if raw else None
+
+    def claim(self, key: str, job_id: str) -> Optional[str]:
+        k = f"{_REDIS_PREFIX}claim:{key}"
+        if self.r.set(k, job_id, nx=True, ex=JOB_TTL):
+            return None
+        current = self.r.get(k)
+        return current.decode() if isinstance(current, bytes) else current
+
+    def release(self, key: str) -> None:
+        self.r.delete(f"{_REDIS_PREFIX}claim:{key}")
+
+    def result(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = self.r.get(f"{_REDIS_PREFIX}result:{key}")
+        return json.loads(raw) if raw else None
+
+    def save_result(self, key: str, job: Dict[str, Any]) -> None:
+        self.r.set(f"{_REDIS_PREFIX}result:{key}", json.dumps(job), ex=JOB_RESULT_TTL)
+
+
+class JobStore:
+    """Facade: Redis when configured, memory otherwise (and on Redis errors)."""
+
+    def __init__(self):
+        self._memory = MemoryJobStore()
+
+    def _call(self, op: str, *args):
+        client = get_redis()
+        if client is not None:
+            try:
+                return getattr(RedisJobStore(client), op)(*args)
+            except Exception as e:
+                metrics.incr("jobs.backend_errors")
+                print(f"[jobs] shared backend failed, using memory: {e}")
+        return getattr(self._memory, op)(*args)
+
+    def put(self, job): return self._call("put", job)
+    def get(self, job_id): return self._call("get", job_id)
+    def claim(self, key, job_id): return self._call("claim", key, job_id)
+    def release(self, key): return self._call("release", key)
+    def result(self, key): return self._call("result", key)
+    def save_result(self, key, job): return self._call("save_result", key, job)
+
+
+class JobRunner:
+    """
+    Bounded pool + store. fn(job_id) runs the work and returns (payload, status);
+    it may report progress with runner.stage(job_id, name).
+    """
+
+    def __init__(self, name: str, store: JobStore, workers: int = JOB_WORKERS, max_queue: int = JOB_QUEUE_MAX):
+        self.name = name
+        self.store = store
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"job-{name}")
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    def pending(self) -> int:
+        return self._pending
+
+    def submit(self, key: str, fn: Callable[[str], Tuple[Dict[str, Any], int]]) -> Tuple[Dict[str, Any], str]:
+        """
+        Returns (job record, how): how is "cached" (finished result reused),
+        "joined" (identical job in flight) or "queued". Raises JobQueueFull.
+        """
+        cached = self.store.result(key)
+        if cached is not None:
+            metrics.incr(f"jobs.{self.name}.cached")
+            return cached, "cached"
+        job_id = uuid4().hex
+        existing = self.store.claim(key, job_id)
+        if existing is not None:
+            job = self.store.get(existing)
+            if job is not None:
+                metrics.incr(f"jobs.{self.name}.joined")
+                return job, "joined"
+            self.store.release(key)  # stale claim: its record expired
+            self.store.claim(key, job_id)
+        with self._lock:
+            if self._pending >= self.max_queue:
+                self.store.release(key)
+                metrics.incr(f"jobs.{self.name}.rejected")
+                raise JobQueueFull(f"{self._pending} {self.name} jobs pending")
+            self._pending += 1
+        now = time.time()
+        job = {"id": job_id, "status": QUEUED, "stage": None, "created_at": now, "updated_at": now}
+        self.store.put(job)
+        metrics.incr(f"jobs.{self.name}.queued")
+        self._pool.submit(self._run, key, job_id, fn)
+        return job, "queued"
+
+    def stage(self, job_id: str, stage: str) -> None:
+        job = self.store.get(job_id)
+        if job is not None:
+            job.update(status=RUNNING, stage=stage, updated_at=time.time())
+            self.store.put(job)
+
+    def _run(self, key: str, job_id: str, fn) -> None:
+        t0 = time.perf_counter()
+        job = self.store.get(job_id) or {"id": job_id, "created_at": time.time()}
+        try:
+            job.update(status=RUNNING, started_at=time.time(), updated_at=time.time())
+            self.store.put(job)
+            payload, status = fn(job_id)
+            job = self.store.get(job_id) or job
+            job.update(status=DONE if status < 400 else FAILED, result=payload, result_status=status)
+            if status < 400:
+                self.store.save_result(key, job)
+            metrics.incr(f"jobs.{self.name}.{job['status']}")
+        except Exception as e:
+            print(f"[jobs] {self.name} {job_id} failed: {e}")
+            job.update(status=FAILED, error=str(e)[:200], result_status=500)
+            metrics.incr(f"jobs.{self.name}.failed")
+        finally:
+            job.update(stage=None, updated_at=time.time())
+            self.store.put(job)
+            self.store.release(key)
+            with self._lock:
+                self._pending -= 1
+            metrics.observe(f"jobs.{self.name}.run", time.perf_counter() - t0)
@@ -0,0 +1,168 @@
+from __future__ import annotations
+import json
+import re
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+
+# ---------------------------
+# Incremental JSON extraction from noisy LLM text
+# ---------------------------
+# One left-to-right pass over the structural characters ([]{}"), string-aware
+# inside containers, with a stack of open containers. Each completed top-level
+# container is decoded once; only when that fails are its already-closed child
+# spans tried (bounded by nesting depth), so work stays ~linear in the input.
+# The same scanner accepts chunks, which lets a streamed LLM reply surface each
+# pick as soon as its object closes.
+
+_STRUCT = re.compile(r'[\[\]{}"]')
+_STR_TAIL = re.compile(r'(?:[^"\\]|\\.)*"', re.S)
+_PAIRS = {"{": "}", "[": "]"}
+_MISSING = object()
+
+# (start, end, children) — a closed container span and its closed child spans
+Node = Tuple[int, int, List["Node"]]
+
+
+def _loads(s: str) -> Any:
+    try:
+        return json.loads(s)
+    except ValueError:
+        if "\\'" not in s:
+            raise
+        # Models often emit \' which JSON does not allow
+        return json.loads(s.replace("\\'", "'"))
+
+
+class JSONScanner:
+    """
+    Feed text (all at once or in chunks); collect valid top-level JSON values
+    in order and, optionally, stream elements of the picks array.
+
+    stream_keys: object keys whose array elements are emitted by feed() as soon
+    as they close (also applies to a top-level array).
+    """
+
+    def __init__(self, stream_keys: Sequence[str] = ("picks", "movies")):
+        self.stream_keys = tuple(stream_keys)
+        self._text = ""
+        self._pos = 0
+        self._stack: List[Tuple[str, int]] = []          # (opener, start)
+        self._children: List[List[Node]] = []            # closed children per open level
+        self._last_str: Optional[str] = None             # last string seen at level 1 (object key)
+        self._target_level: Optional[int] = None         # stack depth of the streamed array
+        self._streamed_done = False
+        self._streamed_any = False
+        self.values: List[Any] = []                      # decoded top-level values, in order
+
+    # ---------- decoding
+    def _decode(self, node: Node, depth: int = 0) -> Iterator[Any]:
+        start, end, kids = node
+        try:
+            yield _loads(self._text[start:end])
+            return
+        except (ValueError, RecursionError):  # json recurses per nesting level
+            pass
+        if depth > 32:
+            return
+        for kid in kids:  # invalid wrapper: try what it contains
+            yield from self._decode(kid, depth + 1)
+
+    # ---------- scanning
+    def feed(self, chunk: str) -> List[Any]:
+        """Consume more text; returns stream elements completed by this chunk."""
+        self._text += chunk
+        t = self._text
+        out: List[Any] = []
+        while True:
+            m = _STRUCT.search(t, self._pos)
+            if m is None:
+                self._pos = len(t)
+                return out
+            i, ch = m.start(), m.group()
+            if ch == '"':
+                if not self._stack:  # prose quote outside any container
+                    self._pos = i + 1
+                    continue
+                e = _STR_TAIL.match(t, i + 1)
+                if e is None:  # unterminated string: wait for more input
+                    self._pos = i
+                    return out
+                self._pos = e.end()
+                if len(self._stack) == 1:
+                    self._last_str = t[i + 1:e.end() - 1]
+                continue
+            self._pos = i + 1
+            if ch in _PAIRS:
+                level = len(self._stack)
+                if ch == "[" and self._target_level is None and not self._streamed_done and (
+                    level == 0 or (level == 1 and self._stack[0][0] == "{" and self._last_str in self.stream_keys)
+                ):
+                    self._target_level = level + 1
+                self._stack.append((ch, i))
+                self._children.append([])
+                continue
+            if not self._stack:  # stray closer in prose
+                continue
+            opener, start = self._stack.pop()
+            kids = self._children.pop()
+            if _PAIRS[opener] != ch:
+                # Mismatched bracket: this nest cannot be JSON; salvage closed children
+                self._abandon(kids)
+                continue
+            node: Node = (start, i + 1, kids)
+            level = len(self._stack)
+            if level == self._target_level and opener == "{":
+                for v in self._decode(node):
+                    out.append(v)
+                    self._streamed_any = True
+                    break
+            elif level + 1 == self._target_level and opener == "[":
+                self._target_level = None
+                self._streamed_done = True
+            if self._stack:
+                self._children[-1].append(node)
+            else:
+                self._emit_top(node)
+
+    def _emit_top(self, node: Node) -> None:
+        for v in self._decode(node):
+            self.values.append(v)
+            break
+
+    def _abandon(self, kids: List[Node]) -> None:
+        for kid in kids:
+            self._emit_top(kid)
+        while self._stack:
+            self._stack.pop()
+            for kid in self._children.pop():
+                self._emit_top(kid)
+        if self._target_level is not None:
+            # A prose bracket that only looked like the picks array: keep looking
+            self._target_level = None
+            self._streamed_done = self._streamed_any
+
+    def close(self) -> List[Any]:
+        """End of input: salvage complete children of any still-open containers."""
+        if self._pos < len(self._text):
+            # Stuck on a string that never terminates. No unescaped quote follows it,
+            # so skipping that one quote and rescanning the tail happens at most once.
+            stuck = self._pos
+            self._abandon([])
+            self._pos = stuck + 1
+            self.feed("")
+        while self._stack:
+            self._stack.pop()
+            for kid in self._children.pop():
+                self._emit_top(kid)
+        return self.values
+
+
+def iter_json_values(text: str) -> List[Any]:
+    """All valid top-level JSON values embedded in `text`, in order of appearance."""
+    sc = JSONScanner()
+    sc.feed(text or "")
+    return sc.close()
+
+def find_first_json(text: str) -> Any:
+    """First valid JSON object/array in `text`, or None."""
+    vals = iter_json_values(text)
+    return vals[0] if vals else None
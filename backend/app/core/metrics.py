@@ -0,0 +1,62 @@
+from __future__ import annotations
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict
+
+# ---------------------------
+# In-process metrics (per worker)
+# ---------------------------
+# Counters: monotonically increasing ints (e.g. "recommend_mood.strategy.regional")
+# Timings:  count/total/max seconds per name
+# Gauges:   callables evaluated at snapshot time (e.g. breaker state)
+_lock = threading.Lock()
+_COUNTERS: Dict[str, int] = defaultdict(int)
+_TIMINGS: Dict[str, Dict[str, float]] = {}
+_GAUGES: Dict[str, Callable[[], Any]] = {}
+
+def incr(name: str, n: int = 1) -> None:
+    with _lock:
+        _COUNTERS[name] += n
+
+def counter(name: str) -> int:
+    with _lock:
+        return _COUNTERS.get(name, 0)
+
+def observe(name: str, seconds: float) -> None:
+    with _lock:
+        t = _TIMINGS.get(name)
+        if t is None:
+            t = _TIMINGS[name] = {"count": 0, "total": 0.0, "max": 0.0}
+        t["count"] += 1
+        t["total"] += seconds
+        if seconds > t["max"]:
+            t["max"] = seconds
+
+def register_gauge(name: str, fn: Callable[[], Any]) -> None:
+    """Register a callable whose value is read lazily by snapshot()."""
+    _GAUGES[name] = fn
+
+def snapshot() -> Dict[str, Any]:
+    with _lock:
+        counters = dict(_COUNTERS)
+        timings = {
+            k: {
+                "count": int(v["count"]),
+                "avg_ms": round(1000 * v["total"] / v["count"], 3) if v["count"] else 0.0,
+                "max_ms": round(1000 * v["max"], 3),
+            }
+            for k, v in _TIMINGS.items()
+        }
+    gauges: Dict[str, Any] = {}
+    for k, fn in list(_GAUGES.items()):
+        try:
+            gauges[k] = fn()
+        except Exception as e:
+            gauges[k] = f"error: {e}"
+    return {"counters": counters, "timings": timings, "gauges": gauges}
+
+def _metrics_reset() -> None:
+    """Drop counters/timings (useful for tests). Gauges stay registered."""
+    with _lock:
+        _COUNTERS.clear()
+        _TIMINGS.clear()
@@ -0,0 +1,95 @@
+from __future__ import annotations
+import os
+import threading
+import time
+from typing import Dict, Tuple
+
+from . import metrics
+from .bloom import RotatingBloom
+
+# ---------------------------
+# Negative cache
+# ---------------------------
+# Remembers "TMDb has nothing for this" so bad ids (/details/999999999) and
+# hallucinated LLM titles stop costing an upstream call each time. Each kind
+# has its own, short TTL:
+#   not_found     TMDb answered 404 for a movie id
+#   empty_search  a title search returned no results
+#   unresolved    results came back but none usable (no poster / no match)
+#
+# A first negative only goes into a rotating Bloom filter; the exact entry is
+# written when the same key comes back negative again while still in the
+# filter. A flood of one-off junk keys (id scans, random titles) therefore
+# costs ~1 byte each instead of filling the exact cache, while keys that keep
+# coming back are answered locally. A filter false positive only means an
+# entry is admitted one miss early: a negative is never served without an
+# actual negative answer from TMDb for that key.
+NEG_CACHE_ENABLED = os.getenv("NEG_CACHE_ENABLED", "1").strip().lower() in ("1", "true", "yes", "on")
+NEG_TTL_NOT_FOUND = int(os.getenv("NEG_TTL_NOT_FOUND", "600"))        # seconds
+NEG_TTL_EMPTY_SEARCH = int(os.getenv("NEG_TTL_EMPTY_SEARCH", "300"))  # seconds
+NEG_TTL_UNRESOLVED = int(os.getenv("NEG_TTL_UNRESOLVED", "900"))      # seconds
+NEG_CACHE_MAX = int(os.getenv("NEG_CACHE_MAX", "20000"))              # exact entries
+NEG_BLOOM_CAPACITY = int(os.getenv("NEG_BLOOM_CAPACITY", "200000"))   # keys per filter generation
+NEG_BLOOM_ERROR = float(os.getenv("NEG_BLOOM_ERROR", "0.01"))
+
+NOT_FOUND, EMPTY_SEARCH, UNRESOLVED = "not_found", "empty_search", "unresolved"
+_TTLS = {NOT_FOUND: NEG_TTL_NOT_FOUND, EMPTY_SEARCH: NEG_TTL_EMPTY_SEARCH, UNRESOLVED: NEG_TTL_UNRESOLVED}
+
+
+class NegativeCache:
+    def __init__(self, max_entries: int = NEG_CACHE_MAX, bloom_capacity: int = NEG_BLOOM_CAPACITY,
+                 error_rate: float = NEG_BLOOM_ERROR):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[float, str]] = {}  # kind:key -> (expires, kind), oldest first
+        self._seen = RotatingBloom(bloom_capacity, error_rate, window=max(_TTLS.values()))
+
+    def hit(self, kind: str, key: str) -> bool:
+        """True if `key` is a known negative of this kind (counted as neg_cache.<kind>.hit)."""
+        if not NEG_CACHE_ENABLED:
+            return False
+        k = f"{kind}:{key}"
+        with self._lock:
+            ent = self._entries.get(k)
+            if ent is None:
+                return False
+            if ent[0] < time.time():
+                del self._entries[k]
+                return False
+        metrics.incr(f"neg_cache.{kind}.hit")
+        return True
+
+    def remember(self, kind: str, key: str) -> None:
+        """Record a negative upstream answer for `key`."""
+        if not NEG_CACHE_ENABLED:
+            return
+        k = f"{kind}:{key}"
+        if not self._seen.add(k):
+            metrics.incr(f"neg_cache.{kind}.first_seen")  # filter only, until it repeats
+            return
+        with self._lock:
+            self._entries.pop(k, None)
+            while len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[k] = (time.time() + _TTLS[kind], kind)
+        metrics.incr(f"neg_cache.{kind}.stored")
+
+    def forget(self, kind: str, key: str) -> None:
+        with self._lock:
+            self._entries.pop(f"{kind}:{key}", None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        self._seen.clear()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            by_kind = {kind: 0 for kind in _TTLS}
+            for _, kind in self._entries.values():
+                by_kind[kind] += 1
+        return {"entries": by_kind, "max_entries": self.max_entries, "filter": self._seen.stats()}
+
+
+negative = NegativeCache()
+metrics.register_gauge("neg_cache", negative.stats)
@@ -0,0 +1,106 @@
+from __future__ import annotations
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from typing import Any, Dict, Optional
+
+from flask import current_app, request
+
+from . import deadline, metrics
+from .cache import PREFETCH_ENVIRON, _extract_payload
+from .concurrency import submit_to
+from .ratelimit import tmdb_budget
+
+# ---------------------------
+# Predictive next-page prefetch
+# ---------------------------
+# Infinite scroll asks for page N+1 seconds after page N. After serving page N
+# we render pages N+1..N+PREFETCH_DEPTH through the same cached view in the
+# background, so the follow-up request is a route-cache hit. Opt-in, and only
+# while the outbound TMDb budget has at least PREFETCH_MIN_BUDGET (fraction of
+# the burst) left, so prefetching never crowds out real traffic.
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "0").strip().lower() in ("1", "true", "yes", "on")
+PREFETCH_DEPTH = int(os.getenv("PREFETCH_DEPTH", "1"))
+PREFETCH_MIN_BUDGET = float(os.getenv("PREFETCH_MIN_BUDGET", "0.5"))
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "4"))
+
+# Prefetched views fan out onto the shared pool and wait, so they can't run on it
+_pool = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch")
+
+_inflight: set = set()
+_lock = threading.Lock()
+
+
+def _hit_ratio() -> float:
+    issued = metrics.counter("prefetch.issued")
+    return round(metrics.counter("prefetch.hit") / issued, 4) if issued else 0.0
+
+metrics.register_gauge("prefetch.hit_ratio", _hit_ratio)
+
+
+def _prefetch(app, view, path: str, args: Dict[str, str], view_args: Dict[str, Any]) -> None:
+    # Runs after the triggering response: its own budget, not what is left of the parent's
+    with app.test_request_context(path, query_string=args, environ_overrides={PREFETCH_ENVIRON: True}), \
+            deadline.scope(deadline.budget_for(view)):
+        request.view_args = dict(view_args)
+        key = view.cache_key()
+        with _lock:
+            if key in _inflight:
+                metrics.incr("prefetch.skipped.inflight")
+                return
+            _inflight.add(key)
+        try:
+            if view.is_fresh():
+                metrics.incr("prefetch.skipped.cached")
+                return
+            # Check only: the session hook charges the budget for the real upstream calls
+            if tmdb_budget.available() - 1 < PREFETCH_MIN_BUDGET * tmdb_budget.burst:
+                metrics.incr("prefetch.skipped.budget")
+                return
+            metrics.incr("prefetch.issued")
+            view(**view_args)
+        except Exception as e:
+            print(f"[prefetch] {path} {args}: {e}")
+        finally:
+            with _lock:
+                _inflight.discard(key)
+
+
+def prefetch_next(page_param: str = "page"):
+    """
+    Decorator for paged, ttl_cache'd views (place it above @ttl_cache).
+    Stops at the payload's total_pages when it reports one.
+    """
+    def deco(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            rv = view(*args, **kwargs)
+            if not PREFETCH_ENABLED or request.environ.get(PREFETCH_ENVIRON):
+                return rv
+            try:
+                _schedule(view, rv, page_param)
+            except Exception as e:
+                print(f"[prefetch] schedule failed: {e}")
+            return rv
+        return wrapper
+    return deco
+
+
+def _schedule(view, rv: Any, page_param: str) -> None:
+    status = rv[1] if isinstance(rv, tuple) and len(rv) > 1 else getattr(rv, "status_code", 200)
+    if status >= 400:
+        return
+    try:
+        page = int(request.args.get(page_param) or 1)
+    except ValueError:
+        return
+    payload: Optional[dict] = _extract_payload(rv)
+    last = (payload or {}).get("total_pages")
+    app = current_app._get_current_object()
+    for nxt in range(page + 1, page + 1 + PREFETCH_DEPTH):
+        if isinstance(last, int) and nxt > last:
+            break
+        args = request.args.to_dict()
+        args[page_param] = str(nxt)
+        submit_to(_pool, _prefetch, app, view, request.path, args, dict(request.view_args or {}))
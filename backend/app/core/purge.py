@@ -0,0 +1,72 @@
+from __future__ import annotations
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List
+from uuid import uuid4
+
+from . import metrics
+from .cache import purge_tags
+from .shared import get_redis
+
+# ---------------------------
+# Cache purges across workers
+# ---------------------------
+# purge() drops tagged entries in this process and, when REDIS_URL is set,
+# publishes the tags on CACHE_PURGE_CHANNEL. Every worker runs a listener
+# thread that applies purges published by the others. Without Redis a purge
+# only reaches the worker that served the admin request.
+CACHE_PURGE_CHANNEL = os.getenv("CACHE_PURGE_CHANNEL", "cache:purge")
+
+_ORIGIN = uuid4().hex  # skip our own broadcasts
+_started = False
+
+
+def purge(tags: List[str]) -> Dict[str, Any]:
+    n = purge_tags(tags)
+    broadcast = False
+    client = get_redis()
+    if client is not None:
+        try:
+            client.publish(CACHE_PURGE_CHANNEL, json.dumps({"origin": _ORIGIN, "tags": tags}))
+            broadcast = True
+        except Exception as e:
+            metrics.incr("cache.purge.broadcast_errors")
+            print(f"[purge] broadcast failed, purged this worker only: {e}")
+    print(f"[purge] {tags}: {n} entries (broadcast={broadcast})")
+    return {"purged": n, "broadcast": broadcast}
+
+
+def _apply(raw: Any) -> None:
+    msg = json.loads(raw)
+    if msg.get("origin") == _ORIGIN:
+        return
+    n = purge_tags(msg.get("tags") or [])
+    metrics.incr("cache.purge.remote")
+    print(f"[purge] remote {msg.get('tags')}: {n} entries")
+
+
+def _listen(client) -> None:
+    while True:
+        try:
+            ps = client.pubsub(ignore_subscribe_messages=True)
+            ps.subscribe(CACHE_PURGE_CHANNEL)
+            for m in ps.listen():
+                try:
+                    _apply(m.get("data"))
+                except Exception as e:
+                    print(f"[purge] bad message: {e}")
+        except Exception as e:
+            print(f"[purge] listener error, resubscribing: {e}")
+            time.sleep(5)
+
+
+def start_purge_listener() -> None:
+    """Apply purges published by other workers (no-op without the shared backend)."""
+    global _started
+    client = get_redis()
+    if client is None or _started:
+        return
+    _started = True
+    threading.Thread(target=_listen, args=(client,), name="cache-purge", daemon=True).start()
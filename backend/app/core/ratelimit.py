@@ -1,4 +1,6 @@
 from __future__ import annotations
+import os
+import threading
 import time
 from collections import defaultdict, deque
 from typing import Deque
@@ -11,6 +13,12 @@ WINDOW_SIZE = 60.0    # in seconds
 _requests: dict[str, Deque[float]] = defaultdict(deque)
 
 
+def rate_limit_exempt(fn):
+    """Route decorator: skip the per-IP limit (cheap reads clients poll, e.g. job status)."""
+    fn.rate_limit_exempt = True
+    return fn
+
+
 def is_allowed(ip: str, limit: int = RATE_LIMIT, window: float = WINDOW_SIZE) -> tuple[bool, int]:
     """
     Returns (allowed, remaining).
@@ -29,3 +37,49 @@ def is_allowed(ip: str, limit: int = RATE_LIMIT, window: float = WINDOW_SIZE) ->
         return True, limit - len(q)
     else:
         return False, 0
+
+
+# ---------------------------
+# Outbound budget (calls we make to TMDb)
+# ---------------------------
+# Token bucket refilled at TMDB_OUTBOUND_RPS. Foreground calls are charged after
+# the fact and never wait (the bucket may go negative); optional background work
+# (prefetch, hedges) only runs while enough budget is left.
+TMDB_OUTBOUND_RPS = float(os.getenv("TMDB_OUTBOUND_RPS", "35"))
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._tokens = float(burst)
+        self._at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._at) * self.rate)
+        self._at = now
+
+    def available(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def charge(self, n: float = 1.0) -> None:
+        """Record calls that already happened."""
+        with self._lock:
+            self._refill()
+            self._tokens -= n
+
+    def try_take(self, n: float = 1.0, reserve: float = 0.0) -> bool:
+        """Take n tokens only if at least `reserve` would remain."""
+        with self._lock:
+            self._refill()
+            if self._tokens - n < reserve:
+                return False
+            self._tokens -= n
+            return True
+
+
+tmdb_budget = TokenBucket(TMDB_OUTBOUND_RPS, burst=TMDB_OUTBOUND_RPS)
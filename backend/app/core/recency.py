@@ -0,0 +1,119 @@
+from __future__ import annotations
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Set
+
+from . import metrics
+from .shared import get_redis
+
+# ---------------------------
+# Recently-served movie ids, per user/session scope
+# ---------------------------
+# Memory backend: per scope an OrderedDict {movie_id: ts} kept in ts order, so
+# membership is a dict lookup and expiry pops from the front (O(1) amortized).
+# Redis backend (REDIS_URL): one sorted set per scope scored by ts, checked with
+# a single ZMSCORE per request.
+
+RECENCY_WINDOW = int(os.getenv("RECENCY_WINDOW", str(6 * 3600)))  # seconds
+RECENCY_MAX_PER_SCOPE = int(os.getenv("RECENCY_MAX_PER_SCOPE", "500"))
+RECENCY_MAX_SCOPES = int(os.getenv("RECENCY_MAX_SCOPES", "10000"))
+_REDIS_PREFIX = "recent:"
+
+
+class MemoryRecency:
+    def __init__(self, window: int = RECENCY_WINDOW, max_per_scope: int = RECENCY_MAX_PER_SCOPE,
+                 max_scopes: int = RECENCY_MAX_SCOPES):
+        self.window, self.max_per_scope, self.max_scopes = window, max_per_scope, max_scopes
+        self._scopes: "OrderedDict[str, OrderedDict[int, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expire(self, seen: "OrderedDict[int, float]", now: float) -> None:
+        while seen:
+            mid, ts = next(iter(seen.items()))
+            if now - ts <= self.window:
+                break
+            seen.popitem(last=False)
+
+    def fresh(self, scope: str, ids: Iterable[int]) -> Set[int]:
+        now = time.time()
+        with self._lock:
+            seen = self._scopes.get(scope)
+            if seen is None:
+                return set(ids)
+            self._expire(seen, now)
+            return {i for i in ids if i not in seen}
+
+    def mark(self, scope: str, ids: Iterable[int]) -> None:
+        now = time.time()
+        with self._lock:
+            seen = self._scopes.get(scope)
+            if seen is None:
+                seen = self._scopes[scope] = OrderedDict()
+                while len(self._scopes) > self.max_scopes:
+                    self._scopes.popitem(last=False)  # least recently active scope
+            else:
+                self._scopes.move_to_end(scope)
+            for mid in ids:
+                seen[mid] = now
+                seen.move_to_end(mid)
+            while len(seen) > self.max_per_scope:
+                seen.popitem(last=False)
+
+
+class RedisRecency:
+    def __init__(self, client, window: int = RECENCY_WINDOW, max_per_scope: int = RECENCY_MAX_PER_SCOPE):
+        self.r, self.window, self.max_per_scope = client, window, max_per_scope
+
+    def fresh(self, scope: str, ids: Iterable[int]) -> Set[int]:
+        ids = list(ids)
+        if not ids:
+            return set()
+        cutoff = time.time() - self.window
+        scores: List[Optional[float]] = self.r.zmscore(_REDIS_PREFIX + scope, ids)
+        return {i for i, sc in zip(ids, scores) if sc is None or sc < cutoff}
+
+    def mark(self, scope: str, ids: Iterable[int]) -> None:
+        ids = list(ids)
+        if not ids:
+            return
+        key, now = _REDIS_PREFIX + scope, time.time()
+        pipe = self.r.pipeline()
+        pipe.zadd(key, {str(i): now for i in ids})
+        pipe.zremrangebyscore(key, "-inf", now - self.window)
+        pipe.zremrangebyrank(key, 0, -self.max_per_scope - 1)
+        pipe.expire(key, self.window)
+        pipe.execute()
+
+
+class RecencyStore:
+    """Facade: Redis when configured, memory otherwise (and on Redis errors)."""
+
+    def __init__(self):
+        self._memory = MemoryRecency()
+
+    def _backend(self):
+        client = get_redis()
+        return RedisRecency(client) if client is not None else self._memory
+
+    def fresh(self, scope: str, ids: Iterable[int]) -> Set[int]:
+        ids = list(ids)
+        try:
+            return self._backend().fresh(scope, ids)
+        except Exception as e:
+            metrics.incr("recency.backend_errors")
+            print(f"[recency] shared backend failed, using memory: {e}")
+            return self._memory.fresh(scope, ids)
+
+    def mark(self, scope: str, ids: Iterable[int]) -> None:
+        ids = list(ids)
+        try:
+            self._backend().mark(scope, ids)
+        except Exception as e:
+            metrics.incr("recency.backend_errors")
+            print(f"[recency] shared backend failed, using memory: {e}")
+            self._memory.mark(scope, ids)
+
+
+recency = RecencyStore()
@@ -0,0 +1,30 @@
+from __future__ import annotations
+import os
+from typing import Any, Optional
+
+# ---------------------------
+# Optional shared backend (Redis)
+# ---------------------------
+# State that must survive across workers (recency, jobs, purges) can use Redis
+# when REDIS_URL is set and the `redis` package is installed. Everything falls
+# back to per-process memory otherwise.
+try:
+    import redis  # type: ignore[import-not-found]
+except ImportError:  # optional dependency
+    redis = None
+
+REDIS_URL = os.getenv("REDIS_URL")
+_client: Optional[Any] = None
+
+def get_redis() -> Optional[Any]:
+    """Shared Redis client, or None when not configured/installed."""
+    global _client
+    if _client is not None:
+        return _client
+    if not REDIS_URL:
+        return None
+    if redis is None:
+        print("[shared] REDIS_URL is set but the 'redis' package is not installed; using memory")
+        return None
+    _client = redis.Redis.from_url(REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5)
+    return _client
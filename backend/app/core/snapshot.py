@@ -0,0 +1,154 @@
+from __future__ import annotations
+import atexit
+import os
+import pickle
+import struct
+import threading
+import time
+from typing import Any, Iterator, List, Optional, Tuple
+
+from . import metrics
+from .cache import _FUNC_CACHE, _ROUTE_CACHE, _now, _route_tags, _tag_entry
+
+# ---------------------------
+# Warm restart: cache snapshots on disk
+# ---------------------------
+# Route and function cache entries (with their write time and TTL) are written
+# every CACHE_SNAPSHOT_INTERVAL seconds and at shutdown to CACHE_SNAPSHOT_PATH,
+# and loaded back in a background thread when the app starts, so a deploy or
+# worker recycle does not wipe the caches and stampede TMDb.
+#
+# File format: MAGIC, then one record per entry:
+#   <u32 little-endian length><pickle of (table, key, ts, ttl, value, tags)>
+# (older 5-field records without tags still load; route tags are rebuilt from the key)
+# Records are independent, so a truncated file (crash mid-write) still loads
+# up to the last complete record. Writes go to a temp file + os.replace.
+# Only load snapshots this process (or its deploy) wrote: pickle trusts its input.
+# Loading unpickles under the GIL, so it yields every CACHE_SNAPSHOT_LOAD_BATCH
+# records to let request threads run while a large snapshot warms up.
+CACHE_SNAPSHOT_PATH = os.getenv("CACHE_SNAPSHOT_PATH")               # unset: disabled
+CACHE_SNAPSHOT_INTERVAL = int(os.getenv("CACHE_SNAPSHOT_INTERVAL", "300"))  # seconds
+CACHE_SNAPSHOT_LOAD_BATCH = int(os.getenv("CACHE_SNAPSHOT_LOAD_BATCH", "500"))  # records between yields
+CACHE_SNAPSHOT_LOAD_PAUSE = float(os.getenv("CACHE_SNAPSHOT_LOAD_PAUSE", "0"))  # seconds per yield
+
+MAGIC = b"MRCACHE1\n"
+_LEN = struct.Struct("<I")
+_TABLES = {"route": _ROUTE_CACHE, "func": _FUNC_CACHE}
+_VALUE_FIELD = {"route": "payload", "func": "value"}
+
+_started = False
+_lock = threading.Lock()  # one writer at a time (timer vs atexit)
+_loaded = threading.Event()  # no saves before the startup load is done
+
+
+def _records() -> Iterator[Tuple[str, str, float, Optional[float], Any, Optional[List[str]]]]:
+    now = _now()
+    for table, cache in _TABLES.items():
+        field = _VALUE_FIELD[table]
+        for key, ent in list(cache.items()):
+            ttl = ent.get("ttl")
+            if ttl is not None and now - ent["ts"] >= ttl:
+                continue  # already expired: not worth carrying over
+            yield table, key, ent["ts"], ttl, ent[field], ent.get("tags")
+
+
+def save(path: str) -> int:
+    """Write all live cache entries to `path`; returns the number written."""
+    t0 = time.perf_counter()
+    n = 0
+    tmp = f"{path}.{os.getpid()}.tmp"
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with _lock:
+        try:
+            with open(tmp, "wb") as f:
+                f.write(MAGIC)
+                for rec in _records():
+                    try:
+                        blob = pickle.dumps(rec, protocol=pickle.HIGHEST_PROTOCOL)
+                    except Exception:
+                        continue  # unpicklable value: skip the entry, keep the rest
+                    f.write(_LEN.pack(len(blob)))
+                    f.write(blob)
+                    n += 1
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):  # failed part-way: don't leave it behind
+                os.remove(tmp)
+    metrics.observe("cache_snapshot.save", time.perf_counter() - t0)
+    metrics.incr("cache_snapshot.saved", n)
+    return n
+
+
+def _read(path: str) -> Iterator[tuple]:
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a cache snapshot")
+        while True:
+            head = f.read(_LEN.size)
+            if len(head) < _LEN.size:
+                return
+            (size,) = _LEN.unpack(head)
+            blob = f.read(size)
+            if len(blob) < size:
+                return  # truncated tail
+            yield pickle.loads(blob)
+
+
+def load(path: str, batch: int = CACHE_SNAPSHOT_LOAD_BATCH, pause: float = CACHE_SNAPSHOT_LOAD_PAUSE) -> int:
+    """
+    Restore entries that are still within their TTL. Entries already present
+    (written since startup) win over the snapshot. Sleeps `pause` every `batch`
+    records (0: batch=all, no yields). Returns the number loaded.
+    """
+    t0 = time.perf_counter()
+    now = _now()
+    n = 0
+    for i, (table, key, ts, ttl, value, *rest) in enumerate(_read(path), start=1):
+        if batch and i % batch == 0:
+            time.sleep(pause)  # even sleep(0) hands the GIL to waiting request threads
+        cache = _TABLES.get(table)
+        if cache is None or (ttl is not None and now - ts >= ttl) or key in cache:
+            continue
+        ent = {"ts": ts, "ttl": ttl, _VALUE_FIELD[table]: value}
+        tags = rest[0] if rest and rest[0] else (_route_tags(key) if table == "route" else [key.split("|", 1)[0]])
+        _tag_entry(table, key, ent, tags)
+        cache[key] = ent
+        n += 1
+    metrics.observe("cache_snapshot.load", time.perf_counter() - t0)
+    metrics.incr("cache_snapshot.loaded", n)
+    return n
+
+
+def _persist() -> None:
+    if not _loaded.is_set():
+        # Exiting before the startup load finished: our cache is a fraction of
+        # the snapshot on disk, so keep the snapshot
+        print("[cache_snapshot] startup load not finished; keeping the existing snapshot")
+        return
+    try:
+        save(CACHE_SNAPSHOT_PATH)
+    except Exception as e:
+        print(f"[cache_snapshot] save to {CACHE_SNAPSHOT_PATH} failed: {e}")
+
+def _loop() -> None:
+    if os.path.exists(CACHE_SNAPSHOT_PATH):
+        try:
+            n = load(CACHE_SNAPSHOT_PATH)
+            print(f"[cache_snapshot] restored {n} entries from {CACHE_SNAPSHOT_PATH}")
+        except Exception as e:
+            print(f"[cache_snapshot] load from {CACHE_SNAPSHOT_PATH} failed: {e}")
+    _loaded.set()
+    while True:
+        time.sleep(CACHE_SNAPSHOT_INTERVAL)
+        _persist()
+
+def start_cache_snapshots() -> None:
+    """Load the last snapshot in the background, then save periodically and at exit."""
+    global _started
+    if not CACHE_SNAPSHOT_PATH or _started:
+        return
+    _started = True
+    threading.Thread(target=_loop, name="cache-snapshot", daemon=True).start()
+    atexit.register(_persist)
@@ -0,0 +1,166 @@
+from __future__ import annotations
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# =============================================================================
+# Approximate nearest neighbours: random-hyperplane LSH (cosine)
+# =============================================================================
+# Each of `n_tables` hash tables signs the vector against `n_bits` random
+# hyperplanes; similar vectors share buckets with high probability. A query
+# unions its buckets (plus 1-bit neighbour buckets when `probes` > 0) and
+# re-ranks that small candidate set exactly, so scores are true cosines.
+
+ANN_TABLES = int(os.getenv("ANN_TABLES", "8"))
+ANN_BITS = int(os.getenv("ANN_BITS", "16"))
+ANN_PROBES = int(os.getenv("ANN_PROBES", "1"))  # 0 = exact bucket only; 1 = also flip one bit
+
+
+class LSHIndex:
+    def __init__(self, dim: int, n_tables: int = ANN_TABLES, n_bits: int = ANN_BITS,
+                 probes: int = ANN_PROBES, seed: int = 13, capacity: int = 1024):
+        if n_bits > 31:
+            raise ValueError("n_bits must be <= 31")
+        self.dim, self.n_tables, self.n_bits, self.probes = dim, n_tables, n_bits, probes
+        rng = np.random.default_rng(seed)
+        self._planes = rng.standard_normal((n_tables * n_bits, dim)).astype(np.float32)
+        self._pow2 = (1 << np.arange(n_bits, dtype=np.int64))
+        self._flips = [0] + ([1 << b for b in range(n_bits)] if probes > 0 else [])
+        self._lock = threading.RLock()
+        self._X = np.zeros((capacity, dim), dtype=np.float32)
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._codes = np.zeros((capacity, n_tables), dtype=np.int64)
+        self._row: Dict[int, int] = {}
+        self._tables: List[Dict[int, List[int]]] = [dict() for _ in range(n_tables)]
+
+    def __len__(self) -> int:
+        return len(self._row)
+
+    # ---------- Hashing
+    def _hash(self, X: np.ndarray) -> np.ndarray:
+        """(n x dim) -> (n x n_tables) int bucket codes."""
+        bits = (X @ self._planes.T > 0).reshape(len(X), self.n_tables, self.n_bits)
+        return bits.astype(np.int64) @ self._pow2
+
+    # ---------- Build / insert
+    def build(self, ids: Sequence[int], X: np.ndarray) -> "LSHIndex":
+        with self._lock:
+            self._row.clear()
+            self._tables = [dict() for _ in range(self.n_tables)]
+            self.add(ids, X)
+        return self
+
+    def add(self, ids: Sequence[int], X: np.ndarray) -> None:
+        """Insert or update vectors (rows should already be L2-normalized)."""
+        ids = np.asarray(ids, dtype=np.int64)
+        X = np.asarray(X, dtype=np.float32).reshape(len(ids), self.dim)
+        if not len(ids):
+            return
+        codes = self._hash(X)
+        with self._lock:
+            for mid, x, code in zip(ids.tolist(), X, codes):
+                row = self._row.get(mid)
+                if row is None:
+                    row = len(self._row)
+                    if row >= self._X.shape[0]:
+                        self._grow()
+                    self._row[mid] = row
+                    self._ids[row] = mid
+                else:
+                    old = self._codes[row]
+                    if np.array_equal(old, code):
+                        self._X[row] = x
+                        continue
+                    for t, c in enumerate(old.tolist()):
+                        self._tables[t][c].remove(row)
+                self._X[row] = x
+                self._codes[row] = code
+                for t, c in enumerate(code.tolist()):
+                    self._tables[t].setdefault(c, []).append(row)
+
+    def _grow(self) -> None:
+        cap = self._X.shape[0] * 2
+        for name in ("_X", "_ids", "_codes"):
+            old = getattr(self, name)
+            new = np.zeros((cap,) + old.shape[1:], dtype=old.dtype)
+            new[: old.shape[0]] = old
+            setattr(self, name, new)
+
+    # ---------- Query
+    def _candidates(self, code: np.ndarray) -> np.ndarray:
+        rows: List[int] = []
+        flips = self._flips
+        for t, c in enumerate(code.tolist()):
+            get = self._tables[t].get
+            for f in flips:
+                bucket = get(c ^ f)
+                if bucket:
+                    rows.extend(bucket)
+        if not rows:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.array(rows, dtype=np.int64))
+
+    def query(self, q: np.ndarray, k: int = 10, exclude: Iterable[int] = ()) -> List[Tuple[int, float]]:
+        q = np.asarray(q, dtype=np.float32).reshape(self.dim)
+        code = self._hash(q[None, :])[0]
+        with self._lock:
+            cand = self._candidates(code)
+            if not len(cand):
+                return []
+            scores = self._X[cand] @ q
+            ids = self._ids[cand]
+        ex = set(exclude)
+        # Over-fetch by |exclude| and filter afterwards; cheaper than masking every candidate
+        kk = min(k + len(ex), len(ids))
+        top = np.argpartition(-scores, kk - 1)[:kk]
+        top = top[np.argsort(-scores[top])]
+        out = [(int(ids[j]), float(scores[j])) for j in top]
+        return [p for p in out if p[0] not in ex][:k]
+
+    # ---------- Persistence (single .npz: planes, ids, vectors, codes)
+    def save(self, path: str) -> None:
+        with self._lock:
+            n = len(self._row)
+            tmp = f"{path}.tmp"
+            with open(tmp, "wb") as fh:
+                np.savez(
+                    fh,
+                    meta=np.array([self.dim, self.n_tables, self.n_bits, self.probes], dtype=np.int64),
+                    planes=self._planes,
+                    ids=self._ids[:n],
+                    X=self._X[:n],
+                    codes=self._codes[:n],
+                )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "LSHIndex":
+        with np.load(path) as z:
+            dim, n_tables, n_bits, probes = (int(v) for v in z["meta"])
+            idx = cls(dim, n_tables=n_tables, n_bits=n_bits, probes=probes, capacity=max(1024, len(z["ids"])))
+            idx._planes = z["planes"]
+            ids, X, codes = z["ids"], z["X"], z["codes"]
+        n = len(ids)
+        idx._ids[:n], idx._X[:n], idx._codes[:n] = ids, X, codes
+        for row, mid in enumerate(ids.tolist()):
+            idx._row[mid] = row
+        for t in range(n_tables):
+            table = idx._tables[t]
+            for row, c in enumerate(codes[:, t].tolist()):
+                table.setdefault(c, []).append(row)
+        return idx
+
+
+def load_or_create(path: Optional[str], dim: int) -> LSHIndex:
+    """Load a persisted index if it matches `dim`, else start empty."""
+    if path and os.path.exists(path):
+        try:
+            idx = LSHIndex.load(path)
+            if idx.dim == dim:
+                return idx
+            print(f"[ann_index] ignoring {path}: dim {idx.dim} != {dim}")
+        except Exception as e:
+            print(f"[ann_index] failed to load {path}: {e}")
+    return LSHIndex(dim)
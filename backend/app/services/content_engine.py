@@ -0,0 +1,396 @@
+from __future__ import annotations
+import atexit
+import json
+import math
+import os
+import re
+import threading
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..core import metrics
+from .ann_index import LSHIndex, load_or_create
+from .mood_service import GENRE
+
+# =============================================================================
+# Local content-based recommender
+# =============================================================================
+# Every movie we see from TMDb becomes one L2-normalized row:
+#   [ genre one-hot | decade (soft) | popularity (soft, log) | hashed TF-IDF of title+overview ]
+# so cosine similarity is a single matrix-vector (or matrix-matrix) product.
+
+CONTENT_ENGINE_ENABLED = os.getenv("CONTENT_ENGINE_ENABLED", "1").strip().lower() in ("1", "true", "yes", "on")
+CONTENT_TEXT_DIM = int(os.getenv("CONTENT_TEXT_DIM", "512"))     # hashed vocabulary size
+CONTENT_MIN_CATALOG = int(os.getenv("CONTENT_MIN_CATALOG", "200"))  # below this, defer to TMDb
+CONTENT_MIN_SCORE = float(os.getenv("CONTENT_MIN_SCORE", "0.15"))  # ignore weak neighbours
+CONTENT_ANN_THRESHOLD = int(os.getenv("CONTENT_ANN_THRESHOLD", "20000"))  # switch to LSH above this
+# Optional directory for catalog.npz + ann.npz (loaded at import, written at exit)
+CONTENT_SNAPSHOT_DIR = os.getenv("CONTENT_SNAPSHOT_DIR")
+
+_GENRE_IDS: Tuple[int, ...] = tuple(sorted(set(GENRE.values())))
+_GENRE_COL = {gid: i for i, gid in enumerate(_GENRE_IDS)}
+_DECADES = tuple(range(1920, 2040, 10))
+_POP_BUCKETS = 6  # log10(popularity) 0..5
+
+# Block weights (applied after each block is normalized)
+_W_GENRE, _W_YEAR, _W_POP, _W_TEXT = 1.0, 0.35, 0.15, 0.9
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+_STOP = frozenset(
+    "the a an and or of to in on for with at by from as is are was were be been his her their its "
+    "this that these those who whom what when where while after before into about over under "
+    "he she they them it him we you your our not but has have had will can one two new".split()
+)
+
+# Fields kept per movie so local answers can be served in TMDb shape
+_META_FIELDS = ("id", "title", "poster_path", "backdrop_path", "release_date", "genre_ids",
+                "overview", "popularity", "vote_average")
+
+
+def _tokens(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if len(t) > 2 and t not in _STOP]
+
+def _hash(token: str, dim: int) -> int:
+    # crc32 is stable across processes (unlike hash()), so rows stay comparable
+    return zlib.crc32(token.encode("utf-8")) % dim
+
+def _soft_onehot(value: float, centers: Sequence[float]) -> np.ndarray:
+    """Triangular interpolation between the two nearest bucket centers."""
+    out = np.zeros(len(centers), dtype=np.float32)
+    if value <= centers[0]:
+        out[0] = 1.0
+        return out
+    if value >= centers[-1]:
+        out[-1] = 1.0
+        return out
+    step = centers[1] - centers[0]
+    pos = (value - centers[0]) / step
+    lo = int(math.floor(pos))
+    frac = pos - lo
+    out[lo] = 1.0 - frac
+    out[lo + 1] = frac
+    return out
+
+def _genre_ids_of(item: Dict[str, Any]) -> List[int]:
+    gids = item.get("genre_ids")
+    if not gids and isinstance(item.get("genres"), list):
+        # /movie/{id} details carry [{"id":..,"name":..}] instead of genre_ids
+        gids = [g.get("id") for g in item["genres"] if isinstance(g, dict)]
+    return [g for g in (gids or []) if isinstance(g, int)]
+
+
+class ContentEngine:
+    """
+    Growable NumPy feature matrix over the movies we have seen, with
+    batched cosine top-k queries. Thread-safe for concurrent add/query.
+    """
+
+    def __init__(self, text_dim: int = CONTENT_TEXT_DIM, capacity: int = 1024):
+        self.text_dim = text_dim
+        self._struct_dim = len(_GENRE_IDS) + len(_DECADES) + _POP_BUCKETS
+        self.dim = self._struct_dim + text_dim
+        self._lock = threading.RLock()
+        self._X = np.zeros((capacity, self.dim), dtype=np.float32)
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._row: Dict[int, int] = {}
+        self._meta: List[Dict[str, Any]] = []
+        # Hashed-term document frequencies; IDF is refreshed as the catalog grows
+        self._df = np.zeros(text_dim, dtype=np.float64)
+        self._reweighted_at = 0
+        self._dirty: Optional[set] = None  # rows written while a reweight runs off the lock
+        self._listeners: List[Any] = []
+        self._index: Optional[LSHIndex] = None
+
+    def __len__(self) -> int:
+        return len(self._meta)
+
+    def __contains__(self, mid: object) -> bool:
+        return mid in self._row
+
+    def add_listener(self, fn) -> None:
+        """fn(ids: np.ndarray, rows: np.ndarray) is called after rows are inserted or updated."""
+        self._listeners.append(fn)
+
+    def attach_index(self, index: LSHIndex) -> None:
+        """Keep `index` in sync with the catalog and use it for single queries at scale."""
+        ids, X = self.matrix()
+        if len(ids):
+            index.add(ids, X)
+        self._index = index
+        self.add_listener(index.add)
+
+    # ---------- Featurization
+    def _term_counts(self, item: Dict[str, Any]) -> Dict[int, float]:
+        counts: Dict[int, float] = {}
+        for t in _tokens(item.get("title") or item.get("name") or ""):
+            h = _hash(t, self.text_dim)
+            counts[h] = counts.get(h, 0.0) + 2.0  # titles are short; weigh them up
+        for t in _tokens(item.get("overview") or ""):
+            h = _hash(t, self.text_dim)
+            counts[h] = counts.get(h, 0.0) + 1.0
+        return counts
+
+    def _vectorize(self, item: Dict[str, Any], counts: Dict[int, float], idf: np.ndarray) -> np.ndarray:
+        v = np.zeros(self.dim, dtype=np.float32)
+        o = 0
+        gids = [_GENRE_COL[g] for g in _genre_ids_of(item) if g in _GENRE_COL]
+        if gids:
+            v[[o + c for c in gids]] = _W_GENRE / math.sqrt(len(gids))
+        o += len(_GENRE_IDS)
+        year = (item.get("release_date") or "")[:4]
+        if year.isdigit():
+            v[o:o + len(_DECADES)] = _W_YEAR * _soft_onehot(float(year), _DECADES)
+        o += len(_DECADES)
+        pop = float(item.get("popularity") or 0.0)
+        v[o:o + _POP_BUCKETS] = _W_POP * _soft_onehot(math.log10(1.0 + pop), range(_POP_BUCKETS))
+        o += _POP_BUCKETS
+        if counts:
+            cols = np.fromiter(counts.keys(), dtype=np.int64)
+            tf = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float64))  # sublinear tf
+            w = tf * idf[cols]
+            n = np.linalg.norm(w)
+            if n > 0:
+                v[o + cols] = (_W_TEXT * w / n).astype(np.float32)
+        n = np.linalg.norm(v)
+        return v / n if n > 0 else v
+
+    def _idf(self) -> np.ndarray:
+        n = max(1, len(self._meta))
+        return np.log((1.0 + n) / (1.0 + self._df)) + 1.0
+
+    # ---------- Ingestion
+    def add_many(self, items: Iterable[Dict[str, Any]]) -> int:
+        """Insert or refresh movies (TMDb list or details shape). Returns rows touched."""
+        touched: List[int] = []
+        with self._lock:
+            for it in items:
+                if not isinstance(it, dict) or not isinstance(it.get("id"), int) or not it.get("poster_path"):
+                    continue
+                mid = it["id"]
+                meta = {f: it.get(f) for f in _META_FIELDS}
+                meta["title"] = it.get("title") or it.get("name")
+                meta["genre_ids"] = _genre_ids_of(it)
+                counts = self._term_counts(meta)
+                row = self._row.get(mid)
+                if row is None:
+                    row = len(self._meta)
+                    if row >= self._X.shape[0]:
+                        self._grow()
+                    self._row[mid] = row
+                    self._ids[row] = mid
+                    self._meta.append(meta)
+                    if counts:
+                        self._df[np.fromiter(counts.keys(), dtype=np.int64)] += 1.0
+                else:
+                    # Keep richer fields we already know (e.g. overview from details)
+                    old = self._meta[row]
+                    for f in _META_FIELDS:
+                        if meta.get(f) in (None, [], "") and old.get(f) not in (None, [], ""):
+                            meta[f] = old[f]
+                    old_counts = self._term_counts(old)
+                    counts = self._term_counts(meta)
+                    if old_counts.keys() != counts.keys():
+                        if old_counts:
+                            self._df[np.fromiter(old_counts.keys(), dtype=np.int64)] -= 1.0
+                        if counts:
+                            self._df[np.fromiter(counts.keys(), dtype=np.int64)] += 1.0
+                    self._meta[row] = meta
+                touched.append(row)
+            if not touched:
+                return 0
+            if self._dirty is not None:
+                self._dirty.update(touched)
+            # Catalog doubled since the last IDF refresh: re-vectorize everything (amortized O(1))
+            reweight = self._dirty is None and len(self._meta) >= 2 * max(64, self._reweighted_at)
+            idf = self._idf()
+            if reweight:
+                self._dirty, metas = set(), list(self._meta)
+            for row in touched:
+                meta = self._meta[row]
+                self._X[row] = self._vectorize(meta, self._term_counts(meta), idf)
+            rows = np.asarray(touched, dtype=np.int64)
+            ids, X = self._ids[rows].copy(), self._X[rows].copy()
+        metrics.incr("content_engine.rows_upserted", len(touched))
+        for fn in self._listeners:
+            try:
+                fn(ids, X)
+            except Exception as e:
+                print(f"[content_engine] listener failed: {e}")
+        if reweight:
+            self._reweight(metas, idf)
+        return len(touched)
+
+    def _grow(self) -> None:
+        cap = self._X.shape[0] * 2
+        X = np.zeros((cap, self.dim), dtype=np.float32)
+        X[: self._X.shape[0]] = self._X
+        ids = np.zeros(cap, dtype=np.int64)
+        ids[: self._ids.shape[0]] = self._ids
+        self._X, self._ids = X, ids
+
+    def _reweight(self, metas: List[Dict[str, Any]], idf: np.ndarray) -> None:
+        """
+        Re-vectorize a snapshot of the catalog under a fresh IDF without holding
+        the lock, then swap the rows in. Rows written meanwhile are redone at swap.
+        """
+        n = len(metas)
+        X = np.zeros((n, self.dim), dtype=np.float32)
+        for row, meta in enumerate(metas):
+            X[row] = self._vectorize(meta, self._term_counts(meta), idf)
+        with self._lock:
+            dirty, self._dirty = self._dirty or set(), None
+            fresh = np.ones(n, dtype=bool)
+            fresh[[r for r in dirty if r < n]] = False
+            self._X[:n][fresh] = X[fresh]
+            for row in dirty:
+                meta = self._meta[row]
+                self._X[row] = self._vectorize(meta, self._term_counts(meta), idf)
+            self._reweighted_at = n
+            ids, X = self._ids[:n], self._X[:n]
+        metrics.incr("content_engine.reweights")
+        if self._index is not None:
+            self._index.add(ids, X)  # ingestion is serialized, so these rows stay current
+
+    # ---------- Queries
+    def vector_of(self, mid: int) -> Optional[np.ndarray]:
+        row = self._row.get(mid)
+        return None if row is None else self._X[row].copy()
+
+    def meta_of(self, mid: int) -> Optional[Dict[str, Any]]:
+        row = self._row.get(mid)
+        return None if row is None else dict(self._meta[row])
+
+    def featurize(self, items: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """
+        Feature rows for arbitrary items: the stored row for known ids, otherwise
+        vectorized on the fly with the current IDF (nothing is inserted).
+        """
+        F = np.zeros((len(items), self.dim), dtype=np.float32)
+        idf = None
+        for i, it in enumerate(items):
+            row = self._row.get(it.get("id")) if isinstance(it, dict) else None
+            if row is not None:
+                F[i] = self._X[row]
+                continue
+            if not isinstance(it, dict):
+                continue
+            if idf is None:
+                idf = self._idf()
+            meta = dict(it)
+            meta["genre_ids"] = _genre_ids_of(it)
+            if not meta.get("release_date") and it.get("year"):
+                meta["release_date"] = f"{it['year']}"
+            F[i] = self._vectorize(meta, self._term_counts(meta), idf)
+        return F
+
+    def matrix(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(ids, rows) views over the populated part of the matrix."""
+        with self._lock:
+            n = len(self._meta)
+            return self._ids[:n], self._X[:n]
+
+    def topk_batch(self, Q: np.ndarray, k: int, exclude: Optional[Sequence[Iterable[int]]] = None
+                   ) -> List[List[Tuple[int, float]]]:
+        """
+        Cosine top-k for a batch of query vectors Q (b x dim) with one GEMM.
+        `exclude[i]` are movie ids to drop from row i (e.g. the seed itself).
+        """
+        ids, X = self.matrix()
+        if not len(ids) or k <= 0:
+            return [[] for _ in range(len(Q))]
+        S = Q.astype(np.float32) @ X.T  # (b x n)
+        out: List[List[Tuple[int, float]]] = []
+        for i in range(S.shape[0]):
+            s = S[i]
+            if exclude and exclude[i]:
+                rows = [self._row[m] for m in exclude[i] if m in self._row]
+                s = s.copy()
+                s[rows] = -np.inf
+            kk = min(k, len(s))
+            top = np.argpartition(-s, kk - 1)[:kk]
+            top = top[np.argsort(-s[top])]
+            out.append([(int(ids[j]), float(s[j])) for j in top if s[j] >= CONTENT_MIN_SCORE])
+        return out
+
+    def similar(self, mid: int, k: int = 20, exclude: Iterable[int] = ()) -> List[Tuple[int, float]]:
+        v = self.vector_of(mid)
+        if v is None:
+            return []
+        skip = set(exclude) | {mid}
+        if self._index is not None and len(self) >= CONTENT_ANN_THRESHOLD:
+            metrics.incr("content_engine.query.ann")
+            return [(i, sc) for i, sc in self._index.query(v, k, skip) if sc >= CONTENT_MIN_SCORE]
+        metrics.incr("content_engine.query.exact")
+        return self.topk_batch(v[None, :], k, [skip])[0]
+
+    def similar_items(self, mid: int, k: int = 20, exclude: Iterable[int] = ()) -> List[Dict[str, Any]]:
+        """similar() resolved to TMDb-shaped dicts, best first."""
+        return [m for m in (self.meta_of(i) for i, _ in self.similar(mid, k, exclude)) if m]
+
+    def ready(self) -> bool:
+        return CONTENT_ENGINE_ENABLED and len(self) >= CONTENT_MIN_CATALOG
+
+    # ---------- Persistence
+    def save(self, path: str) -> None:
+        with self._lock:
+            n = len(self._meta)
+            tmp = f"{path}.tmp"
+            with open(tmp, "wb") as fh:
+                np.savez(
+                    fh,
+                    ids=self._ids[:n],
+                    X=self._X[:n],
+                    df=self._df,
+                    meta=np.frombuffer(json.dumps(self._meta).encode("utf-8"), dtype=np.uint8),
+                )
+        os.replace(tmp, path)
+
+    def load(self, path: str) -> None:
+        with np.load(path) as z:
+            if z["df"].shape != self._df.shape:
+                raise ValueError("text_dim mismatch")
+            ids, X, df = z["ids"], z["X"], z["df"]
+            meta = json.loads(z["meta"].tobytes().decode("utf-8"))
+        with self._lock:
+            n = len(ids)
+            cap = max(1024, 1 << max(0, n - 1).bit_length())
+            self._X = np.zeros((cap, self.dim), dtype=np.float32)
+            self._ids = np.zeros(cap, dtype=np.int64)
+            self._X[:n], self._ids[:n], self._df = X, ids, df
+            self._meta = meta
+            self._row = {int(m): r for r, m in enumerate(ids.tolist())}
+            self._reweighted_at = n
+
+
+# Process-wide engine fed by every TMDb list we fetch
+engine = ContentEngine()
+metrics.register_gauge("content_engine.catalog_size", lambda: len(engine))
+
+def _snapshot_paths() -> Tuple[str, str]:
+    d = CONTENT_SNAPSHOT_DIR or ""
+    return os.path.join(d, "catalog.npz"), os.path.join(d, "ann.npz")
+
+def persist_engine() -> None:
+    """Write catalog + ANN index to CONTENT_SNAPSHOT_DIR (no-op when unset)."""
+    if not CONTENT_SNAPSHOT_DIR:
+        return
+    os.makedirs(CONTENT_SNAPSHOT_DIR, exist_ok=True)
+    catalog_path, ann_path = _snapshot_paths()
+    engine.save(catalog_path)
+    if engine._index is not None:
+        engine._index.save(ann_path)
+
+def _restore_engine() -> None:
+    catalog_path, ann_path = _snapshot_paths()
+    if CONTENT_SNAPSHOT_DIR and os.path.exists(catalog_path):
+        try:
+            engine.load(catalog_path)
+        except Exception as e:
+            print(f"[content_engine] failed to load {catalog_path}: {e}")
+    index = load_or_create(ann_path if CONTENT_SNAPSHOT_DIR else None, engine.dim)
+    engine.attach_index(index)
+
+_restore_engine()
+atexit.register(persist_engine)
@@ -0,0 +1,154 @@
+from __future__ import annotations
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..clients.tmdb import session, tmdb_url
+from ..core import metrics
+from ..core.concurrency import submit
+from .content_engine import engine as content_engine
+from .mood_service import map_mood, supported_moods
+from .providers_service import ALLOWED_REGIONS
+from .rerank import diversify
+
+# Precomputed per-(mood, region, language) candidate pools.
+# Opt-in: the refresher issues MOOD_POOL_DEPTH discover calls per combination.
+MOOD_POOL_ENABLED = os.getenv("MOOD_POOL_ENABLED", "0").strip().lower() in ("1", "true", "yes", "on")
+MOOD_POOL_LANGUAGES = [
+    p.strip() for p in os.getenv("MOOD_POOL_LANGUAGES", os.getenv("DEFAULT_LANGUAGE", "en-US")).split(",")
+    if p.strip()
+]
+MOOD_POOL_DEPTH = int(os.getenv("MOOD_POOL_DEPTH", "5"))             # TMDb pages per combination
+MOOD_POOL_REFRESH = int(os.getenv("MOOD_POOL_REFRESH", "3600"))       # seconds between full refreshes
+MOOD_POOL_PACE = float(os.getenv("MOOD_POOL_PACE", "0.25"))           # seconds between combinations
+MOOD_POOL_TIMEOUT = float(os.getenv("MOOD_POOL_TIMEOUT", "10"))       # per discover call
+
+PoolKey = Tuple[str, str, str]  # (canonical mood, region, language)
+
+@dataclass
+class MoodPool:
+    items: List[Dict[str, Any]] = field(default_factory=list)
+    built_at: float = 0.0
+
+    def page(self, page: int, page_size: int) -> Dict[str, Any]:
+        start = (page - 1) * page_size
+        return {
+            "page": page,
+            "total_pages": math.ceil(len(self.items) / page_size) if self.items else 0,
+            "total_results": len(self.items),
+            "results": self.items[start:start + page_size],
+        }
+
+_POOLS: Dict[PoolKey, MoodPool] = {}
+_refresher: Optional[threading.Thread] = None
+
+def _discover_params(genres: str, page: int, language: str, region: Optional[str]) -> Dict[str, Any]:
+    params: Dict[str, Any] = {
+        "language": language,
+        "include_adult": "false",
+        "page": page,
+        "sort_by": "popularity.desc",
+        "vote_count.gte": 50,
+    }
+    if genres:
+        params["with_genres"] = genres
+    if region:
+        params["region"] = region
+        params["watch_region"] = region
+    return params
+
+def _fetch_page(params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    r = session.get(tmdb_url("/discover/movie"), params=params, timeout=MOOD_POOL_TIMEOUT)
+    if not getattr(r, "ok", False):
+        return []
+    return (r.json() or {}).get("results") or []
+
+def _slim(it: Dict[str, Any]) -> Dict[str, Any]:
+    # Same shape /recommend/mood serves, plus popularity for re-ranking
+    return {
+        "id": it.get("id"),
+        "title": it.get("title") or it.get("name") or "Untitled",
+        "year": (it.get("release_date") or "")[:4] or None,
+        "poster_path": it.get("poster_path"),
+        "genre_ids": it.get("genre_ids") or [],
+        "popularity": it.get("popularity"),
+    }
+
+def build_pool(mood: str, region: str, language: str) -> MoodPool:
+    """
+    Fetch MOOD_POOL_DEPTH discover pages concurrently and merge them into one
+    ranked, de-duplicated, poster-only pool. Falls back to the global (no region)
+    strategy when the regional one comes back empty.
+    """
+    rule = map_mood(mood)
+    boost = rule.get("boostGenres", []) or []
+    genres = ",".join(map(str, boost))
+    t0 = time.perf_counter()
+    items: List[Dict[str, Any]] = []
+    for reg in (region, None):
+        futs = [submit(_fetch_page, _discover_params(genres, p, language, reg))
+                for p in range(1, MOOD_POOL_DEPTH + 1)]
+        for f in futs:  # page order == TMDb popularity rank
+            try:
+                items.extend(f.result(timeout=MOOD_POOL_TIMEOUT))
+            except Exception as e:
+                print(f"[mood_pool] page fetch failed mood={mood} region={reg}: {e}")
+        if any(it.get("poster_path") for it in items):
+            break
+        items = []
+    seen: set[int] = set()
+    ranked: List[Dict[str, Any]] = []
+    for it in items:
+        mid = it.get("id")
+        if not isinstance(mid, int) or mid in seen or not it.get("poster_path"):
+            continue
+        seen.add(mid)
+        ranked.append(_slim(it))
+    content_engine.add_many(items)
+    # Diversity re-rank once per refresh; serving stays a plain slice
+    ranked = diversify(ranked, len(ranked), "mood")
+    metrics.observe("mood_pool.build", time.perf_counter() - t0)
+    return MoodPool(items=ranked, built_at=time.time())
+
+def get_pool(mood: str, region: str, language: str) -> Optional[MoodPool]:
+    pool = _POOLS.get((mood, region, language))
+    if pool is None:
+        metrics.incr("mood_pool.miss")
+        return None
+    metrics.incr("mood_pool.hit")
+    return pool
+
+def refresh_pool(mood: str, region: str, language: str) -> MoodPool:
+    pool = build_pool(mood, region, language)
+    if pool.items:
+        _POOLS[(mood, region, language)] = pool  # atomic swap; readers keep the old pool
+    return pool
+
+def refresh_all() -> None:
+    for language in MOOD_POOL_LANGUAGES:
+        for mood in supported_moods():
+            for region in sorted(ALLOWED_REGIONS):
+                try:
+                    refresh_pool(mood, region, language)
+                except Exception as e:
+                    print(f"[mood_pool] refresh failed {mood}/{region}/{language}: {e}")
+                time.sleep(MOOD_POOL_PACE)
+
+def _refresh_loop() -> None:
+    while True:
+        t0 = time.time()
+        refresh_all()
+        metrics.incr("mood_pool.refresh_cycles")
+        time.sleep(max(0.0, MOOD_POOL_REFRESH - (time.time() - t0)))
+
+def start_mood_pool_refresher() -> None:
+    """Start the background refresher once per process (no-op unless MOOD_POOL_ENABLED)."""
+    global _refresher
+    if not MOOD_POOL_ENABLED or _refresher is not None:
+        return
+    metrics.register_gauge("mood_pool.size", lambda: len(_POOLS))
+    _refresher = threading.Thread(target=_refresh_loop, name="mood-pool-refresher", daemon=True)
+    _refresher.start()
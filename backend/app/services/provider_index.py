@@ -0,0 +1,187 @@
+from __future__ import annotations
+import heapq
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from ..clients.tmdb import session, tmdb_url
+from ..core import metrics
+from ..core.breaker import BreakerOpen
+
+# =============================================================================
+# Inverted availability index: (region, provider_id, monetization) -> movie ids
+# =============================================================================
+# Built from every watch/providers document we fetch. "Available on Netflix or
+# Prime in GB" is then a union + membership test over sorted id arrays instead
+# of one upstream call per listed movie. Movies we have no document for are
+# queued and fetched by a paced background refresher, which also re-fetches
+# documents older than PROVIDER_INDEX_REFRESH.
+
+PROVIDER_INDEX_ENABLED = os.getenv("PROVIDER_INDEX_ENABLED", "1").strip().lower() in ("1", "true", "yes", "on")
+PROVIDER_INDEX_REFRESH = int(os.getenv("PROVIDER_INDEX_REFRESH", str(24 * 3600)))  # max document age, seconds
+PROVIDER_INDEX_PACE = float(os.getenv("PROVIDER_INDEX_PACE", "0.2"))               # seconds between fetches
+PROVIDER_INDEX_MAX_PENDING = int(os.getenv("PROVIDER_INDEX_MAX_PENDING", "5000"))
+
+MONETIZATION_TYPES = ("flatrate", "free", "ads", "rent", "buy")
+STREAMING_TYPES = ("flatrate", "free", "ads")
+
+Key = Tuple[str, int, str]  # (region, provider_id, monetization type)
+
+
+def _keys_of(raw: Dict[str, Any]) -> FrozenSet[Key]:
+    keys: Set[Key] = set()
+    for region, loc in ((raw or {}).get("results") or {}).items():
+        if not isinstance(loc, dict):
+            continue
+        for mt in MONETIZATION_TYPES:
+            for p in loc.get(mt) or []:
+                pid = p.get("provider_id") if isinstance(p, dict) else None
+                if isinstance(pid, int):
+                    keys.add((region, pid, mt))
+    return frozenset(keys)
+
+
+class ProviderIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys: Dict[int, FrozenSet[Key]] = {}          # movie -> its postings (for replacement)
+        self._fetched_at: Dict[int, float] = {}
+        self._due: List[Tuple[float, int]] = []             # (fetched_at, mid) heap; stale pairs skipped lazily
+        self._post: Dict[Key, Set[int]] = defaultdict(set)
+        self._arrays: Dict[Key, np.ndarray] = {}            # sorted snapshots, rebuilt lazily after writes
+        self._pending: "OrderedDict[int, None]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def known(self, mid: int) -> bool:
+        return mid in self._keys
+
+    def ingest(self, mid: int, raw: Dict[str, Any]) -> None:
+        """Replace everything we know about `mid` with this providers document."""
+        keys = _keys_of(raw)
+        with self._lock:
+            old = self._keys.get(mid, frozenset())
+            for k in old - keys:
+                self._post[k].discard(mid)
+                self._arrays.pop(k, None)
+            for k in keys - old:
+                self._post[k].add(mid)
+                self._arrays.pop(k, None)
+            self._keys[mid] = keys
+            self._touch(mid)
+            self._pending.pop(mid, None)
+
+    def _touch(self, mid: int) -> None:
+        now = time.time()
+        self._fetched_at[mid] = now
+        heapq.heappush(self._due, (now, mid))
+        if len(self._due) > 2 * len(self._fetched_at) + 64:  # mostly superseded pairs: rebuild
+            self._due = [(ts, m) for m, ts in self._fetched_at.items()]
+            heapq.heapify(self._due)
+
+    def _array(self, key: Key) -> np.ndarray:
+        arr = self._arrays.get(key)
+        if arr is None:
+            arr = np.fromiter(self._post.get(key, ()), dtype=np.int64)
+            arr.sort()
+            self._arrays[key] = arr
+        return arr
+
+    def movies(self, region: str, provider_ids: Iterable[int], types: Sequence[str] = STREAMING_TYPES) -> np.ndarray:
+        """Sorted ids of movies offered by any of `provider_ids` in `region` under any of `types`."""
+        with self._lock:
+            parts = [self._array((region, pid, mt)) for pid in provider_ids for mt in types]
+        if not parts:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(parts))
+
+    def filter(self, items: List[Dict[str, Any]], region: str, provider_ids: Sequence[int],
+               types: Sequence[str] = STREAMING_TYPES) -> Tuple[List[Dict[str, Any]], List[int]]:
+        """
+        Keep items available on any provider. Returns (kept, unknown_ids); unknown
+        movies are dropped for now and queued for the background refresher.
+        """
+        allowed = self.movies(region, provider_ids, types)
+        kept: List[Dict[str, Any]] = []
+        unknown: List[int] = []
+        for it in items:
+            mid = it.get("id")
+            if not isinstance(mid, int):
+                continue
+            i = int(np.searchsorted(allowed, mid))
+            if i < len(allowed) and allowed[i] == mid:
+                kept.append(it)
+            elif not self.known(mid):
+                unknown.append(mid)
+        self.want(unknown)
+        return kept, unknown
+
+    def want(self, ids: Iterable[int]) -> None:
+        """Queue movies whose providers document we do not have yet."""
+        with self._lock:
+            for mid in ids:
+                if mid not in self._keys:
+                    self._pending[mid] = None
+                    self._pending.move_to_end(mid)
+            while len(self._pending) > PROVIDER_INDEX_MAX_PENDING:
+                self._pending.popitem(last=False)
+
+    def next_due(self, max_age: float) -> Optional[int]:
+        """Most recently wanted unknown movie, else the stalest known one past max_age."""
+        with self._lock:
+            if self._pending:
+                return self._pending.popitem(last=True)[0]
+            while self._due and self._fetched_at.get(self._due[0][1]) != self._due[0][0]:
+                heapq.heappop(self._due)  # superseded by a later fetch
+            if not self._due or time.time() - self._due[0][0] <= max_age:
+                return None
+            _, mid = heapq.heappop(self._due)
+            self._touch(mid)  # a failed refresh retries after another max_age
+            return mid
+
+
+# Process-wide index, fed by routes._tmdb_watch_providers and the refresher
+index = ProviderIndex()
+metrics.register_gauge("provider_index.movies", lambda: len(index))
+metrics.register_gauge("provider_index.pending", lambda: len(index._pending))
+
+_refresher: Optional[threading.Thread] = None
+
+
+def _fetch_one(mid: int) -> None:
+    r = session.get(tmdb_url(f"/movie/{mid}/watch/providers"), timeout=10)
+    if getattr(r, "ok", False):
+        index.ingest(mid, r.json() or {})
+        metrics.incr("provider_index.fetched")
+    else:
+        metrics.incr("provider_index.fetch_failed")
+
+def _refresh_loop() -> None:
+    while True:
+        mid = index.next_due(PROVIDER_INDEX_REFRESH)
+        if mid is None:
+            time.sleep(5.0)
+            continue
+        try:
+            _fetch_one(mid)
+        except BreakerOpen as e:
+            index.want([mid])  # TMDb is down: keep it queued and wait for the probe window
+            time.sleep(max(e.retry_after, PROVIDER_INDEX_PACE))
+            continue
+        except Exception as e:
+            print(f"[provider_index] fetch mid={mid} failed: {e}")
+            metrics.incr("provider_index.fetch_failed")
+        time.sleep(PROVIDER_INDEX_PACE)
+
+def start_provider_index_refresher() -> None:
+    """Start the background fetch/refresh loop once per process."""
+    global _refresher
+    if not PROVIDER_INDEX_ENABLED or _refresher is not None:
+        return
+    _refresher = threading.Thread(target=_refresh_loop, name="provider-index-refresher", daemon=True)
+    _refresher.start()
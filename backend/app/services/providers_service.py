@@ -27,9 +27,9 @@ def normalize_providers(raw: dict, region: str) -> dict:
         return {"stream": [], "rent": [], "buy": [], "link": None}
 
     def pick(items: List[Dict[str, Any]] | None):
-        items = items or []
-        # Sort by TMDb display_priority then name, and de-dupe by provider_id
-        items.sort(key=lambda i: (i.get("display_priority", 9999), i.get("provider_name", "")))
+        # Sort by TMDb display_priority then name, and de-dupe by provider_id.
+        # sorted() (not .sort()): the raw document is cached and shared across regions.
+        items = sorted(items or [], key=lambda i: (i.get("display_priority", 9999), i.get("provider_name", "")))
         seen, out = set(), []
         for i in items:
             pid = i.get("provider_id")
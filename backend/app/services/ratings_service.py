@@ -0,0 +1,416 @@
+from __future__ import annotations
+import atexit
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from ..core import metrics
+
+# =============================================================================
+# Ratings storage + implicit-feedback ALS
+# =============================================================================
+# Ratings (1..5 stars, 0 = delete) live in three parallel growable arrays
+# (user row, movie col, rating) — a COO sparse matrix at 9 bytes per rating —
+# found by a sorted array of packed (user << 32 | movie) keys plus their slots
+# (12 bytes per rating). Keys written since the last rebuild sit in a small
+# dict until it reaches 1/16 of the store, so upserts stay amortized O(log n).
+# Training converts to CSR once and runs implicit ALS (Hu, Koren & Volinsky 2008):
+#   preference p = 1 if rating >= 3 else 0, confidence c = 1 + alpha * |rating - 2.5|
+# so disliked titles are pushed away rather than treated as positives.
+
+RATINGS_FACTORS = int(os.getenv("RATINGS_FACTORS", "32"))
+RATINGS_REG = float(os.getenv("RATINGS_REG", "0.1"))
+RATINGS_ALPHA = float(os.getenv("RATINGS_ALPHA", "8.0"))
+RATINGS_ITERS = int(os.getenv("RATINGS_ITERS", "8"))
+RATINGS_TRAIN_INTERVAL = int(os.getenv("RATINGS_TRAIN_INTERVAL", "900"))  # seconds; 0 disables
+RATINGS_PATH = os.getenv("RATINGS_PATH")  # optional .npz, loaded at import and written at exit
+RATINGS_CG_STEPS = int(os.getenv("RATINGS_CG_STEPS", "3"))  # conjugate-gradient steps per half-step
+
+_PENDING_ITEM_BYTES = 100  # dict slot + boxed int key and value, per unmerged index entry
+
+
+class RatingsStore:
+    def __init__(self, capacity: int = 4096):
+        self._lock = threading.RLock()
+        self._u = np.zeros(capacity, dtype=np.int32)
+        self._m = np.zeros(capacity, dtype=np.int32)
+        self._r = np.zeros(capacity, dtype=np.int8)
+        self._n = 0
+        self._keys = np.zeros(0, dtype=np.int64)   # sorted packed keys...
+        self._slots = np.zeros(0, dtype=np.int32)  # ...and their slots (-1: deleted since the rebuild)
+        self._pending: Dict[int, int] = {}         # packed key -> slot, newer than the sorted index
+        self.user_keys: List[str] = []
+        self.movie_ids: List[int] = []
+        self._user_row: Dict[str, int] = {}
+        self._movie_col: Dict[int, int] = {}
+        self.version = 0  # bumps on every write; the trainer skips unchanged data
+        self._user_versions: Dict[str, int] = {}  # per-user write count: who needs a fold-in
+
+    def __len__(self) -> int:
+        return self._n
+
+    def nbytes(self) -> int:
+        """Bytes held per rating: the COO arrays plus the (user, movie) index."""
+        return self._u[: self._n].nbytes + self._m[: self._n].nbytes + self._r[: self._n].nbytes + self.index_nbytes()
+
+    def index_nbytes(self) -> int:
+        return self._keys.nbytes + self._slots.nbytes + _PENDING_ITEM_BYTES * len(self._pending)
+
+    # ---------- (user, movie) -> slot index
+    @staticmethod
+    def _key(u: int, m: int) -> int:
+        return (u << 32) | m
+
+    def _sorted_at(self, key: int) -> int:
+        """Position of key in the sorted index, or -1."""
+        i = int(np.searchsorted(self._keys, key))
+        return i if i < len(self._keys) and self._keys[i] == key else -1
+
+    def _find(self, key: int) -> Optional[int]:
+        slot = self._pending.get(key)
+        if slot is not None:
+            return slot
+        i = self._sorted_at(key)
+        if i < 0 or self._slots[i] < 0:
+            return None
+        return int(self._slots[i])
+
+    def _index_set(self, key: int, slot: int) -> None:
+        """Point key at slot (-1 removes it)."""
+        i = self._sorted_at(key)
+        if i >= 0:
+            self._slots[i] = slot
+            return
+        if slot < 0:
+            self._pending.pop(key, None)
+            return
+        self._pending[key] = slot
+        if len(self._pending) > max(1024, self._n >> 4):
+            self._reindex()
+
+    def _reindex(self) -> None:
+        """Rebuild the sorted index from the COO arrays and drop the pending dict."""
+        n = self._n
+        keys = (self._u[:n].astype(np.int64) << 32) | self._m[:n].astype(np.int64)
+        order = np.argsort(keys, kind="stable")
+        self._keys, self._slots, self._pending = keys[order], order.astype(np.int32), {}
+
+    def _user(self, key: str) -> int:
+        row = self._user_row.get(key)
+        if row is None:
+            row = self._user_row[key] = len(self.user_keys)
+            self.user_keys.append(key)
+        return row
+
+    def _movie(self, mid: int) -> int:
+        col = self._movie_col.get(mid)
+        if col is None:
+            col = self._movie_col[mid] = len(self.movie_ids)
+            self.movie_ids.append(mid)
+        return col
+
+    def upsert(self, user: str, movie_id: int, rating: int) -> None:
+        with self._lock:
+            u, m = self._user(user), self._movie(movie_id)
+            slot = self._find(self._key(u, m))
+            if rating <= 0:
+                if slot is not None:
+                    self._delete(slot)
+            elif slot is not None:
+                self._r[slot] = rating
+            else:
+                if self._n >= len(self._u):
+                    self._grow()
+                self._u[self._n], self._m[self._n], self._r[self._n] = u, m, rating
+                self._n += 1
+                self._index_set(self._key(u, m), self._n - 1)
+            self.version += 1
+            self._user_versions[user] = self._user_versions.get(user, 0) + 1
+
+    def user_version(self, user: str) -> int:
+        return self._user_versions.get(user, 0)
+
+    def user_versions(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._user_versions)
+
+    def bulk_load(self, users: np.ndarray, movies: np.ndarray, ratings: np.ndarray) -> None:
+        """Vectorized append of already-indexed rows (benchmarks, snapshot restore)."""
+        with self._lock:
+            n = len(users)
+            while self._n + n > len(self._u):
+                self._grow()
+            s = slice(self._n, self._n + n)
+            self._u[s], self._m[s], self._r[s] = users, movies, ratings
+            self._n += n
+            self._reindex()
+            self.version += 1
+
+    def _delete(self, slot: int) -> None:
+        # Swap-remove keeps the arrays dense
+        last = self._n - 1
+        self._index_set(self._key(int(self._u[slot]), int(self._m[slot])), -1)
+        self._n = last  # shrink first: a rebuild triggered below must not see the stale tail
+        if slot != last:
+            self._u[slot], self._m[slot], self._r[slot] = self._u[last], self._m[last], self._r[last]
+            self._index_set(self._key(int(self._u[slot]), int(self._m[slot])), slot)
+
+    def _grow(self) -> None:
+        cap = len(self._u) * 2
+        for name in ("_u", "_m", "_r"):
+            old = getattr(self, name)
+            new = np.zeros(cap, dtype=old.dtype)
+            new[: len(old)] = old
+            setattr(self, name, new)
+
+    def user_row(self, user: str) -> Optional[int]:
+        return self._user_row.get(user)
+
+    def user_ratings(self, user: str) -> List[Tuple[int, int]]:
+        """[(movie_id, rating)] for one user."""
+        u = self._user_row.get(user)
+        if u is None:
+            return []
+        with self._lock:
+            n = self._n
+            sel = np.flatnonzero(self._u[:n] == u)
+            return [(self.movie_ids[int(self._m[i])], int(self._r[i])) for i in sel]
+
+    def csr(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int, int]:
+        """(indptr, cols, ratings, n_users, n_movies) sorted by user row."""
+        with self._lock:
+            n = self._n
+            u, m, r = self._u[:n].copy(), self._m[:n].copy(), self._r[:n].copy()
+            n_users, n_movies = len(self.user_keys), len(self.movie_ids)
+        order = np.argsort(u, kind="stable")
+        indptr = np.zeros(n_users + 1, dtype=np.int64)
+        np.cumsum(np.bincount(u, minlength=n_users), out=indptr[1:])
+        return indptr, m[order], r[order], n_users, n_movies
+
+    # ---------- Persistence
+    def save(self, path: str) -> None:
+        with self._lock:
+            n = self._n
+            tmp = f"{path}.tmp"
+            with open(tmp, "wb") as fh:
+                np.savez(
+                    fh,
+                    u=self._u[:n], m=self._m[:n], r=self._r[:n],
+                    movie_ids=np.asarray(self.movie_ids, dtype=np.int64),
+                    user_keys=np.frombuffer(json.dumps(self.user_keys).encode("utf-8"), dtype=np.uint8),
+                )
+        os.replace(tmp, path)
+
+    def load(self, path: str) -> None:
+        with np.load(path) as z:
+            u, m, r = z["u"], z["m"], z["r"]
+            movie_ids = z["movie_ids"].tolist()
+            user_keys = json.loads(z["user_keys"].tobytes().decode("utf-8"))
+        with self._lock:
+            self.user_keys, self.movie_ids = user_keys, movie_ids
+            self._user_row = {k: i for i, k in enumerate(user_keys)}
+            self._movie_col = {mid: i for i, mid in enumerate(movie_ids)}
+            self._n = 0
+            self.bulk_load(u, m, r)
+
+
+# ---------------------------
+# Implicit ALS
+# ---------------------------
+def _confidence(r: np.ndarray, alpha: float) -> Tuple[np.ndarray, np.ndarray]:
+    r = r.astype(np.float32)
+    pref = (r >= 3).astype(np.float32)
+    conf = 1.0 + alpha * np.abs(r - 2.5)
+    return conf, pref
+
+def _solve_rows(indptr: np.ndarray, cols: np.ndarray, conf: np.ndarray, pref: np.ndarray,
+                Y: np.ndarray, X0: np.ndarray, reg: float, cg_steps: int = RATINGS_CG_STEPS) -> np.ndarray:
+    """
+    One ALS half-step: for every row u approximately solve
+      (YtY + Yu^T (Cu - I) Yu + reg*I) x_u = Yu^T Cu p_u
+    with a few conjugate-gradient steps run for all rows at once, warm-started
+    from X0 (Takacs et al. 2011). Each step costs O(nnz * k), never O(nnz * k^2).
+    """
+    n_rows, k = len(indptr) - 1, Y.shape[1]
+    nnz = np.diff(indptr)
+    nonempty = np.flatnonzero(nnz)
+    if not len(nonempty):
+        return np.zeros((n_rows, k), dtype=np.float32)
+    # Work in (k x nnz) layout: segment sums along contiguous rows are ~5x faster
+    starts = indptr[nonempty]
+    rows = np.repeat(np.arange(n_rows), nnz)
+    YcT = np.ascontiguousarray(Y[cols].T)          # one gather per half-step
+    w = (conf - 1.0).astype(np.float32)
+    YtY = (Y.T @ Y).astype(np.float32)
+
+    def segsum(v: np.ndarray) -> np.ndarray:
+        out = np.zeros((k, n_rows), dtype=np.float32)
+        out[:, nonempty] = np.add.reduceat(v, starts, axis=1)
+        return out
+
+    def A(PT: np.ndarray) -> np.ndarray:
+        proj = np.einsum("ij,ji->j", YcT, np.ascontiguousarray(PT.T)[rows])
+        return YtY @ PT + reg * PT + segsum(YcT * (w * proj))
+
+    XT = np.ascontiguousarray(X0.T, dtype=np.float32)
+    R = segsum(YcT * (conf * pref).astype(np.float32)) - A(XT)
+    P = R.copy()
+    rs = np.einsum("ij,ij->j", R, R)
+    for _ in range(cg_steps):
+        AP = A(P)
+        denom = np.einsum("ij,ij->j", P, AP)
+        alpha = np.divide(rs, denom, out=np.zeros_like(rs), where=denom > 1e-12)
+        XT += alpha * P
+        R -= alpha * AP
+        rs_new = np.einsum("ij,ij->j", R, R)
+        beta = np.divide(rs_new, rs, out=np.zeros_like(rs), where=rs > 1e-12)
+        P = R + beta * P
+        rs = rs_new
+    return np.ascontiguousarray(XT.T)
+
+def _transpose(indptr: np.ndarray, cols: np.ndarray, n_cols: int, *vals: np.ndarray):
+    rows = np.repeat(np.arange(len(indptr) - 1, dtype=np.int32), np.diff(indptr))
+    order = np.argsort(cols, kind="stable")
+    t_indptr = np.zeros(n_cols + 1, dtype=np.int64)
+    np.cumsum(np.bincount(cols, minlength=n_cols), out=t_indptr[1:])
+    return (t_indptr, rows[order]) + tuple(v[order] for v in vals)
+
+
+@dataclass
+class ALSModel:
+    user_factors: np.ndarray   # (n_users x k)
+    item_factors: np.ndarray   # (n_movies x k)
+    movie_ids: np.ndarray      # col -> TMDb id
+    user_rows: Dict[str, int]
+    version: int               # store version the model was trained on
+    user_versions: Dict[str, int]  # per-user store versions it was trained on
+    trained_at: float
+    train_seconds: float
+
+    def fold_in(self, cols: np.ndarray, ratings: np.ndarray, reg: float = RATINGS_REG,
+                alpha: float = RATINGS_ALPHA) -> np.ndarray:
+        """Solve a user vector from raw ratings against frozen item factors (new/updated users)."""
+        Y = self.item_factors
+        k = Y.shape[1]
+        conf, pref = _confidence(ratings, alpha)
+        Yu = Y[cols]
+        A = Y.T @ Y + (Yu * (conf - 1.0)[:, None]).T @ Yu + reg * np.eye(k, dtype=np.float32)
+        b = Yu.T @ (conf * pref)
+        return np.linalg.solve(A, b).astype(np.float32)
+
+    def top_k(self, x: np.ndarray, k: int, exclude_cols: Iterable[int] = ()) -> List[Tuple[int, float]]:
+        scores = self.item_factors @ x  # one matrix-vector product
+        ex = np.fromiter(exclude_cols, dtype=np.int64)
+        if len(ex):
+            scores[ex] = -np.inf
+        kk = min(k, len(scores))
+        if kk <= 0:
+            return []
+        top = np.argpartition(-scores, kk - 1)[:kk]
+        top = top[np.argsort(-scores[top])]
+        return [(int(self.movie_ids[j]), float(scores[j])) for j in top if np.isfinite(scores[j])]
+
+
+def train_als(store: RatingsStore, *, factors: int = RATINGS_FACTORS, iters: int = RATINGS_ITERS,
+              reg: float = RATINGS_REG, alpha: float = RATINGS_ALPHA, seed: int = 7) -> Optional[ALSModel]:
+    version, user_versions = store.version, store.user_versions()  # read first: a racing write means fold-in
+    indptr, cols, r, n_users, n_movies = store.csr()
+    if not len(cols):
+        return None
+    t0 = time.perf_counter()
+    conf, pref = _confidence(r, alpha)
+    t_indptr, t_cols, t_conf, t_pref = _transpose(indptr, cols, n_movies, conf, pref)
+    rng = np.random.default_rng(seed)
+    Y = (0.01 * rng.standard_normal((n_movies, factors))).astype(np.float32)
+    X = np.zeros((n_users, factors), dtype=np.float32)
+    for _ in range(iters):
+        X = _solve_rows(indptr, cols, conf, pref, Y, X, reg)
+        Y = _solve_rows(t_indptr, t_cols, t_conf, t_pref, X, Y, reg)
+    elapsed = time.perf_counter() - t0
+    metrics.observe("ratings.train", elapsed)
+    return ALSModel(
+        user_factors=X,
+        item_factors=Y,
+        movie_ids=np.asarray(store.movie_ids[:n_movies], dtype=np.int64),
+        user_rows={k: i for i, k in enumerate(store.user_keys[:n_users])},
+        version=version,
+        user_versions=user_versions,
+        trained_at=time.time(),
+        train_seconds=elapsed,
+    )
+
+
+# ---------------------------
+# Process-wide store, model and trainer
+# ---------------------------
+store = RatingsStore()
+_model: Optional[ALSModel] = None
+_trainer: Optional[threading.Thread] = None
+
+def current_model() -> Optional[ALSModel]:
+    return _model
+
+def train_now() -> Optional[ALSModel]:
+    global _model
+    model = train_als(store)
+    if model is not None:
+        _model = model
+    return _model
+
+def recommend_for_user(user: str, k: int = 20) -> Tuple[str, List[Tuple[int, float]]]:
+    """
+    (source, [(movie_id, score)]) excluding movies the user already rated.
+    Users the model has not seen yet (or who themselves rated since training) are folded in on the fly.
+    """
+    model = _model
+    rated = store.user_ratings(user)
+    if model is None or not rated:
+        return "none", []
+    col_of = {int(mid): i for i, mid in enumerate(model.movie_ids.tolist())}
+    cols = np.asarray([col_of[m] for m, _ in rated if m in col_of], dtype=np.int64)
+    if not len(cols):
+        return "none", []
+    row = model.user_rows.get(user)
+    if row is not None and store.user_version(user) == model.user_versions.get(user, 0):
+        x, source = model.user_factors[row], "als"
+    else:
+        vals = np.asarray([r for m, r in rated if m in col_of], dtype=np.float32)
+        x, source = model.fold_in(cols, vals), "als_fold_in"
+    return source, model.top_k(x, k, exclude_cols=cols.tolist())
+
+def _train_loop() -> None:
+    while True:
+        time.sleep(RATINGS_TRAIN_INTERVAL)
+        model = _model
+        if len(store) and (model is None or model.version != store.version):
+            try:
+                train_now()
+                metrics.incr("ratings.train_runs")
+            except Exception as e:
+                print(f"[ratings] training failed: {e}")
+
+def start_ratings_trainer() -> None:
+    """Periodic background retrain (once per process; RATINGS_TRAIN_INTERVAL=0 disables)."""
+    global _trainer
+    if RATINGS_TRAIN_INTERVAL <= 0 or _trainer is not None:
+        return
+    metrics.register_gauge("ratings.count", lambda: len(store))
+    metrics.register_gauge("ratings.bytes", store.nbytes)
+    _trainer = threading.Thread(target=_train_loop, name="ratings-trainer", daemon=True)
+    _trainer.start()
+
+def _persist() -> None:
+    if RATINGS_PATH:
+        store.save(RATINGS_PATH)
+
+if RATINGS_PATH and os.path.exists(RATINGS_PATH):
+    try:
+        store.load(RATINGS_PATH)
+    except Exception as e:
+        print(f"[ratings] failed to load {RATINGS_PATH}: {e}")
+atexit.register(_persist)
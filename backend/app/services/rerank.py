@@ -0,0 +1,73 @@
+from __future__ import annotations
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from ..core import metrics
+from .content_engine import engine as content_engine
+
+# =============================================================================
+# Diversity re-ranking (Maximal Marginal Relevance)
+# =============================================================================
+#   pick argmax_i  lam * rel(i) - (1 - lam) * max_{j in picked} sim(i, j)
+# lam = 1.0 is pure relevance order; lower values trade relevance for variety.
+# Per-endpoint lambdas are read from the environment.
+
+MMR_LAMBDA: Dict[str, float] = {
+    "analyze": float(os.getenv("MMR_LAMBDA_ANALYZE", "0.7")),
+    "recommend": float(os.getenv("MMR_LAMBDA_RECOMMEND", "0.85")),
+    "mood": float(os.getenv("MMR_LAMBDA_MOOD", "0.75")),
+}
+
+def mmr(relevance: np.ndarray, features: np.ndarray, k: int, lam: float) -> List[int]:
+    """
+    Greedy MMR over row-normalized `features`. The full similarity matrix is one
+    GEMM; each greedy step is then a vectorized max/argmax over the candidates.
+    Returns indices into `relevance`, best first.
+    """
+    n = len(relevance)
+    k = min(k, n)
+    if k <= 0:
+        return []
+    rel = np.asarray(relevance, dtype=np.float32)
+    if lam >= 1.0:
+        return np.argsort(-rel, kind="stable")[:k].tolist()
+    S = features @ features.T                  # (n x n) cosine similarities
+    max_sim = np.zeros(n, dtype=np.float32)    # similarity to the closest picked item
+    taken = np.zeros(n, dtype=bool)
+    picked: List[int] = []
+    for _ in range(k):
+        score = lam * rel - (1.0 - lam) * max_sim
+        score[taken] = -np.inf
+        j = int(np.argmax(score))
+        picked.append(j)
+        taken[j] = True
+        np.maximum(max_sim, S[j], out=max_sim)
+    return picked
+
+def rank_decay(n: int, start: float = 1.0, step: float = 0.03) -> np.ndarray:
+    """Relevance for an already-ranked list: 1.0, 0.97, 0.94, ... (floored at 0)."""
+    return np.clip(start - step * np.arange(n, dtype=np.float32), 0.0, None)
+
+def diversify(
+    items: Sequence[Dict[str, Any]],
+    k: int,
+    endpoint: str,
+    relevance: Optional[Sequence[float]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Re-rank `items` (TMDb-ish dicts) for `endpoint` using content-engine features.
+    `relevance` defaults to the incoming order.
+    """
+    items = list(items)
+    if not items:
+        return []
+    lam = MMR_LAMBDA.get(endpoint, 1.0)
+    rel = np.asarray(relevance, dtype=np.float32) if relevance is not None else rank_decay(len(items))
+    if lam >= 1.0:
+        order = mmr(rel, np.zeros((len(items), 1), dtype=np.float32), k, lam)
+    else:
+        order = mmr(rel, content_engine.featurize(items), k, lam)
+    metrics.incr(f"rerank.{endpoint}")
+    return [items[i] for i in order]
@@ -0,0 +1,158 @@
+from __future__ import annotations
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from ..core import metrics
+from .content_engine import engine as content_engine
+
+# =============================================================================
+# Local title resolution for LLM picks
+# =============================================================================
+# Every movie the content engine learns about is indexed by its normalized title
+# (exact hash) and by character trigrams (inverted index). ("Title", year) picks
+# resolve here in microseconds; only misses go to TMDb /search/movie.
+#
+#   exact title         -> any year within ±1 (scored like _best_search_match)
+#   fuzzy (trigram Dice) -> only when the year is given and agrees within ±1
+
+TITLE_INDEX_ENABLED = os.getenv("TITLE_INDEX_ENABLED", "1").strip().lower() in ("1", "true", "yes", "on")
+TITLE_INDEX_MIN_SIM = float(os.getenv("TITLE_INDEX_MIN_SIM", "0.85"))  # Dice over trigrams
+
+_PUNCT_RE = re.compile(r"[^\w\s]")
+_SPACE_RE = re.compile(r"\s+")
+_YEAR_BONUS = 50.0  # same bonus _best_search_match gives an exact year
+
+
+def normalize_title(title: str) -> str:
+    """Casefold, strip accents/punctuation, '&' -> 'and', collapse whitespace."""
+    t = unicodedata.normalize("NFKD", title or "")
+    t = "".join(ch for ch in t if not unicodedata.combining(ch)).casefold()
+    t = _PUNCT_RE.sub(" ", t.replace("&", " and "))
+    return _SPACE_RE.sub(" ", t).strip()
+
+
+def _trigrams(norm: str) -> FrozenSet[str]:
+    padded = f"  {norm} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def _year_of(meta: Dict[str, Any]) -> Optional[int]:
+    y = (meta.get("release_date") or "")[:4]
+    return int(y) if y.isdigit() else None
+
+
+class TitleIndex:
+    def __init__(self, min_sim: float = TITLE_INDEX_MIN_SIM):
+        self.min_sim = min_sim
+        self._lock = threading.Lock()
+        self._entries: Dict[int, Tuple[str, FrozenSet[str], Dict[str, Any]]] = {}
+        self._exact: Dict[str, Set[int]] = defaultdict(set)
+        self._grams: Dict[str, Set[int]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add_many(self, items: Iterable[Dict[str, Any]]) -> None:
+        """Insert or refresh movies (need id, title and poster_path)."""
+        with self._lock:
+            for it in items:
+                if not it or not isinstance(it.get("id"), int) or not it.get("poster_path"):
+                    continue
+                norm = normalize_title(it.get("title") or it.get("name") or "")
+                if not norm:
+                    continue
+                mid = it["id"]
+                old = self._entries.get(mid)
+                if old is not None and old[0] != norm:
+                    self._unlink(mid, old[0], old[1])
+                grams = old[1] if old is not None and old[0] == norm else _trigrams(norm)
+                self._entries[mid] = (norm, grams, dict(it))
+                self._exact[norm].add(mid)
+                for g in grams:
+                    self._grams[g].add(mid)
+
+    def _unlink(self, mid: int, norm: str, grams: FrozenSet[str]) -> None:
+        self._exact[norm].discard(mid)
+        for g in grams:
+            self._grams[g].discard(mid)
+
+    def _score(self, meta: Dict[str, Any], year: Optional[int]) -> float:
+        s = float(meta.get("popularity") or 0.0)
+        if year and _year_of(meta) == year:
+            s += _YEAR_BONUS
+        return s
+
+    @staticmethod
+    def _year_ok(meta: Dict[str, Any], year: Optional[int]) -> bool:
+        if not year:
+            return True
+        y = _year_of(meta)
+        return y is not None and abs(y - year) <= 1
+
+    def resolve(self, title: str, year: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Best local match for ("Title", year) as a TMDb-shaped dict, or None."""
+        norm = normalize_title(title)
+        if not norm:
+            return None
+        with self._lock:
+            hits = [self._entries[m][2] for m in self._exact.get(norm, ())]
+            hits = [m for m in hits if self._year_ok(m, year)]
+            if not hits and year:
+                hits = self._fuzzy(norm, year)
+        if not hits:
+            return None
+        return dict(max(hits, key=lambda m: self._score(m, year)))
+
+    def _fuzzy(self, norm: str, year: int) -> List[Dict[str, Any]]:
+        q = _trigrams(norm)
+        t = self.min_sim
+        # Dice >= t needs at least t|q|/(2-t) shared grams, so every match must
+        # contain one of the |q| - need + 1 rarest query grams (prefix filter).
+        need = max(1, math.ceil(t * len(q) / (2.0 - t)))
+        postings = sorted((self._grams.get(g, ()) for g in q), key=len)
+        cands: Set[int] = set()
+        for p in postings[: len(q) - need + 1]:
+            cands.update(p)
+        # ...and have a comparable number of grams: t/(2-t) <= |m|/|q| <= (2-t)/t
+        lo, hi = len(q) * t / (2.0 - t), len(q) * (2.0 - t) / t
+        out = []
+        for mid in cands:
+            _, grams, meta = self._entries[mid]
+            if not lo <= len(grams) <= hi or not self._year_ok(meta, year):
+                continue
+            if 2.0 * len(q & grams) / (len(q) + len(grams)) >= t:
+                out.append(meta)
+        return out
+
+
+# Process-wide index, kept in sync with the content engine's catalog
+index = TitleIndex()
+metrics.register_gauge("title_index.size", lambda: len(index))
+
+
+def _on_catalog_rows(ids, _rows) -> None:
+    index.add_many(content_engine.meta_of(int(m)) for m in ids.tolist())
+
+def resolve_title(title: str, year: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Local lookup with hit/miss accounting; None means "ask TMDb"."""
+    if not TITLE_INDEX_ENABLED:
+        return None
+    hit = index.resolve(title, year)
+    metrics.incr("title_index.hit" if hit else "title_index.miss")
+    return hit
+
+def _hit_rate() -> float:
+    hits, misses = metrics.counter("title_index.hit"), metrics.counter("title_index.miss")
+    return round(hits / (hits + misses), 4) if hits + misses else 0.0
+
+metrics.register_gauge("title_index.hit_rate", _hit_rate)
+
+if TITLE_INDEX_ENABLED:
+    ids, _ = content_engine.matrix()  # catalog restored from a snapshot, if any
+    index.add_many(content_engine.meta_of(int(m)) for m in ids.tolist())
+    content_engine.add_listener(_on_catalog_rows)
@@ -0,0 +1,69 @@
+"""
+Recall/latency benchmark: LSH index vs exact brute-force cosine.
+
+    cd backend && python -m benchmarks.bench_ann --n 200000 --dim 64
+
+Synthetic data is clustered (like genre/era groups) so neighbourhoods exist.
+"""
+from __future__ import annotations
+import argparse
+import time
+
+import numpy as np
+
+from app.services.ann_index import LSHIndex
+
+
+def _data(n: int, dim: int, clusters: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    X = centers[rng.integers(0, clusters, n)] + 0.35 * rng.standard_normal((n, dim)).astype(np.float32)
+    return X / np.linalg.norm(X, axis=1, keepdims=True)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=200_000)
+    ap.add_argument("--dim", type=int, default=64)
+    ap.add_argument("--clusters", type=int, default=2000)
+    ap.add_argument("--queries", type=int, default=500)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--tables", type=int, default=8)
+    ap.add_argument("--bits", type=int, default=16)
+    ap.add_argument("--probes", type=int, default=1)
+    a = ap.parse_args()
+
+    X = _data(a.n, a.dim, a.clusters)
+    ids = np.arange(a.n)
+    t0 = time.perf_counter()
+    idx = LSHIndex(a.dim, n_tables=a.tables, n_bits=a.bits, probes=a.probes).build(ids, X)
+    build = time.perf_counter() - t0
+
+    rng = np.random.default_rng(1)
+    qrows = rng.choice(a.n, a.queries, replace=False)
+    ann_lat, exact_lat, recall = [], [], []
+    for r in qrows:
+        q = X[r]
+        t0 = time.perf_counter()
+        got = {i for i, _ in idx.query(q, a.k, exclude={int(r)})}
+        ann_lat.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        s = X @ q
+        s[r] = -np.inf
+        top = np.argpartition(-s, a.k)[: a.k]
+        exact_lat.append(time.perf_counter() - t0)
+        recall.append(len(got & set(top.tolist())) / a.k)
+
+    def pct(xs, p):
+        return 1000 * float(np.percentile(xs, p))
+
+    print(f"n={a.n} dim={a.dim} tables={a.tables} bits={a.bits} probes={a.probes}")
+    print(f"build: {build:.2f}s")
+    print(f"ann   p50={pct(ann_lat, 50):.3f}ms p99={pct(ann_lat, 99):.3f}ms")
+    print(f"exact p50={pct(exact_lat, 50):.3f}ms p99={pct(exact_lat, 99):.3f}ms")
+    print(f"recall@{a.k}={np.mean(recall):.3f}")
+
+
+if __name__ == "__main__":
+    main()
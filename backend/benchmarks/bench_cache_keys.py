@@ -0,0 +1,82 @@
+"""
+Route-cache key cardinality / hit rate: raw `vary` keys vs canonical keys.
+
+    cd backend && python -m benchmarks.bench_cache_keys
+
+Replays a synthetic /api/discover and /api/trending query mix in which users
+spell the same request differently (genre names vs ids, list order, case,
+explicit defaults) and counts distinct keys under both schemes.
+"""
+from __future__ import annotations
+import random
+from urllib.parse import urlencode
+
+from app import create_app
+from app.api import routes
+from app.core.cache import _route_key
+from app.services.mood_service import GENRE
+
+# The raw vary lists the routes used before canonical keys
+LEGACY_VARY = {
+    "discover": ["language", "page", "genres", "year", "year_gte", "year_lte", "runtime_gte", "runtime_lte",
+                 "vote_avg_gte", "vote_count_gte", "with_original_language", "region", "watch_region",
+                 "with_watch_providers", "with_watch_monetization_types", "include_adult", "sort_by"],
+    "trending": ["window", "page", "language", "fields"],
+}
+
+_NAMES = {gid: name for name, gid in GENRE.items()}
+
+
+def _discover_query(rng: random.Random) -> dict:
+    gids = rng.sample([28, 35, 18, 27, 878], rng.randint(1, 2))
+    spell = rng.choice(["ids", "names", "Names"])
+    toks = [str(g) if spell == "ids" else (_NAMES[g] if spell == "Names" else _NAMES[g].lower()) for g in gids]
+    rng.shuffle(toks)
+    q = {"genres": ",".join(toks)}
+    if rng.random() < 0.4:
+        q["page"] = "1"
+    else:
+        q["page"] = str(rng.choice([1, 1, 1, 2, 3]))
+    if rng.random() < 0.3:
+        q["sort_by"] = rng.choice(["popularity.desc", "Popularity.desc"])
+    if rng.random() < 0.3:
+        q["region"] = rng.choice(["US", "us"])
+    if rng.random() < 0.2:
+        q["language"] = "en-US"
+    if rng.random() < 0.2:
+        q["with_watch_providers"] = rng.choice(["8,337", "337,8"])
+    return q
+
+
+def _trending_query(rng: random.Random) -> dict:
+    q = {}
+    if rng.random() < 0.5:
+        q["window"] = rng.choice(["day", "Day", "DAY"])
+    if rng.random() < 0.3:
+        q["page"] = "1"
+    if rng.random() < 0.3:
+        q["fields"] = rng.choice(["id,title,poster_path", "title,id,poster_path", "poster_path,title"])
+    return q
+
+
+def main(n: int = 5000) -> None:
+    app = create_app()
+    routes._tmdb_genres_map = lambda: dict(_NAMES)  # no network: genre names from the static table
+    rng = random.Random(0)
+    for name, make, view in (("discover", _discover_query, routes.discover), ("trending", _trending_query, routes.trending)):
+        seen_legacy, seen_canon = set(), set()
+        hits_legacy = hits_canon = 0
+        for _ in range(n):
+            with app.test_request_context(f"/api/{name}?{urlencode(make(rng))}"):
+                legacy = _route_key(view, None, LEGACY_VARY[name], {})
+                canon = _route_key(view, view.cache_key_spec, None, {})
+            hits_legacy += legacy in seen_legacy
+            hits_canon += canon in seen_canon
+            seen_legacy.add(legacy)
+            seen_canon.add(canon)
+        print(f"{name:<9} requests={n}  keys raw={len(seen_legacy):>5} canonical={len(seen_canon):>5}  "
+              f"hit rate raw={hits_legacy / n:.1%} canonical={hits_canon / n:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Fuzz + throughput benchmark for LLM JSON extraction.
+
+    cd backend && python -m benchmarks.bench_jsonscan
+
+Compares core.jsonscan against the previous quadratic extractor on
+pathological inputs, then fuzzes the scanner (whole-text vs. chunked feeds).
+"""
+from __future__ import annotations
+import json
+import random
+import re
+import time
+from typing import Optional
+
+from app.core.jsonscan import JSONScanner, find_first_json
+
+
+def legacy_find_json_blob(t: str) -> Optional[str]:
+    """The extractor routes.py used before the single-pass scanner (for comparison)."""
+    if not t:
+        return None
+    if t.startswith("```"):
+        t = re.sub(r"^```(?:json)?\s*", "", t)
+        t = re.sub(r"\s*```$", "", t).strip()
+    s = t.lstrip()
+    openers = {"{": "}", "[": "]"}
+    idxs = [i for i, ch in enumerate(t) if ch in openers]
+    for start in ([0] if (s.startswith("{") or s.startswith("[")) else []) + idxs:
+        opener = t[start]; closer = openers.get(opener)
+        if closer is None:
+            continue
+        depth, i = 0, start
+        while i < len(t):
+            ch = t[i]
+            if ch == opener:
+                depth += 1
+            elif ch == closer:
+                depth -= 1
+                if depth == 0:
+                    candidate = t[start:i+1]
+                    try:
+                        json.loads(candidate)
+                        return candidate
+                    except Exception:
+                        try:
+                            sanitized = re.sub(r"\\'", "'", candidate)
+                            json.loads(sanitized)
+                            return sanitized
+                        except Exception:
+                            break
+            i += 1
+    return None
+
+
+def _picks(n: int) -> str:
+    return json.dumps({"reply": "ok", "picks": [
+        {"title": f"Movie {i} {{with}} [brackets]", "year": 1990 + i % 30, "reason": "because \"quoted\""}
+        for i in range(n)
+    ]})
+
+
+PATHOLOGICAL = {
+    "clean_200_picks": _picks(200),
+    "unclosed_braces_20k": "{" * 20_000 + _picks(5),
+    "brace_soup_20k": "{a} [b] " * 2_500 + _picks(5),
+    "nested_invalid_2k": "[" * 2_000 + "x" + "]" * 2_000 + _picks(5),
+    "prose_100k": ("The quick brown fox (jumps) over the lazy dog. " * 2_200) + _picks(5),
+}
+
+
+def _time(fn, arg, budget: float = 2.0):
+    t0 = time.perf_counter()
+    n = 0
+    while True:
+        fn(arg)
+        n += 1
+        el = time.perf_counter() - t0
+        if el > budget or n >= 50:
+            return el / n
+
+
+def bench() -> None:
+    print(f"{'input':<22}{'size':>9}{'scanner':>12}{'legacy':>12}")
+    for name, text in PATHOLOGICAL.items():
+        new = _time(find_first_json, text)
+        old = _time(legacy_find_json_blob, text, budget=5.0)
+        print(f"{name:<22}{len(text):>9}{1000 * new:>10.2f}ms{1000 * old:>10.2f}ms")
+    big = "noise " * 50_000 + _picks(500)
+    t = _time(find_first_json, big)
+    print(f"throughput: {len(big) / t / 1e6:.1f} MB/s on {len(big) / 1e6:.2f} MB")
+
+
+def fuzz(rounds: int = 3000, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    alphabet = '{}[]",:\\ abc01\n\''
+    mismatches = 0
+    for _ in range(rounds):
+        base = _picks(rng.randint(0, 4))
+        # Random prose + random structural noise around (and sometimes inside) a valid reply
+        noise = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+        cut = rng.randint(0, len(base)) if rng.random() < 0.2 else len(base)
+        text = noise + base[:cut] + "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 20)))
+        whole = find_first_json(text)  # must never raise
+        if whole is not None:
+            json.dumps(whole)
+        sc = JSONScanner()
+        i = 0
+        while i < len(text):
+            step = rng.randint(1, 12)
+            sc.feed(text[i:i + step])
+            i += step
+        chunked = sc.close()
+        if (chunked[0] if chunked else None) != whole:
+            mismatches += 1
+    print(f"fuzz: {rounds} rounds, chunked/whole mismatches={mismatches}")
+
+
+if __name__ == "__main__":
+    bench()
+    fuzz()
@@ -0,0 +1,74 @@
+"""
+Ratings store + ALS benchmark at 1M ratings.
+
+    cd backend && python -m benchmarks.bench_ratings --ratings 1000000
+
+Reports ingestion time, storage footprint (COO arrays + (user, movie) index,
+cross-checked with tracemalloc), training time and per-user query latency.
+"""
+from __future__ import annotations
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from app.services.ratings_service import RatingsStore, train_als
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--ratings", type=int, default=1_000_000)
+    ap.add_argument("--users", type=int, default=50_000)
+    ap.add_argument("--movies", type=int, default=20_000)
+    ap.add_argument("--factors", type=int, default=32)
+    ap.add_argument("--iters", type=int, default=5)
+    ap.add_argument("--queries", type=int, default=1000)
+    a = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    # Zipf-ish movie popularity, uniform users; drop duplicate (user, movie) pairs
+    n = int(a.ratings * 1.6)  # oversample; duplicates are dropped below
+    users = rng.integers(0, a.users, n).astype(np.int32)
+    movies = (rng.pareto(1.1, n) * 50).astype(np.int64) % a.movies
+    pairs = rng.permutation(np.unique(users.astype(np.int64) * a.movies + movies))[: a.ratings]
+    users, movies = (pairs // a.movies).astype(np.int32), (pairs % a.movies).astype(np.int32)
+    ratings = rng.integers(1, 6, len(pairs)).astype(np.int8)
+
+    store = RatingsStore()
+    store.user_keys = [f"u{i}" for i in range(a.users)]
+    store._user_row = {k: i for i, k in enumerate(store.user_keys)}
+    store.movie_ids = list(range(a.movies))
+    store._movie_col = {m: m for m in store.movie_ids}
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    store.bulk_load(users, movies, ratings)
+    ingest = time.perf_counter() - t0
+    for _ in range(1000):  # single upserts go through the pending index
+        store.upsert(f"u{rng.integers(a.users)}", int(rng.integers(a.movies)), int(rng.integers(1, 6)))
+    traced = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    t0 = time.perf_counter()
+    model = train_als(store, factors=a.factors, iters=a.iters)
+    train = time.perf_counter() - t0
+
+    indptr, cols, _, _, _ = store.csr()
+    lat = []
+    for u in rng.integers(0, a.users, a.queries):
+        rated = cols[indptr[u]:indptr[u + 1]]
+        t0 = time.perf_counter()
+        model.top_k(model.user_factors[u], 20, exclude_cols=rated.tolist())
+        lat.append(time.perf_counter() - t0)
+
+    model_bytes = model.user_factors.nbytes + model.item_factors.nbytes
+    print(f"ratings={len(store):,} users={a.users:,} movies={a.movies:,} k={a.factors} iters={a.iters}")
+    print(f"ingest: {ingest:.2f}s  storage: {store.nbytes() / 1e6:.1f} MB "
+          f"(index {store.index_nbytes() / 1e6:.1f} MB, {store.nbytes() / len(store):.1f} B/rating)  "
+          f"traced: {traced / 1e6:.1f} MB  factors: {model_bytes / 1e6:.1f} MB")
+    print(f"train:  {train:.2f}s ({train / a.iters:.2f}s/iter)")
+    print(f"query:  p50={1000 * np.percentile(lat, 50):.3f}ms p99={1000 * np.percentile(lat, 99):.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
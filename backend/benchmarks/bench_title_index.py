@@ -0,0 +1,50 @@
+"""
+Title-resolution latency over a synthetic catalog.
+
+    cd backend && python -m benchmarks.bench_title_index [n_movies]
+"""
+from __future__ import annotations
+import random
+import string
+import sys
+import time
+
+from app.services.title_index import TitleIndex
+
+_rng = random.Random(42)
+_WORDS = ["".join(_rng.choice(string.ascii_lowercase) for _ in range(_rng.randint(3, 9))) for _ in range(5000)]
+
+
+def _title(rng: random.Random) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(rng.randint(1, 5))).title()
+
+
+def main(n: int = 100_000, queries: int = 5_000) -> None:
+    rng = random.Random(0)
+    catalog = [{"id": i, "title": _title(rng), "release_date": f"{rng.randint(1950, 2024)}-01-01",
+                "popularity": rng.random() * 100, "poster_path": "/p.jpg"} for i in range(n)]
+    idx = TitleIndex()
+    t0 = time.perf_counter()
+    idx.add_many(catalog)
+    print(f"indexed {n} titles in {time.perf_counter() - t0:.2f}s")
+
+    picks = rng.sample(catalog, queries)
+    cases = {
+        "exact": [(m["title"], int(m["release_date"][:4])) for m in picks],
+        "typo": [(m["title"][:-1] + "x" if len(m["title"]) > 14 else m["title"] + "s", int(m["release_date"][:4]))
+                 for m in picks],
+        "miss": [(_title(rng), 2000) for _ in range(queries)],
+    }
+    for name, qs in cases.items():
+        lat, hits = [], 0
+        for title, year in qs:
+            t = time.perf_counter()
+            hits += idx.resolve(title, year) is not None
+            lat.append(time.perf_counter() - t)
+        lat.sort()
+        print(f"{name:<6} hit={hits / len(qs):.2%}  p50={1e6 * lat[len(lat) // 2]:.1f}us  "
+              f"p99={1e6 * lat[int(len(lat) * 0.99)]:.1f}us")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
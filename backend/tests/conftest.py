@@ -0,0 +1,35 @@
+import pytest
+
+from app import create_app
+from app.core.cache import _cache_clear
+from app.core import ratelimit
+
+
+class FakeResp:
+    """Minimal stand-in for requests.Response as used by the routes."""
+
+    def __init__(self, payload=None, status_code=200):
+        self._payload = payload if payload is not None else {}
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.text = ""
+
+    def json(self):
+        return self._payload
+
+    def close(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    _cache_clear()
+    ratelimit._requests.clear()  # the per-IP window would otherwise span the whole suite
+    yield
+    _cache_clear()
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    return app.test_client()
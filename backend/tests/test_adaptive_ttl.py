@@ -0,0 +1,67 @@
+from conftest import FakeResp
+
+from app.api import routes
+from app.core import cache
+
+
+def test_ttl_widens_while_unchanged_and_narrows_when_hot_key_changes(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(cache, "_now", lambda: clock[0])
+    value = {"v": 1}
+    calls = []
+
+    @cache.cached("adaptive_test", ttl=100)
+    def fetch(mid):
+        calls.append(mid)
+        return dict(value)
+
+    def ttl():
+        return next(e for k, e in cache._FUNC_CACHE.items() if k.startswith("func:adaptive_test"))["ttl"]
+
+    fetch(1)
+    assert ttl() == 100
+    for expected in (200, 400, 600, 600):  # unchanged refetches: x2 up to 6x base
+        clock[0] += ttl()
+        fetch(1)
+        assert ttl() == expected
+    for _ in range(5):  # hot key...
+        fetch(1)
+    value["v"] = 2  # ...whose content changed
+    clock[0] += ttl()
+    assert fetch(1) == {"v": 2} and ttl() == 300
+    clock[0] += ttl()
+    value["v"] = 3  # changed again, but nobody read it: back to base
+    fetch(1)
+    assert ttl() == 100
+    assert len(calls) == 7
+
+
+def test_ttl_decisions_are_inspectable(client, monkeypatch):
+    monkeypatch.setattr(routes.session, "get", lambda url, params=None, timeout=None: FakeResp({"id": 603, "title": "Seed"}))
+    assert client.get("/api/details/603").status_code == 200
+    body = client.get("/api/metrics/cache-ttl").get_json()
+    assert body["summary"] and body["keys"][0]["decision"] == "base"
+    assert {"ttl", "base", "reads", "refetches", "changes"} <= set(body["keys"][0])
+    assert client.get("/api/metrics/cache-ttl?limit=x").status_code == 400
+
+
+def test_failure_values_are_not_cached_and_empty_pages_never_widen(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(cache, "_now", lambda: clock[0])
+    calls = []
+
+    @cache.cached("adaptive_empty", ttl=100)
+    def fetch(kind):
+        calls.append(kind)
+        return {} if kind == "down" else {"page": 1, "results": []}
+
+    fetch("down")
+    fetch("down")
+    assert calls == ["down", "down"]  # {} (upstream failed) is never stored
+
+    fetch("empty")
+    for _ in range(3):
+        clock[0] += 100
+        fetch("empty")
+    ent = next(e for k, e in cache._FUNC_CACHE.items() if k.startswith("func:adaptive_empty"))
+    assert ent["ttl"] == 100 and ent["refetches"] == 3
@@ -0,0 +1,113 @@
+import time
+
+import pytest
+import requests
+
+from conftest import FakeResp
+
+from app.api import routes
+from app.clients.tmdb import session, tmdb_url
+from app.core import breaker as breaker_mod
+from app.core import cache
+from app.core.breaker import BreakerOpen, CircuitBreaker
+
+
+@pytest.fixture(autouse=True)
+def _fresh_breakers():
+    breaker_mod._breakers_reset()
+    yield
+    breaker_mod._breakers_reset()
+
+
+def test_breaker_opens_probes_and_closes():
+    br = CircuitBreaker("t", window=10, min_calls=4, error_rate=0.5, cooldown=0.05)
+    for ok in (True, False, True, False):
+        br.before()
+        br.record(ok)
+    assert br.state == "open"
+    with pytest.raises(BreakerOpen):
+        br.before()
+
+    time.sleep(0.06)
+    br.before()                  # the single half-open probe
+    with pytest.raises(BreakerOpen):
+        br.before()              # everyone else still fails fast
+    br.record(True)
+    assert br.state == "closed"
+    br.before()
+
+
+def test_probe_is_settled_by_any_exception(monkeypatch):
+    br = breaker_mod.breaker("tmdb:/movie/popular")
+    br.cooldown = 0.0
+    br._trip(time.monotonic())
+
+    def boom(self, method, url, *a, **kw):
+        raise ValueError("not a RequestException")
+
+    monkeypatch.setattr(requests.Session, "request", boom)
+    with pytest.raises(ValueError):
+        session.get(tmdb_url("/movie/popular"))
+    assert not br._probing  # failed probe reopened the breaker instead of wedging it
+    br.before()  # next probe admitted after the (zero) cooldown
+    br.cancel_probe()
+    br.before()
+
+
+def test_session_fails_fast_per_endpoint_family(monkeypatch):
+    calls = []
+
+    def down(self, method, url, *a, **kw):
+        calls.append(url)
+        raise requests.exceptions.ConnectTimeout("timed out")
+
+    monkeypatch.setattr(requests.Session, "request", down)
+    for mid in range(breaker_mod.BREAKER_MIN_CALLS):
+        with pytest.raises(requests.exceptions.ConnectTimeout):
+            session.get(tmdb_url(f"/movie/{mid}/similar"))
+
+    t0 = time.perf_counter()
+    with pytest.raises(BreakerOpen):
+        session.get(tmdb_url("/movie/999/similar"))
+    assert time.perf_counter() - t0 < 0.05
+    assert len(calls) == breaker_mod.BREAKER_MIN_CALLS  # upstream not touched
+
+    # Other families keep their own breaker
+    with pytest.raises(requests.exceptions.ConnectTimeout):
+        session.get(tmdb_url("/movie/popular"))
+
+
+def test_open_breaker_serves_stale_route_cache_then_503(client, monkeypatch):
+    monkeypatch.setattr(routes.session, "get",
+                        lambda url, params=None, timeout=None: FakeResp({"page": 1, "results": [{"id": 1, "title": "A"}]}))
+    assert client.get("/api/popular").status_code == 200
+
+    def open_breaker(url, params=None, timeout=None):
+        raise BreakerOpen("tmdb:/movie/popular", 4.2)
+
+    monkeypatch.setattr(routes.session, "get", open_breaker)
+    for ent in cache._ROUTE_CACHE.values():
+        ent["ts"] -= 3600  # expired, but within the stale-if-error window
+    resp = client.get("/api/popular")
+    assert resp.status_code == 200 and resp.headers["X-Cache"] == "stale"
+    assert resp.get_json()["results"][0]["id"] == 1
+
+    cache._cache_clear()
+    resp = client.get("/api/popular")
+    assert resp.status_code == 503
+    assert resp.get_json()["code"] == "upstream_unavailable"
+    assert resp.headers["Retry-After"] == "5"
+
+
+def test_deadline_cut_timeouts_do_not_open_the_breaker(client, monkeypatch):
+    def slow(self, method, url, *a, **kw):
+        raise requests.exceptions.ReadTimeout("client deadline")
+
+    monkeypatch.setattr(requests.Session, "request", slow)
+    for _ in range(20):
+        client.get("/api/popular", headers={"X-Timeout-Ms": "1000"})
+    br = breaker_mod.breaker("tmdb:/movie/popular")
+    assert br.state == "closed" and br.stats()["calls"] == 0
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        session.get(tmdb_url("/movie/popular"))  # full default timeout: a real failure
+    assert br.stats()["calls"] == 1
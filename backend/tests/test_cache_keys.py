@@ -0,0 +1,30 @@
+from conftest import FakeResp
+
+from app.api import routes
+from app.core import metrics
+
+
+def test_equivalent_discover_queries_share_one_cache_entry(client, monkeypatch):
+    calls = []
+
+    def fake_get(url, params=None, timeout=None):
+        if url.endswith("/genre/movie/list"):
+            return FakeResp({"genres": [{"id": 28, "name": "Action"}, {"id": 35, "name": "Comedy"}]})
+        calls.append(dict(params))
+        return FakeResp({"page": 1, "results": [{"id": 1, "title": "A", "poster_path": "/a"}]})
+
+    monkeypatch.setattr(routes.session, "get", fake_get)
+    for qs in ("genres=Action,Comedy", "genres=comedy,action&page=1", "genres=35,28&sort_by=Popularity.desc&region=us"):
+        assert client.get(f"/api/discover?{qs}").status_code == 200
+    assert len(calls) == 1 and calls[0]["with_genres"] == "28,35"
+    assert metrics.snapshot()["gauges"]["route_cache"]["discover"]["keys"] == 1
+
+    client.get("/api/discover?genres=Action&page=2")
+    assert len(calls) == 2
+
+
+def test_unparseable_params_are_not_aliased_to_defaults(client, monkeypatch):
+    monkeypatch.setattr(routes.session, "get", lambda url, params=None, timeout=None: FakeResp({"page": 1, "results": []}))
+    assert client.get("/api/trending?window=Day").status_code == 200
+    assert client.get("/api/trending?window=month").status_code == 400
+    assert client.get("/api/recommend/mood?mood=happy&page=x").status_code == 400
@@ -0,0 +1,48 @@
+from conftest import FakeResp
+
+from app.api import routes
+from app.core import cache
+
+
+def _details_get(url, params=None, timeout=None):
+    mid = int(url.rstrip("/").split("/")[-1])
+    return FakeResp({"id": mid, "title": f"Movie {mid}"})
+
+
+def test_purge_by_movie_tag_drops_only_that_movie(client, monkeypatch):
+    monkeypatch.setattr(routes, "ADMIN_TOKEN", "s3cret")
+    monkeypatch.setattr(routes.session, "get", _details_get)
+    client.get("/api/details/603")
+    client.get("/api/details/604")
+    assert {"movie:603", "route:details", "lang:en-US"} <= set(cache._TAG_INDEX)
+
+    auth = {"Authorization": "Bearer s3cret"}
+    resp = client.post("/api/admin/cache/purge", json={"tags": ["movie:603"]}, headers=auth)
+    assert resp.status_code == 200
+    assert resp.get_json() == {"tags": ["movie:603"], "purged": 3, "broadcast": False}  # route, bundle, primed details
+    assert client.get("/api/details/603").headers["X-Cache"] == "miss"
+    assert client.get("/api/details/604").headers["X-Cache"] == "hit"
+    assert "movie:603" in cache._TAG_INDEX  # re-tagged on refetch
+    assert cache.purge_tags(["route:details"]) == 2
+    assert all(k[1].startswith("func:") for keys in cache._TAG_INDEX.values() for k in keys)
+
+
+def test_purge_requires_admin_token(client, monkeypatch):
+    url = "/api/admin/cache/purge"
+    assert client.post(url, json={"tags": ["movie:1"]}).status_code == 404  # disabled
+    monkeypatch.setattr(routes, "ADMIN_TOKEN", "s3cret")
+    assert client.post(url, json={"tags": ["movie:1"]}, headers={"Authorization": "Bearer nope"}).status_code == 401
+    assert client.post(url, json={"tags": "movie:1"}, headers={"Authorization": "Bearer s3cret"}).status_code == 400
+
+
+def test_tag_index_drops_rewritten_and_dead_entries(monkeypatch):
+    cache._func_store("func:x|f|(1,)|()", {"a": 1}, 60, ["func:x", "movie:1"])
+    cache._func_store("func:x|f|(1,)|()", {"a": 2}, 60, ["func:x", "movie:2"])  # tags changed
+    assert "movie:1" not in cache._TAG_INDEX and "movie:2" in cache._TAG_INDEX
+
+    cache._FUNC_CACHE["func:x|f|(1,)|()"]["ts"] -= 60 + cache.CACHE_STALE_IF_ERROR + 1  # can't even serve stale
+    cache._func_store("func:x|f|(3,)|()", {"a": 3}, 60, ["func:x", "movie:3"])
+    monkeypatch.setattr(cache, "_SWEEP_MIN_WRITES", 1)
+    cache._func_store("func:x|f|(4,)|()", {"a": 4}, 60, ["func:x"])
+    assert "func:x|f|(1,)|()" not in cache._FUNC_CACHE and "movie:2" not in cache._TAG_INDEX
+    assert cache._TAG_INDEX["func:x"] == {("func", "func:x|f|(3,)|()"), ("func", "func:x|f|(4,)|()")}
@@ -0,0 +1,69 @@
+import pytest
+
+from app.core import snapshot
+from app.core.cache import _FUNC_CACHE, _ROUTE_CACHE, _cache_clear, _now
+
+
+def _fill():
+    now = _now()
+    _ROUTE_CACHE["trending|{}"] = {"ts": now, "ttl": 300, "payload": {"results": [{"id": 1}]}}
+    _ROUTE_CACHE["old|{}"] = {"ts": now - 1000, "ttl": 300, "payload": {"results": []}}
+    _FUNC_CACHE["func:genres|_genres_map|()|()"] = {"ts": now, "ttl": 3600, "value": {28: "Action", 35: "Comedy"}}
+
+
+def test_round_trip_skips_expired_and_keeps_int_keys(tmp_path):
+    path = str(tmp_path / "cache.snap")
+    _fill()
+    assert snapshot.save(path) == 2
+    _cache_clear()
+    assert snapshot.load(path) == 2
+    assert _ROUTE_CACHE["trending|{}"]["payload"] == {"results": [{"id": 1}]}
+    assert "old|{}" not in _ROUTE_CACHE
+    assert _FUNC_CACHE["func:genres|_genres_map|()|()"]["value"] == {28: "Action", 35: "Comedy"}
+
+
+def test_fresh_entries_win_and_truncated_file_loads(tmp_path):
+    path = str(tmp_path / "cache.snap")
+    _fill()
+    snapshot.save(path)
+    with open(path, "r+b") as f:
+        f.truncate(f.seek(0, 2) - 3)  # crash mid-write of the last record
+    _cache_clear()
+    _ROUTE_CACHE["trending|{}"] = {"ts": _now(), "ttl": 300, "payload": {"results": [{"id": 2}]}}
+    assert snapshot.load(path) == 0  # first record already present, second cut short
+    assert _ROUTE_CACHE["trending|{}"]["payload"] == {"results": [{"id": 2}]}
+
+
+def test_no_save_before_startup_load_and_no_tmp_left_on_failure(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.snap")
+    _fill()
+    snapshot.save(path)
+    before = open(path, "rb").read()
+    _cache_clear()
+    monkeypatch.setattr(snapshot, "CACHE_SNAPSHOT_PATH", path)
+    monkeypatch.setattr(snapshot, "_loaded", snapshot.threading.Event())
+    snapshot._persist()  # exit during the background load
+    assert open(path, "rb").read() == before
+
+    def disk_full(fd):
+        raise OSError("disk full")
+
+    _fill()
+    monkeypatch.setattr(snapshot.os, "fsync", disk_full)
+    with pytest.raises(OSError):
+        snapshot.save(path)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["cache.snap"]
+    assert open(path, "rb").read() == before
+
+
+def test_load_yields_between_batches(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.snap")
+    now = _now()
+    for i in range(7):
+        _ROUTE_CACHE[f"popular|{{\"page\":{i}}}"] = {"ts": now, "ttl": 300, "payload": {"results": [{"id": i}]}}
+    snapshot.save(path)
+    _cache_clear()
+    pauses = []
+    monkeypatch.setattr(snapshot.time, "sleep", pauses.append)
+    assert snapshot.load(path, batch=3) == 7
+    assert pauses == [0.0, 0.0]
@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+
+from app.services.content_engine import ContentEngine
+
+
+def _movie(mid, title, overview, genres, year):
+    return {
+        "id": mid,
+        "title": title,
+        "overview": overview,
+        "genre_ids": genres,
+        "release_date": f"{year}-06-01",
+        "popularity": 50.0,
+        "poster_path": f"/{mid}.jpg",
+    }
+
+
+CATALOG = [
+    _movie(1, "Alien", "A crew aboard a space ship hunted by an alien creature", [27, 878], 1979),
+    _movie(2, "Aliens", "Marines return to the alien planet to fight the creature hive", [28, 878], 1986),
+    _movie(3, "Notting Hill", "A bookshop owner falls in love with a famous actress", [35, 10749], 1999),
+    _movie(4, "Love Actually", "Interwoven love stories in London at christmas", [35, 10749], 2003),
+    _movie(5, "Event Horizon", "A rescue crew in space finds a ship that returned from hell", [27, 878], 1997),
+]
+
+
+def test_similar_ranks_by_content_and_excludes_seed():
+    e = ContentEngine(text_dim=256)
+    assert e.add_many(CATALOG) == 5
+    ids = [mid for mid, _ in e.similar(1, k=2)]
+    assert 1 not in ids
+    assert set(ids) == {2, 5}
+    assert e.similar(3, k=1)[0][0] == 4
+
+
+def test_incremental_upsert_and_batch_queries():
+    e = ContentEngine(text_dim=256, capacity=2)
+    e.add_many(CATALOG[:2])
+    e.add_many(CATALOG[2:])  # grows past the initial capacity
+    assert len(e) == 5
+    e.add_many([{**CATALOG[0], "overview": None}])  # refresh keeps the known overview
+    assert e.meta_of(1)["overview"] == CATALOG[0]["overview"]
+
+    out = e.topk_batch(np.stack([e.vector_of(1), e.vector_of(3)]), k=1, exclude=[{1}, {3}])
+    assert out[0][0][0] in {2, 5}
+    assert out[1][0][0] == 4
+
+
+def test_ann_index_matches_exact_and_round_trips(tmp_path):
+    from app.services.ann_index import LSHIndex
+
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((2000, 32)).astype(np.float32)
+    X /= np.linalg.norm(X, axis=1, keepdims=True)
+    idx = LSHIndex(32, n_tables=12, n_bits=8).build(np.arange(2000), X)
+
+    exact = np.argsort(-(X @ X[7]))[1:6].tolist()
+    got = [i for i, _ in idx.query(X[7], k=5, exclude={7})]
+    assert len(set(got) & set(exact)) >= 4
+
+    idx.add([5000], X[7:8])  # incremental insert of a duplicate vector
+    assert idx.query(X[7], k=1, exclude={7})[0][0] == 5000
+
+    path = str(tmp_path / "ann.npz")
+    idx.save(path)
+    assert LSHIndex.load(path).query(X[7], k=5, exclude={7}) == idx.query(X[7], k=5, exclude={7})
+
+
+def test_recommend_pages_stay_local_for_a_covered_seed(client, monkeypatch):
+    from app.api import routes
+
+    e = ContentEngine(text_dim=256)
+    e.add_many(CATALOG)
+    monkeypatch.setattr(e, "ready", lambda: True)
+    monkeypatch.setattr(routes, "content_engine", e)
+    monkeypatch.setattr(routes.session, "get", lambda *a, **k: pytest.fail("TMDb called for a local seed"))
+
+    first = client.get("/api/recommend/1").get_json()
+    assert first["source"] == "local" and first["total_pages"] == 1
+    past = client.get("/api/recommend/1?page=3").get_json()
+    assert past["source"] == "local" and past["total_pages"] == 1 and past["results"] == []
+
+
+def test_reweight_runs_off_the_lock_and_keeps_concurrent_writes():
+    import threading
+    import time
+
+    e = ContentEngine(text_dim=256)
+    e.add_many([_movie(100 + i, f"Film {i}", f"story number {i} about space", [878], 2000) for i in range(127)])
+    started, release = threading.Event(), threading.Event()
+    vectorize, calls = e._vectorize, []
+
+    def slow_vectorize(meta, counts, idf):
+        if threading.current_thread().name == "reweigher":
+            calls.append(meta["id"])
+            if len(calls) == 2:  # first row of the full pass (call 1 is the inserted row itself)
+                started.set()
+                release.wait(2)
+        return vectorize(meta, counts, idf)
+
+    e._vectorize = slow_vectorize
+    t = threading.Thread(target=e.add_many, args=([_movie(1, "Alien", "space creature", [27], 1979)],), name="reweigher")
+    t.start()
+    assert started.wait(2)
+    t0 = time.monotonic()
+    assert len(e.matrix()[0]) == 128
+    assert time.monotonic() - t0 < 0.5  # readers are not blocked by the reweight
+    e.add_many([{**CATALOG[2], "id": 100}])  # rewritten while the reweight is in flight
+    release.set()
+    t.join(2)
+    assert e._reweighted_at == 128 and e._dirty is None
+    assert e.meta_of(100)["title"] == "Notting Hill"
+    expected = vectorize(e.meta_of(100), e._term_counts(e.meta_of(100)), e._idf())
+    assert np.allclose(e.vector_of(100), expected, atol=0.01)  # new text, not the pre-reweight row
@@ -0,0 +1,73 @@
+import time
+
+import pytest
+import requests
+from urllib3.exceptions import ConnectTimeoutError, MaxRetryError
+
+from conftest import FakeResp
+
+from app.api import routes
+from app.clients.tmdb import session, tmdb_url
+from app.core import deadline
+from app.core.concurrency import submit
+from app.core.deadline import DeadlineExceeded, DeadlineRetry
+
+
+def test_upstream_timeout_is_capped_by_client_deadline(client, monkeypatch):
+    seen = []
+
+    def request(self, method, url, *a, **kw):
+        seen.append(kw["timeout"])
+        return FakeResp({"page": 1, "results": []})
+
+    monkeypatch.setattr(requests.Session, "request", request)
+    assert client.get("/api/popular", headers={"X-Timeout-Ms": "1500"}).status_code == 200
+    assert 1.0 < seen[0] <= 1.5
+    assert client.get("/api/popular?page=2").status_code == 200
+    assert seen[1] == pytest.approx(8, abs=0.1)  # DEFAULT_TIMEOUT under the 8s route budget
+
+
+def test_non_finite_client_timeout_is_ignored():
+    view = lambda: None  # noqa: E731
+    for raw in ("nan", "inf", "-inf", "soon"):
+        assert deadline.budget_for(view, raw) == deadline.REQUEST_DEADLINE
+    assert deadline.budget_for(view, "1e12") == deadline.REQUEST_DEADLINE_MAX
+    assert deadline.budget_for(view, "50") == deadline.REQUEST_DEADLINE_MIN
+
+
+def test_deadline_follows_work_onto_the_pool():
+    with deadline.scope(1.0):
+        left = submit(deadline.remaining).result()
+    assert left is not None and 0.9 < left <= 1.0
+    assert submit(deadline.remaining).result() is None
+
+
+def test_spent_budget_fails_fast_without_calling_upstream(monkeypatch):
+    calls = []
+    monkeypatch.setattr(requests.Session, "request", lambda self, m, url, *a, **kw: calls.append(url))
+    with deadline.scope(0.0), pytest.raises(DeadlineExceeded):
+        session.get(tmdb_url("/movie/popular"))
+    assert calls == []
+
+
+def test_retries_stop_when_backoff_and_attempt_no_longer_fit():
+    retry = DeadlineRetry(total=3, backoff_factor=0.5)
+    err = ConnectTimeoutError("slow")
+    with deadline.scope(0.3):
+        deadline.timeout_for(8)  # this attempt may use all 0.3s that are left
+        with pytest.raises(MaxRetryError):
+            retry.increment("GET", "/movie/popular", error=err)
+    assert retry.increment("GET", "/movie/popular", error=err).total == 2  # no deadline: normal retry
+
+
+def test_route_returns_504_once_the_budget_is_spent(client, monkeypatch):
+    def slow_get(url, params=None, timeout=None):
+        time.sleep(0.1)
+        deadline.timeout_for(timeout)
+        return FakeResp({})
+
+    monkeypatch.setattr(routes.session, "get", slow_get)
+    monkeypatch.setattr(deadline, "REQUEST_DEADLINE_MIN", 0.05)
+    resp = client.get("/api/popular", headers={"X-Timeout-Ms": "60"})
+    assert resp.status_code == 504
+    assert resp.get_json()["code"] == "deadline_exceeded"
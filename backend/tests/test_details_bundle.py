@@ -0,0 +1,43 @@
+from conftest import FakeResp
+
+from app.api import routes
+
+
+def _bundle(mid):
+    rec = {"page": 1, "total_pages": 1, "total_results": 1,
+           "results": [{"id": 11, "title": "Rec", "poster_path": "/r.jpg", "release_date": "2001-01-01"}]}
+    return {
+        "id": mid, "title": "Seed", "release_date": "1999-03-31", "poster_path": "/s.jpg",
+        "credits": {"cast": [{"id": 1, "name": "Keanu", "character": "Neo"}]},
+        "recommendations": rec,
+        "similar": {"page": 1, "total_results": 0, "results": []},
+        "watch/providers": {"results": {"US": {"link": "l", "flatrate": [{"provider_id": 8, "provider_name": "Netflix"}]}}},
+    }
+
+
+def test_one_upstream_call_primes_recommend_and_providers(client, monkeypatch):
+    calls = []
+
+    def fake_get(url, params=None, timeout=None):
+        calls.append((url, dict(params or {})))
+        return FakeResp(_bundle(603))
+
+    monkeypatch.setattr(routes.session, "get", fake_get)
+    body = client.get("/api/details/603?include=recommendations,providers").get_json()
+    assert body["movie"]["title"] == "Seed" and body["cast"][0]["character"] == "Neo"
+    assert body["recommendations"]["source"] == "recommendations"
+    assert [m["id"] for m in body["recommendations"]["results"]] == [11]
+    assert body["providers"]["stream"][0]["name"] == "Netflix"
+    assert len(calls) == 1 and "watch/providers" in calls[0][1]["append_to_response"]
+
+    recs = client.get("/api/recommend/603")
+    assert recs.headers["X-Cache"] == "hit" and recs.get_json()["results"][0]["id"] == 11
+    assert client.get("/api/providers/603?region=US").get_json()["stream"][0]["id"] == 8
+    assert client.get("/api/details/603").get_json()["cast"][0]["name"] == "Keanu"
+    assert len(calls) == 1
+
+
+def test_details_errors(client, monkeypatch):
+    monkeypatch.setattr(routes.session, "get", lambda url, params=None, timeout=None: FakeResp({}, status_code=404))
+    assert client.get("/api/details/1").status_code == 404
+    assert client.get("/api/details/1?include=reviews").status_code == 400
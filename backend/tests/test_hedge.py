@@ -0,0 +1,115 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from conftest import FakeResp
+
+from app.clients.tmdb import session, tmdb_url
+from app.core import breaker, hedge, metrics
+from app.core.hedge import Hedger
+
+
+@pytest.fixture(autouse=True)
+def _fresh():
+    breaker._breakers_reset()
+    metrics._metrics_reset()
+    yield
+    breaker._breakers_reset()
+
+
+def test_threshold_tracks_family_quantile_and_ratio_budget():
+    h = Hedger(quantile=0.9, min_samples=10, ratio=0.5, min_delay=0.0)
+    for ms in range(1, 10):
+        h.observe("/movie/{id}", ms / 1000)
+    assert h.delay("/movie/{id}") is None  # not enough samples yet
+    h.observe("/movie/{id}", 0.1)
+    assert h.delay("/movie/{id}") == pytest.approx(0.1)
+    assert h.delay("/search/movie") is None
+
+    # 0.5 credit per eligible call: two calls buy one hedge
+    assert h.admit() is False
+    h.delay("/movie/{id}")
+    assert h.admit() is True and h.admit() is False
+
+
+def test_slow_get_is_hedged_and_first_answer_wins(monkeypatch):
+    attempts = []
+    lock = threading.Lock()
+
+    def request(self, method, url, *a, **kw):
+        with lock:
+            attempts.append(url)
+            n = len(attempts)
+        time.sleep(0.5 if n == 1 else 0.01)  # primary is stuck in the tail
+        return FakeResp({"attempt": n})
+
+    monkeypatch.setattr(requests.Session, "request", request)
+    monkeypatch.setattr(hedge, "TMDB_HEDGE_ENABLED", True)
+    h = Hedger(min_samples=1, ratio=1.0, min_delay=0.0)
+    h.observe("/movie/{id}/similar", 0.03)
+    monkeypatch.setattr(hedge, "hedger", h)
+
+    t0 = time.perf_counter()
+    r = session.get(tmdb_url("/movie/7/similar"))
+    assert time.perf_counter() - t0 < 0.3
+    assert r.json() == {"attempt": 2}
+    assert metrics.counter("tmdb.hedge.issued") == 1
+    assert hedge.hedge_stats()["win_rate"] == 1.0
+
+
+def test_hedging_is_opt_in(monkeypatch):
+    calls = []
+    monkeypatch.setattr(requests.Session, "request",
+                        lambda self, m, url, *a, **kw: calls.append(url) or FakeResp({}))
+    h = Hedger(min_samples=1, ratio=1.0, min_delay=0.0)
+    h.observe("/movie/popular", 0.0)
+    monkeypatch.setattr(hedge, "hedger", h)
+    session.get(tmdb_url("/movie/popular"))
+    assert len(calls) == 1 and metrics.counter("tmdb.hedge.issued") == 0
+
+
+def test_fast_error_from_hedge_does_not_beat_slow_success(monkeypatch):
+    attempts = []
+    lock = threading.Lock()
+
+    def request(self, method, url, *a, **kw):
+        with lock:
+            attempts.append(url)
+            n = len(attempts)
+        if n == 1:
+            time.sleep(0.1)
+            return FakeResp({"attempt": 1})
+        return FakeResp({}, status_code=503)
+
+    monkeypatch.setattr(requests.Session, "request", request)
+    monkeypatch.setattr(hedge, "TMDB_HEDGE_ENABLED", True)
+    h = Hedger(min_samples=1, ratio=1.0, min_delay=0.0)
+    h.observe("/movie/{id}/similar", 0.01)
+    monkeypatch.setattr(hedge, "hedger", h)
+
+    r = session.get(tmdb_url("/movie/7/similar"))
+    assert r.status_code == 200 and r.json() == {"attempt": 1}
+    assert metrics.counter("tmdb.hedge.issued") == 1 and metrics.counter("tmdb.hedge.won") == 0
+
+
+def test_busy_primary_pool_runs_the_call_inline_unhedged(monkeypatch):
+    from app.clients import tmdb
+
+    callers = []
+    monkeypatch.setattr(requests.Session, "request",
+                        lambda self, m, url, *a, **kw: callers.append(threading.current_thread().name) or FakeResp({}))
+    monkeypatch.setattr(hedge, "TMDB_HEDGE_ENABLED", True)
+    h = Hedger(min_samples=1, ratio=1.0, min_delay=0.0)
+    h.observe("/movie/popular", 1.0)  # the primary answers long before a hedge would start
+    monkeypatch.setattr(hedge, "hedger", h)
+    monkeypatch.setattr(tmdb, "_primary_slots", threading.BoundedSemaphore(1))
+    tmdb._primary_slots.acquire()  # the only slot is taken
+
+    session.get(tmdb_url("/movie/popular"))
+    assert callers == [threading.current_thread().name]
+    assert metrics.counter("tmdb.hedge.primary_busy") == 1 and metrics.counter("tmdb.hedge.issued") == 0
+    tmdb._primary_slots.release()
+    session.get(tmdb_url("/movie/popular"))
+    assert callers[-1].startswith("tmdb-primary")
@@ -0,0 +1,69 @@
+import threading
+
+from conftest import FakeResp
+
+from app.api import routes
+
+
+def _page(tag):
+    return {"page": 1, "total_pages": 1, "total_results": 2,
+            "results": [{"id": i, "title": f"{tag}{i}", "poster_path": "/p.jpg"} for i in (1, 2)]}
+
+
+def test_home_fans_out_and_reuses_section_caches(client, monkeypatch):
+    calls = []
+
+    def fake_get(url, params=None, timeout=None):
+        calls.append(url)
+        return FakeResp(_page(url.rsplit("/", 1)[-1]))
+
+    monkeypatch.setattr(routes.session, "get", fake_get)
+    monkeypatch.setattr(routes, "HOME_MOODS", ["happy"])
+    body = client.get("/api/home").get_json()
+    assert not body["partial"]
+    assert [m["title"] for m in body["hero"]] == ["day1", "day2"]
+    assert body["trending_week"][0]["title"] == "week1"
+    assert body["popular"][0]["title"] == "popular1"
+    assert body["moods"][0]["mood"] == "happy" and len(body["moods"][0]["results"]) == 2
+    n = len(calls)
+
+    # Sections live in the shared route caches: /trending is now a hit
+    assert client.get("/api/trending?window=week").headers["X-Cache"] == "hit"
+    assert client.get("/api/home").headers["X-Cache"] == "hit"
+    assert len(calls) == n
+
+
+def test_home_returns_partial_feed_at_the_deadline(client, monkeypatch):
+    release = threading.Event()
+
+    def fake_get(url, params=None, timeout=None):
+        if "/movie/popular" in url:
+            release.wait(2)
+        return FakeResp(_page("x"))
+
+    monkeypatch.setattr(routes.session, "get", fake_get)
+    monkeypatch.setattr(routes, "HOME_MOODS", [])
+    monkeypatch.setattr(routes, "HOME_DEADLINE", 0.2)
+    resp = client.get("/api/home")
+    body = resp.get_json()
+    assert body["partial"] and body["missing"] == ["popular"] and body["popular"] == []
+    assert len(body["trending_day"]) == 2
+    release.set()
+    assert client.get("/api/home").headers["X-Cache"] == "miss"  # partial feeds are not cached
+
+
+def test_mood_sections_do_not_starve_the_shared_pool(client, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    from app.core import concurrency
+
+    def slow_get(url, params=None, timeout=None):
+        threading.Event().wait(0.05)
+        return FakeResp(_page("x"))
+
+    monkeypatch.setattr(routes.session, "get", slow_get)
+    monkeypatch.setattr(routes, "HOME_MOODS", ["happy", "thriller"])
+    monkeypatch.setattr(routes, "HOME_DEADLINE", 1.5)
+    # Shared pool smaller than the number of sections: nested waits used to deadlock it
+    monkeypatch.setattr(concurrency, "_POOL", ThreadPoolExecutor(max_workers=2))
+    body = client.get("/api/home").get_json()
+    assert not body["partial"] and len(body["moods"]) == 2
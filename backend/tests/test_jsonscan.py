@@ -0,0 +1,41 @@
+import json
+import random
+
+from app.api.routes import parse_llm_movies
+from app.core.jsonscan import JSONScanner, find_first_json
+
+
+def test_extracts_embedded_json_with_braces_in_strings():
+    reply = {"reply": "hi", "picks": [{"title": "Brace {yourself} [now]", "year": 2001}]}
+    text = "Sure! {not json} here you go:\n```json\n" + json.dumps(reply) + "\n```"
+    assert find_first_json(text) == reply
+    assert find_first_json('{"title": "It\\\'s Alive"}') == {"title": "It's Alive"}
+    assert find_first_json("{" * 5000 + '[1, 2]') == [1, 2]
+
+
+def test_parse_llm_movies_prefers_picks_and_falls_back_to_bullets():
+    text = 'noise {"picks": [{"title": "Heat", "year": "1995", "reason": "x"}, {"title": ""}]}'
+    assert parse_llm_movies(text) == ("", [{"title": "Heat", "year": 1995, "reason": "x"}])
+    assert parse_llm_movies("- Alien (1979)\n- Heat")[1][0] == {"title": "- Alien", "year": 1979, "reason": None}
+
+
+def test_chunked_feed_streams_picks_and_matches_whole_text():
+    picks = [{"title": f"M{i} }}{{", "year": 2000 + i} for i in range(6)]
+    text = 'prefix "quote [x} {y} ' + json.dumps({"reply": "ok", "picks": picks}) + " trailing ]"
+    rng = random.Random(7)
+    for _ in range(50):
+        sc, streamed, i = JSONScanner(), [], 0
+        while i < len(text):
+            step = rng.randint(1, 9)
+            streamed += sc.feed(text[i:i + step])
+            i += step
+        assert streamed == picks
+        assert sc.close() == [find_first_json(text)]
+
+
+def test_fuzz_never_raises():
+    rng = random.Random(0)
+    alphabet = '{}[]",:\\ ab1\n\''
+    for _ in range(500):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 80)))
+        find_first_json(text)
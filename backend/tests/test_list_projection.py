@@ -0,0 +1,36 @@
+from app.api import routes
+from conftest import FakeResp
+
+RAW = {
+    "page": 1,
+    "total_pages": 1,
+    "total_results": 1,
+    "results": [
+        {
+            "id": 7,
+            "title": "Heat",
+            "original_title": "Heat",
+            "overview": "Long text",
+            "backdrop_path": "/b.jpg",
+            "poster_path": "/p.jpg",
+            "release_date": "1995-12-15",
+            "vote_average": 7.9,
+            "vote_count": 7000,
+        }
+    ],
+}
+
+
+def test_popular_default_is_slim(client, monkeypatch):
+    monkeypatch.setattr(routes.session, "get", lambda *a, **k: FakeResp(RAW))
+    body = client.get("/api/popular").get_json()
+    assert set(body["results"][0]) == set(routes._LIST_DEFAULT_FIELDS)
+
+
+def test_trending_fields_param(client, monkeypatch):
+    monkeypatch.setattr(routes.session, "get", lambda *a, **k: FakeResp(RAW))
+    body = client.get("/api/trending?fields=title,overview,bogus").get_json()
+    assert body["results"] == [{"id": 7, "title": "Heat", "overview": "Long text"}]
+
+    full = client.get("/api/trending?fields=all").get_json()
+    assert full["results"][0]["backdrop_path"] == "/b.jpg"
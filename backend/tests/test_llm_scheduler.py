@@ -0,0 +1,123 @@
+import threading
+import time
+
+import pytest
+
+from app.clients.llm_scheduler import LLMBusy, LLMScheduler, account_usage
+from app.core import metrics
+
+
+def test_concurrency_is_capped():
+    sched = LLMScheduler(max_concurrent=2, queue_max=10, queue_slo=2)
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    def call():
+        with sched.slot():
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.03)
+            with lock:
+                running[0] -= 1
+
+    threads = [threading.Thread(target=call) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert peak[0] == 2
+    assert sched.stats()["active"] == 0 and sched.stats()["queued"] == 0
+
+
+def test_higher_priority_waiter_gets_the_next_slot():
+    sched = LLMScheduler(max_concurrent=1, queue_max=10, queue_slo=2)
+    order = []
+    release = threading.Event()
+
+    def hold():
+        with sched.slot():
+            release.wait(2)
+
+    def waiter(name, prio):
+        with sched.slot(prio):
+            order.append(name)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    time.sleep(0.02)
+    low = threading.Thread(target=waiter, args=("background", 1))
+    low.start()
+    time.sleep(0.02)
+    high = threading.Thread(target=waiter, args=("interactive", 0))
+    high.start()
+    time.sleep(0.02)
+    release.set()
+    for t in (holder, low, high):
+        t.join()
+    assert order == ["interactive", "background"]
+
+
+def test_queue_slo_and_full_queue_reject():
+    sched = LLMScheduler(max_concurrent=1, queue_max=1, queue_slo=0.05)
+    with sched.slot():
+        waiter_error = []
+
+        def wait_for_slot():
+            try:
+                with sched.slot():
+                    pass
+            except LLMBusy as e:
+                waiter_error.append(e)
+
+        t = threading.Thread(target=wait_for_slot)
+        t.start()
+        time.sleep(0.01)
+        with pytest.raises(LLMBusy):  # queue (size 1) already holds the waiter
+            with sched.slot():
+                pass
+        t.join()
+        assert waiter_error  # gave up after the 50ms SLO
+    assert sched.stats() == {"active": 0, "queued": 0, "max_concurrent": 1, "coalescing": 0}
+
+
+def test_identical_calls_are_coalesced():
+    sched = LLMScheduler()
+    calls = []
+    results = []
+
+    def fn():
+        calls.append(1)
+        time.sleep(0.05)
+        return {"choices": []}
+
+    threads = [threading.Thread(target=lambda: results.append(sched.coalesce(("sys", "sad"), fn))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1 and len(results) == 5
+    assert all(r is results[0] for r in results)
+
+
+def test_token_usage_is_counted():
+    metrics._metrics_reset()
+    account_usage({"usage": {"prompt_tokens": 120, "completion_tokens": 80}})
+    assert metrics.counter("llm.tokens.prompt") == 120
+    assert metrics.counter("llm.tokens.completion") == 80
+
+
+def test_busy_scheduler_does_not_take_the_breaker_probe(monkeypatch):
+    from app.clients import llama
+    from app.core import breaker as breaker_mod
+
+    breaker_mod._breakers_reset()
+    br = breaker_mod.breaker("llm")
+    br.cooldown = 0.0
+    br._trip(time.monotonic())  # half-open on the next call
+    monkeypatch.setattr(llama, "scheduler", LLMScheduler(max_concurrent=0, queue_max=0))
+    with pytest.raises(LLMBusy):
+        llama.LlamaClient()._analyze("sys", "sad")
+    assert not br._probing
+    br.before()  # the probe is still available once load is gone
+    breaker_mod._breakers_reset()
@@ -0,0 +1,74 @@
+import threading
+import time
+
+from conftest import FakeResp
+
+from app.api import routes
+from app.clients.llama import LlamaClient
+from app.core import ratelimit
+from app.core.jobs import JobStore
+
+LLM_REPLY = {"choices": [{"message": {"content": '{"reply": "Tense.", "picks": [{"title": "Heat", "year": 1995}]}'}}]}
+MOVIE = {"id": 949, "title": "Heat", "poster_path": "/heat.jpg", "release_date": "1995-12-15", "popularity": 30.0}
+
+
+def _poll(client, url, timeout=3.0):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        body = client.get(url).get_json()
+        if body["status"] in ("done", "failed"):
+            return body
+        time.sleep(0.02)
+    raise AssertionError("job did not finish")
+
+
+def test_identical_prompts_share_one_job_and_result_is_cached(client, monkeypatch):
+    release = threading.Event()
+    llm_calls = []
+
+    def fake_llm(self, system_prompt, text):
+        llm_calls.append(text)
+        release.wait(2)
+        return LLM_REPLY
+
+    monkeypatch.setattr(routes.mood_jobs, "store", JobStore())
+    monkeypatch.setattr(routes, "resolve_title", lambda title, year=None: None)  # always ask (fake) TMDb
+    monkeypatch.setattr(LlamaClient, "analyze_mood_with_system_prompt", fake_llm)
+    monkeypatch.setattr(routes.session, "get", lambda url, params=None, timeout=None: FakeResp({"results": [MOVIE]}))
+
+    first = client.post("/api/mood/analyze/jobs", json={"text": "Something  tense"})
+    assert first.status_code == 202
+    job = first.get_json()
+    again = client.post("/api/mood/analyze/jobs", json={"text": "something tense "}).get_json()
+    assert again["job_id"] == job["job_id"] and again["source"] == "joined"
+
+    release.set()
+    done = _poll(client, job["poll"])
+    assert done["status"] == "done" and done["result_status"] == 200
+    assert done["result"]["movies"][0]["id"] == 949
+    assert len(llm_calls) == 1
+
+    cached = client.post("/api/mood/analyze/jobs", json={"text": "SOMETHING TENSE"})
+    assert cached.status_code == 200
+    assert cached.get_json()["source"] == "cached" and cached.get_json()["result"] == done["result"]
+
+    # Another user's recency differs: their own job, not the first user's picks
+    other = client.post("/api/mood/analyze/jobs", json={"text": "something tense"},
+                        headers={"X-Session-Id": "someone-else"}).get_json()
+    assert other["source"] == "queued" and other["job_id"] != job["job_id"]
+    _poll(client, other["poll"])
+
+
+def test_full_queue_rejects_and_unknown_job_is_404(client, monkeypatch):
+    monkeypatch.setattr(routes.mood_jobs, "max_queue", 0)
+    resp = client.post("/api/mood/analyze/jobs", json={"text": "cozy rainy day"})
+    assert resp.status_code == 503 and resp.headers["Retry-After"] == "5"
+    assert client.post("/api/mood/analyze/jobs", json={}).status_code == 400
+    assert client.get("/api/mood/analyze/jobs/nope").status_code == 404
+
+
+def test_job_polls_are_not_rate_limited(client):
+    now = time.time()
+    ratelimit._requests["127.0.0.1"].extend([now] * ratelimit.RATE_LIMIT)
+    assert client.get("/api/mood/analyze/jobs/nope").status_code == 404
+    assert client.post("/api/mood/analyze/jobs", json={"text": "cozy"}).status_code == 429
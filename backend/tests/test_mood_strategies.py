@@ -0,0 +1,67 @@
+import time
+
+from app.api import routes
+from app.core.concurrency import run_strategies
+from conftest import FakeResp
+
+
+def test_run_strategies_prefers_priority_over_speed():
+    def slow_primary():
+        time.sleep(0.05)
+        return "primary"
+
+    idx, val = run_strategies([slow_primary, lambda: "fallback"], timeout=1.0)
+    assert (idx, val) == (0, "primary")
+
+
+def test_run_strategies_falls_through_and_times_out():
+    idx, val = run_strategies([lambda: None, lambda: "second"], timeout=1.0)
+    assert (idx, val) == (1, "second")
+
+    idx, val = run_strategies([lambda: time.sleep(0.5)], timeout=0.05)
+    assert (idx, val) == (None, None)
+
+
+def test_recommend_mood_records_strategy(client, monkeypatch):
+    def fake_get(url, params=None, **kw):
+        if "region" in params:
+            return FakeResp({"page": 1, "results": [{"id": 1, "poster_path": None}]})
+        return FakeResp({"page": 1, "results": [{"id": 2, "title": "X", "poster_path": "/x.jpg"}]})
+
+    monkeypatch.setattr(routes.session, "get", fake_get)
+    body = client.get("/api/recommend/mood?mood=comedy").get_json()
+    assert body["strategy"] == "global"
+    assert [m["id"] for m in body["results"]] == [2]
+    counters = client.get("/api/metrics").get_json()["counters"]
+    assert counters["recommend_mood.strategy.global"] >= 1
+
+
+def test_recommend_mood_serves_precomputed_pool(client, monkeypatch):
+    from app.services import mood_pool_service, rerank
+
+    def fake_get(url, params=None, **kw):
+        base = (params["page"] - 1) * 20
+        return FakeResp({"results": [
+            {"id": base + i, "title": f"M{base + i}", "poster_path": "/p.jpg", "genre_ids": [35]}
+            for i in range(20)
+        ]})
+
+    monkeypatch.setattr(mood_pool_service.session, "get", fake_get)
+    monkeypatch.setattr(mood_pool_service, "MOOD_POOL_DEPTH", 3)
+    monkeypatch.setattr(mood_pool_service, "_POOLS", {})
+    monkeypatch.setitem(rerank.MMR_LAMBDA, "mood", 1.0)  # keep popularity order for the slice check
+    pool = mood_pool_service.refresh_pool("comedy", "US", "en-US")
+    assert len(pool.items) == 60
+
+    def no_upstream(*a, **k):
+        raise AssertionError("hot path must not call TMDb")
+
+    monkeypatch.setattr(routes.session, "get", no_upstream)
+    body = client.get("/api/recommend/mood?mood=funny&page=2&page_size=25").get_json()
+    assert body["strategy"] == "pool"
+    assert body["total_pages"] == 3
+    assert [m["id"] for m in body["results"]] == list(range(25, 50))
+    lower = client.get("/api/recommend/mood?mood=funny&page=2&page_size=25&language=en-us")
+    assert lower.headers["X-Cache"] == "hit"  # same key as en-US, and that came from the pool
+    assert routes._LANG_KEY(" pt_br ") == "pt-BR" and routes._LANG_KEY(None) == routes.LANG_DEFAULT
+    assert routes.get_pool("comedy", "US", routes._LANG_KEY("en-us")) is pool
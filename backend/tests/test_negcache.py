@@ -0,0 +1,59 @@
+from conftest import FakeResp
+
+from app.api import routes
+from app.core import metrics
+from app.core.bloom import RotatingBloom
+from app.core.negcache import NOT_FOUND, NegativeCache
+
+
+def test_bloom_has_no_false_negatives_and_rotates():
+    bloom = RotatingBloom(capacity=100, error_rate=0.01)
+    for i in range(100):
+        bloom.add(f"k{i}")
+    assert all(f"k{i}" in bloom for i in range(100))
+    bloom.add("k100")  # current generation full: rotate, previous still answers
+    assert "k0" in bloom and "k100" in bloom and bloom.rotations == 1
+    false_pos = sum(f"other{i}" in bloom for i in range(2000))
+    assert false_pos < 100
+
+
+def test_negative_is_stored_on_repeat_and_evicts_oldest():
+    neg = NegativeCache(max_entries=2, bloom_capacity=1000)
+    neg.remember(NOT_FOUND, "1")
+    assert not neg.hit(NOT_FOUND, "1")  # first sighting: filter only
+    for mid in ("1", "2", "3"):
+        neg.remember(NOT_FOUND, mid)
+        neg.remember(NOT_FOUND, mid)
+    assert not neg.hit(NOT_FOUND, "1") and neg.hit(NOT_FOUND, "3")
+    assert neg.stats()["entries"][NOT_FOUND] == 2
+
+
+def test_details_404_and_empty_title_search_stop_hitting_tmdb(client, monkeypatch):
+    metrics._metrics_reset()
+    calls = []
+
+    def fake_get(url, params=None, timeout=None):
+        calls.append(url)
+        return FakeResp({"results": []}) if "search" in url else FakeResp({}, status_code=404)
+
+    monkeypatch.setattr(routes.session, "get", fake_get)
+    monkeypatch.setattr(routes, "resolve_title", lambda title, year=None: None)
+    for _ in range(4):
+        assert client.get("/api/details/999999999").status_code == 404
+        assert routes._tmdb_search_movie_single("Not A  Real Film", 2031) is None
+    assert routes._tmdb_search_movie_single("not a real film", 2031) is None
+    assert len(calls) == 4  # two upstream misses each, then answered locally
+    assert metrics.counter("neg_cache.not_found.hit") == 2
+    assert metrics.counter("neg_cache.empty_search.hit") == 3
+
+
+def test_movie_details_404_is_owned_by_the_negative_cache(monkeypatch):
+    calls = []
+    monkeypatch.setattr(routes.session, "get",
+                        lambda url, params=None, timeout=None: calls.append(url) or FakeResp({}, status_code=404))
+    for _ in range(3):
+        assert routes._tmdb_movie_details(424242) == {}
+    assert len(calls) == 2  # not pinned by the 1h function cache: the negative tier decides
+    routes.negative.forget("not_found", "424242")
+    routes._tmdb_movie_details(424242)
+    assert len(calls) == 3
@@ -0,0 +1,50 @@
+import time
+
+from conftest import FakeResp
+
+from app.api import routes
+from app.core import cache, metrics, prefetch
+from app.core.ratelimit import TokenBucket
+
+
+def _wait_for(pred, timeout=2.0):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end and not pred():
+        time.sleep(0.01)
+    return pred()
+
+
+def test_next_page_is_prefetched_within_budget(client, monkeypatch):
+    calls = []
+
+    def fake_get(url, params=None, timeout=None):
+        calls.append(params["page"])
+        return FakeResp({"page": int(params["page"]), "total_pages": 2, "results": [{"id": 1, "title": "A"}]})
+
+    monkeypatch.setattr(routes.session, "get", fake_get)
+    monkeypatch.setattr(prefetch, "PREFETCH_ENABLED", True)
+    monkeypatch.setattr(prefetch, "tmdb_budget", TokenBucket(rate=0.0, burst=10))
+    metrics._metrics_reset()
+
+    client.get("/api/popular?page=1")
+    assert _wait_for(lambda: metrics.counter("prefetch.issued") == 1)
+    assert _wait_for(lambda: len(calls) == 2)
+    assert _wait_for(lambda: sum(k.startswith("popular|") for k in cache._ROUTE_CACHE) == 2)  # page 2 stored
+    assert prefetch.tmdb_budget.available() == 10  # only the session hook charges, once per real call
+    resp = client.get("/api/popular?page=2")
+    assert resp.headers["X-Cache"] == "hit" and len(calls) == 2
+    assert metrics.counter("prefetch.hit") == 1
+    time.sleep(0.05)
+    assert calls == ["1", "2"]  # page 2 reports total_pages=2: no page 3
+
+
+def test_prefetch_skips_when_budget_is_low(client, monkeypatch):
+    monkeypatch.setattr(routes.session, "get", lambda url, params=None, timeout=None: FakeResp({"page": 1, "results": []}))
+    monkeypatch.setattr(prefetch, "PREFETCH_ENABLED", True)
+    monkeypatch.setattr(prefetch, "tmdb_budget", TokenBucket(rate=0.0, burst=10))
+    prefetch.tmdb_budget.charge(6)  # below the 50% reserve
+    metrics._metrics_reset()
+
+    client.get("/api/popular?page=1")
+    assert _wait_for(lambda: metrics.counter("prefetch.skipped.budget") == 1)
+    assert metrics.counter("prefetch.issued") == 0
@@ -0,0 +1,86 @@
+from conftest import FakeResp
+
+from app.api import routes
+from app.core import cache
+from app.services.provider_index import ProviderIndex
+
+
+def _doc(mid):
+    return {"id": mid, "results": {
+        "US": {"link": f"https://tmdb/{mid}/US", "flatrate": [{"provider_id": 8, "provider_name": "Netflix", "display_priority": 1}]},
+        "GB": {"link": f"https://tmdb/{mid}/GB", "rent": [{"provider_id": 2, "provider_name": "Apple TV", "display_priority": 3}]},
+    }}
+
+
+def test_raw_document_is_fetched_once_for_all_regions(client, monkeypatch):
+    calls = []
+
+    def fake_get(url, params=None, timeout=None):
+        calls.append(url)
+        return FakeResp(_doc(603))
+
+    monkeypatch.setattr(routes.session, "get", fake_get)
+    us = client.get("/api/providers/603?region=US").get_json()
+    gb = client.get("/api/providers/603?region=GB").get_json()
+    assert us["stream"][0]["name"] == "Netflix" and us["link"].endswith("/US")
+    assert gb["rent"][0]["name"] == "Apple TV" and gb["stream"] == []
+    assert len(calls) == 1
+
+
+def test_batch_resolves_many_and_reports_failures(client, monkeypatch):
+    def fake_get(url, params=None, timeout=None):
+        if "/movie/2/" in url:
+            return FakeResp({}, status_code=503)
+        return FakeResp(_doc(int(url.split("/movie/")[1].split("/")[0])))
+
+    monkeypatch.setattr(routes.session, "get", fake_get)
+    body = client.get("/api/providers/batch?ids=1,2,3,1&region=gb").get_json()
+    assert body["region"] == "GB"
+    assert sorted(body["results"]) == ["1", "3"] and body["failed"] == [2]
+    assert body["results"]["3"]["link"] == "https://tmdb/3/GB"
+
+    assert client.get("/api/providers/batch?ids=1,x").status_code == 400
+    assert client.get("/api/providers/batch?ids=1&region=ZZ").status_code == 400
+
+
+def test_provider_index_replaces_documents():
+    idx = ProviderIndex()
+    idx.ingest(1, _doc(1))
+    idx.ingest(2, _doc(2))
+    assert idx.movies("US", [8]).tolist() == [1, 2]
+    assert idx.movies("GB", [2], ["rent"]).tolist() == [1, 2]
+    assert idx.movies("GB", [2]).tolist() == []          # rent is not streaming
+    idx.ingest(2, {"results": {}})                        # movie 2 left Netflix
+    assert idx.movies("US", [8]).tolist() == [1]
+
+
+def test_available_on_filters_lists_from_the_index(client, monkeypatch):
+    idx = ProviderIndex()
+    idx.ingest(1, _doc(1))
+    idx.ingest(2, {"results": {}})
+    monkeypatch.setattr(routes, "provider_index", idx)
+    monkeypatch.setattr(routes.session, "get", lambda url, params=None, timeout=None: FakeResp(
+        {"page": 1, "results": [{"id": i, "title": str(i), "poster_path": "/p"} for i in (1, 2, 3)]}))
+
+    body = client.get("/api/trending?available_on=8&region=US").get_json()
+    assert [m["id"] for m in body["results"]] == [1]
+    assert body["available_on"] == {"region": "US", "providers": [8], "types": ["flatrate", "free", "ads"], "unknown": 1}
+    assert list(idx._pending) == [3]                      # fetched later by the refresher
+    key = next(k for k in cache._ROUTE_CACHE if "available_on" in k)
+    assert cache._ROUTE_CACHE[key]["ttl"] == routes.AVAILABLE_ON_PARTIAL_TTL  # incomplete page: short TTL
+    assert len(client.get("/api/trending").get_json()["results"]) == 3
+    assert cache._ROUTE_CACHE[next(k for k in cache._ROUTE_CACHE if "available_on" not in k)]["ttl"] == 600
+    assert client.get("/api/trending?available_on=8&available_types=stream").status_code == 400
+
+
+def test_refresh_order_is_stalest_first(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("app.services.provider_index.time.time", lambda: clock[0])
+    idx = ProviderIndex()
+    for mid in (1, 2, 3):
+        idx.ingest(mid, _doc(mid))
+        clock[0] += 1
+    idx.ingest(1, _doc(1))                                # 1 is now the freshest
+    assert idx.next_due(max_age=100) is None
+    clock[0] += 101
+    assert [idx.next_due(max_age=100) for _ in range(4)] == [2, 3, 1, None]
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from app.services import ratings_service
+
+
+@pytest.fixture
+def fresh_store(monkeypatch):
+    monkeypatch.setattr(ratings_service, "store", ratings_service.RatingsStore(capacity=4))
+    monkeypatch.setattr(ratings_service, "_model", None)
+    return ratings_service.store
+
+
+def test_ratings_ingest_and_personal_recs(client, fresh_store):
+    # Two taste clusters: sci-fi fans (1..4) and rom-com fans (11..14)
+    for u in range(6):
+        ratings = [{"movie_id": m, "rating": 5} for m in (1, 2, 3, 4)]
+        r = client.post("/api/ratings", json={"user_id": f"scifi{u}", "ratings": ratings})
+        assert r.get_json()["accepted"] == 4
+        client.post("/api/ratings", json={"user_id": f"romcom{u}", "ratings": [
+            {"movie_id": m, "rating": 5} for m in (11, 12, 13, 14)
+        ]})
+    client.post("/api/ratings", json={"user_id": "me", "ratings": [
+        {"movie_id": 1, "rating": 5}, {"movie_id": 2, "rating": 4}, {"movie_id": 11, "rating": 1},
+    ]})
+    assert client.get("/api/recommend/personal?user_id=me").status_code == 404  # no model yet
+
+    ratings_service.train_now()
+    body = client.get("/api/recommend/personal?user_id=me&k=2").get_json()
+    ids = [m["id"] for m in body["results"]]
+    assert body["source"] == "als"
+    assert set(ids) == {3, 4}
+
+    # Rating after training folds the user in without retraining; 0 deletes
+    client.post("/api/ratings", json={"user_id": "me", "movie_id": 3, "rating": 5})
+    client.post("/api/ratings", json={"user_id": "me", "movie_id": 11, "rating": 0})
+    body = client.get("/api/recommend/personal?user_id=me&k=1").get_json()
+    assert body["source"] == "als_fold_in"
+    assert [m["id"] for m in body["results"]] == [4]
+    listed = client.get("/api/ratings", headers={"X-User-Id": "me"}).get_json()["results"]
+    assert sorted(r["movie_id"] for r in listed) == [1, 2, 3]
+
+
+def test_ratings_validation(client, fresh_store):
+    assert client.post("/api/ratings", json={"movie_id": 1, "rating": 3}).status_code == 400
+    assert client.post("/api/ratings", json={"user_id": "x", "movie_id": "abc"}).status_code == 400
+    for bad in (7, -1):
+        r = client.post("/api/ratings", json={"user_id": "x", "ratings": [{"movie_id": 1, "rating": 3},
+                                                                          {"movie_id": 2, "rating": bad}]})
+        assert r.status_code == 400
+    assert client.get("/api/ratings?user_id=x").get_json()["results"] == []  # nothing applied
+
+
+def test_other_users_writes_keep_the_trained_vector(client, fresh_store):
+    for u in ("a", "b"):
+        client.post("/api/ratings", json={"user_id": u, "ratings": [{"movie_id": m, "rating": 5} for m in (1, 2, 3)]})
+    ratings_service.train_now()
+    client.post("/api/ratings", json={"user_id": "b", "movie_id": 4, "rating": 5})
+    assert ratings_service.recommend_for_user("a")[0] == "als"
+    assert ratings_service.recommend_for_user("b")[0] == "als_fold_in"
+
+
+def test_store_index_matches_a_reference_dict():
+    rng = np.random.default_rng(1)
+    store, ref = ratings_service.RatingsStore(capacity=8), {}
+    for _ in range(6000):  # enough writes to rebuild the sorted index several times
+        user, mid, rating = f"u{rng.integers(40)}", int(rng.integers(1, 150)), int(rng.integers(0, 6))
+        store.upsert(user, mid, rating)
+        if rating:
+            ref[(user, mid)] = rating
+        else:
+            ref.pop((user, mid), None)
+    assert len(store) == len(ref)
+    got = {(u, mid): r for u in store.user_keys for mid, r in store.user_ratings(u)}
+    assert got == ref
+    assert store.nbytes() == 9 * len(store) + store.index_nbytes() and store.index_nbytes() > 0
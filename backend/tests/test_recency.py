@@ -0,0 +1,17 @@
+import time
+
+from app.core.recency import MemoryRecency
+
+
+def test_memory_recency_is_scoped_and_expires(monkeypatch):
+    r = MemoryRecency(window=60, max_per_scope=3)
+    r.mark("alice", [1, 2])
+    assert r.fresh("alice", [1, 2, 3]) == {3}
+    assert r.fresh("bob", [1, 2, 3]) == {1, 2, 3}
+
+    r.mark("alice", [3, 4])  # cap 3: oldest id (1) is evicted
+    assert r.fresh("alice", [1, 2, 3, 4]) == {1}
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 120)
+    assert r.fresh("alice", [2, 3, 4]) == {2, 3, 4}
@@ -0,0 +1,14 @@
+import numpy as np
+
+from app.services.rerank import mmr
+
+
+def test_mmr_trades_relevance_for_diversity():
+    # Items 0 and 1 are near-duplicates; 2 is different but slightly less relevant
+    F = np.array([[1.0, 0.0], [0.99, 0.14], [0.0, 1.0]], dtype=np.float32)
+    F /= np.linalg.norm(F, axis=1, keepdims=True)
+    rel = np.array([1.0, 0.95, 0.8])
+
+    assert mmr(rel, F, k=2, lam=1.0) == [0, 1]
+    assert mmr(rel, F, k=2, lam=0.6) == [0, 2]
+    assert mmr(rel, F, k=5, lam=0.6) == [0, 2, 1]
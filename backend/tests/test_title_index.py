@@ -0,0 +1,30 @@
+from app.services.title_index import TitleIndex, normalize_title
+
+
+def _m(mid, title, year, pop=10.0):
+    return {"id": mid, "title": title, "release_date": f"{year}-05-01", "popularity": pop, "poster_path": f"/{mid}.jpg"}
+
+
+def test_normalize_title():
+    assert normalize_title("  Amélie:  Le Fabuleux & Destin! ") == "amelie le fabuleux and destin"
+
+
+def test_exact_and_year_aware_resolution():
+    idx = TitleIndex()
+    idx.add_many([_m(1, "Dune", 1984, pop=20), _m(2, "Dune", 2021, pop=90), _m(3, "No Poster", 2000) | {"poster_path": None}])
+    assert idx.resolve("dune")["id"] == 2                 # most popular without a year
+    assert idx.resolve("Dune", 1984)["id"] == 1           # exact year outweighs popularity
+    assert idx.resolve("Dune", 1999) is None              # year too far off -> ask TMDb
+    assert idx.resolve("No Poster") is None
+
+
+def test_fuzzy_needs_a_year_and_follows_renames():
+    idx = TitleIndex()
+    idx.add_many([_m(7, "The Lord of the Rings: The Two Towers", 2002)])
+    assert idx.resolve("Lord of the Rings The Two Towers", 2002)["id"] == 7
+    assert idx.resolve("Lord of the Rings The Two Towers") is None
+    assert idx.resolve("The Two Towers", 2002) is None    # too dissimilar
+
+    idx.add_many([_m(7, "Two Towers", 2002)])
+    assert idx.resolve("The Lord of the Rings: The Two Towers", 2002) is None
+    assert idx.resolve("two towers")["id"] == 7
@@ -1,5 +1,6 @@
 // src/composables/useRatings.ts
 import { ref } from 'vue'
+import { postRating, userId } from '@/services/api'
 
 export type UserRating = {
   id: number
@@ -49,6 +50,8 @@ export function useRatings() {
       }
     }
     save()
+    // Best-effort server sync; localStorage stays the source of truth for the UI
+    postRating(userId(), movie.id, value <= 0 ? 0 : Math.max(1, Math.min(5, value))).catch(() => {})
   }
 
   function clearAll() {
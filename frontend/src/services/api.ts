@@ -33,6 +33,19 @@ export type TMDbListResponse<T = any> = {
   results: T[]
 }
 
+// ---------- Anonymous identity ----------
+const LS_USER_KEY = "cine.user.id"
+
+// Anonymous, per-browser id so the backend can personalize and scope "recently shown"
+export function userId(): string {
+  let id = localStorage.getItem(LS_USER_KEY)
+  if (!id) {
+    id = crypto.randomUUID()
+    localStorage.setItem(LS_USER_KEY, id)
+  }
+  return id
+}
+
 // ---------- Low-level HTTP ----------
 async function http<T>(path: string, init?: RequestInit): Promise<T> {
   const url = `${API_BASE}${path.startsWith("/") ? path : `/${path}`}`
@@ -104,15 +117,25 @@ export async function searchMovies(
 }
 
 // ---------- Details ----------
-export type DetailsResponse = { movie: Movie; cast: Cast[] }
+export type DetailsInclude = "recommendations" | "similar" | "providers"
+
+export type DetailsResponse = {
+  movie: Movie
+  cast: Cast[]
+  // Present when requested via ?include= (same upstream document, one round trip)
+  recommendations?: RecommendationsResponse
+  similar?: Movie[]
+  providers?: ProvidersResponse
+}
 
-export function getMovieDetails(id: number) {
-  return http<DetailsResponse>(`/details/${id}`)
+export function getMovieDetails(id: number, include: DetailsInclude[] = []) {
+  const qs = include.length ? `?include=${include.join(",")}` : ""
+  return http<DetailsResponse>(`/details/${id}${qs}`)
 }
 
 // ---------- Recommendations (by movie) ----------
 export type RecommendationsResponse = TMDbListResponse<Movie> & {
-  source: "recommendations" | "similar"
+  source: "recommendations" | "similar" | "local"
 }
 
 export function getRecommendations(id: number, page = 1) {
@@ -139,10 +162,25 @@ export async function getProviders(id: number, region?: string) {
   return http<ProvidersResponse>(`/providers/${id}${suffix}`)
 }
 
+export type ProvidersBatchResponse = {
+  region: string
+  results: Record<string, Omit<ProvidersResponse, "id" | "region">>
+  // Movies whose providers could not be fetched this time
+  failed: number[]
+}
+
+export function getProvidersBatch(ids: number[], region?: string) {
+  const qs = new URLSearchParams({ ids: ids.join(",") })
+  if (region) qs.set("region", region)
+  return http<ProvidersBatchResponse>(`/providers/batch?${qs.toString()}`)
+}
+
 // ---------- Mood ----------
 export type MoodResponse = TMDbListResponse<Movie> & {
   mood: string
   region: string
+  // Which discover strategy produced the page (regional | global | relaxed | none)
+  strategy?: string
 }
 
 export async function getMoodRecs(mood: string, page = 1, region?: string): Promise<MoodResponse> {
@@ -171,11 +209,64 @@ export type AnalyzeMoodResponse = {
 export async function analyzeMood(text: string, language = "en-US"): Promise<AnalyzeMoodResponse> {
   return http<AnalyzeMoodResponse>("/mood/analyze", {
     method: "POST",
-    headers: { "Content-Type": "application/json" },
+    headers: { "Content-Type": "application/json", "X-Session-Id": userId() },
+    body: JSON.stringify({ text, language }),
+  })
+}
+
+// Same analysis as a background job: submit, then poll until done, backing off
+// from intervalMs up to maxIntervalMs. Identical prompts from the same session
+// share one job server-side and recent results are reused.
+export type MoodJob = {
+  job_id: string
+  status: "queued" | "running" | "done" | "failed"
+  stage?: string | null
+  poll: string
+  source?: "queued" | "joined" | "cached"
+  result?: AnalyzeMoodResponse
+  result_status?: number
+}
+
+export function submitMoodJob(text: string, language = "en-US") {
+  return http<MoodJob>("/mood/analyze/jobs", {
+    method: "POST",
+    headers: { "Content-Type": "application/json", "X-Session-Id": userId() },
     body: JSON.stringify({ text, language }),
   })
 }
 
+export function getMoodJob(id: string) {
+  return http<MoodJob>(`/mood/analyze/jobs/${encodeURIComponent(id)}`)
+}
+
+export async function analyzeMoodJob(
+  text: string,
+  language = "en-US",
+  onStage?: (stage: string | null | undefined) => void,
+  intervalMs = 700,
+  maxIntervalMs = 3000
+): Promise<AnalyzeMoodResponse> {
+  let job = await submitMoodJob(text, language)
+  let wait = intervalMs
+  while (job.status === "queued" || job.status === "running") {
+    onStage?.(job.stage)
+    await new Promise(r => setTimeout(r, wait))
+    wait = Math.min(maxIntervalMs, Math.round(wait * 1.5))
+    job = await getMoodJob(job.job_id)
+  }
+  const result = job.result as (AnalyzeMoodResponse & Partial<ApiErrorEnvelope>) | undefined
+  if (job.status === "failed" || !result) {
+    throw {
+      code: result?.code || "job_failed",
+      message: result?.message || "Mood analysis failed",
+      hint: result?.hint ?? null,
+      dependency: result?.dependency ?? null,
+      trace_id: result?.trace_id ?? null,
+    } as ApiErrorEnvelope
+  }
+  return result
+}
+
 
 // ---------- Trending / Popular (paged) ----------
 export function getTrending(window: "day" | "week" = "day") {
@@ -185,3 +276,41 @@ export function getTrending(window: "day" | "week" = "day") {
 export function getPopular(page = 1) {
   return http<TMDbListResponse<Movie>>(`/popular?page=${page}`)
 }
+
+// ---------- Home feed (all landing-page rows in one request) ----------
+export type HomeResponse = {
+  hero: Movie[]
+  trending_day: Movie[]
+  trending_week: Movie[]
+  popular: Movie[]
+  moods: { mood: string; results: Movie[] }[]
+  region: string
+  // true when some sections missed the server deadline (listed in `missing`)
+  partial: boolean
+  missing: string[]
+}
+
+export function getHome(region?: string) {
+  const qs = region ? `?region=${encodeURIComponent(region)}` : ""
+  return http<HomeResponse>(`/home${qs}`)
+}
+
+// ---------- Ratings / Personal ----------
+export type PersonalResponse = {
+  user_id: string
+  source: "als" | "als_fold_in"
+  results: (Movie & { score: number })[]
+}
+
+export function postRating(userId: string, movieId: number, rating: number) {
+  return http<{ user_id: string; accepted: number }>("/ratings", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ user_id: userId, movie_id: movieId, rating }),
+  })
+}
+
+export function getPersonalRecs(userId: string, k = 20) {
+  const qs = new URLSearchParams({ user_id: userId, k: String(k) })
+  return http<PersonalResponse>(`/recommend/personal?${qs.toString()}`)
+}